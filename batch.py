@@ -0,0 +1,356 @@
+# Argparse is for the command line interface of the batch solver.
+import argparse
+# Functools is for binding the budgets of the anytime search and the processes of the parallel search to their classes.
+import functools
+# Multiprocessing is for solving puzzles in worker processes, so a hard or failing puzzle cannot block the others.
+import multiprocessing
+from multiprocessing.connection import Connection, wait
+# Os is for deriving the names of the solution files and the default number of workers.
+import os
+# Sys is for the exit code of the command line interface.
+import sys
+# Time is for the per-task timeouts.
+import time
+# Typing is for type hints and type safety. As well, it improves readability.
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from external import ExternalAStarSearch
+from main import (AnytimeAStarSearch, AStarSearch, BidirectionalAStarSearch, IDAStarSearch, LinearConflict,
+                  ManhattanHeuristic, PuzzleFileIO, Solution, SolutionWriter, solve, solve_puzzle)
+from parallel import ParallelAStarSearch
+
+# Search algorithms and heuristics selectable from the command line
+ALGORITHMS = {"astar": AStarSearch, "ida": IDAStarSearch, "bidirectional": BidirectionalAStarSearch,
+              "anytime": AnytimeAStarSearch, "external": ExternalAStarSearch, "parallel": ParallelAStarSearch}
+HEURISTICS = {"manhattan": ManhattanHeuristic, "linear-conflict": LinearConflict}
+# Number of finished results per worker that may wait for an earlier slow task before no new tasks are started
+MAX_WAITING: int = 16
+
+
+class BatchResult:
+    """
+    Represents the outcome of one puzzle of a batch: either the solution or the error that prevented it.
+    """
+
+    def __init__(self,
+                 index: int,
+                 path: str,
+                 solution: Optional[Solution],
+                 error: Optional[str],
+                 elapsed: float,
+                 ) -> None:
+        """
+        :param index: The position of the puzzle in the batch.
+        :param path: The path of the puzzle file, or the id of the puzzle in a streaming file.
+        :param solution: The solution, None if the puzzle failed.
+        :param error: The description of the failure, None if the puzzle was solved.
+        :param elapsed: The wall time spent on the puzzle in seconds.
+        """
+        self.index = index
+        self.path = path
+        self.solution = solution
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        """
+        :return: True if the puzzle was solved, False otherwise.
+        """
+        return self.error is None
+
+    def __repr__(self) -> str:
+        """
+        :return: A one line summary of the result, used by the command line interface.
+        """
+        if not self.ok:
+            return f"{self.path}: failed after {self.elapsed:.2f}s: {self.error}"
+        return f"{self.path}: d={self.solution.d} N={self.solution.N} in {self.elapsed:.2f}s"
+
+
+def solution_filename(path: str, directory: str = None) -> str:
+    """
+    Derives the name of the solution file from the name of the puzzle file, the same way as the provided solutions:
+    Input1.txt is solved into Input1_solution.txt.
+    :param path: The path of the puzzle file.
+    :param directory: The directory of the solution file, the directory of the puzzle file by default.
+    :return: The path of the solution file.
+    """
+    stem, extension = os.path.splitext(path)
+    filename = stem + "_solution" + (extension or ".txt")
+    if directory is not None:
+        filename = os.path.join(directory, os.path.basename(filename))
+    return filename
+
+
+def solve_file(path: str, output: Optional[str], algorithm, heuristic) -> Solution:
+    """
+    Solves one puzzle file and writes its solution, the task of solve_many.
+    :param path: The path of the puzzle file.
+    :param output: The path of the solution file, None to not write it.
+    :param algorithm: The search algorithm class, see solve.
+    :param heuristic: The heuristic builder, see solve.
+    :return: The solution.
+    """
+    solution = solve(path, algorithm, heuristic)
+    if output is not None:
+        PuzzleFileIO.write_solution_to_file(output, solution)
+    return solution
+
+
+def raise_error(error: Exception) -> None:
+    """
+    The task of a puzzle that could not be read, so its error is reported in its place among the results.
+    :param error: The error raised while reading the puzzle.
+    :raises Exception: The error.
+    """
+    raise error
+
+
+def serve_tasks(connection: Connection) -> None:
+    """
+    The loop of a worker process: receives tasks as (function, arguments) until None and sends back the solution or
+    the error of every one.
+    :param connection: The worker end of the pipe.
+    """
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        function, args = task
+        try:
+            connection.send((function(*args), None))
+        except Exception as e:
+            connection.send((None, f"{type(e).__name__}: {e}"))
+
+
+class TaskWorker:
+    """
+    A long-lived worker process of run_pool with its pipe. It runs one task at a time and is only replaced when a task
+    crashes it or runs out of time.
+    """
+
+    def __init__(self) -> None:
+        self.connection, child = multiprocessing.Pipe()
+        # Not a daemon, so a task can start processes of its own, like the workers of ParallelAStarSearch. run_pool
+        # stops or kills every worker it started.
+        self.process = multiprocessing.Process(target=serve_tasks, args=(child,))
+        self.process.start()
+        # Closing the parent copy of the worker end lets recv detect a crash
+        child.close()
+
+    def kill(self) -> None:
+        """
+        Stops the process at once, in the middle of a task.
+        """
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+    def stop(self) -> None:
+        """
+        Lets the idle process exit.
+        """
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+def run_pool(tasks: Iterable[Tuple[str, Callable[..., Solution], tuple]],
+             workers: int = None,
+             timeout: float = None,
+             ordered: bool = True,
+             ) -> Iterator[BatchResult]:
+    """
+    Runs tasks in parallel on a pool of at most `workers` long-lived worker processes, started as they are needed, which
+    take one task at a time. A task that raises an error is reported as a failed BatchResult and its worker goes on
+    with the next task. A task that crashes its process or exceeds the timeout is reported as well, its process is
+    killed and replaced by a new one for the next task. The tasks are taken from the iterable only when there is room
+    for them, and at most a few results per worker wait for an earlier slow task, so the memory used does not depend on
+    the number of tasks.
+    :param tasks: The tasks as (name, function, arguments).
+    :param workers: The maximum number of tasks run at once, the number of CPUs by default.
+    :param timeout: The time limit of one task in seconds, no limit by default.
+    :param ordered: If True, the results are yielded in the order of the tasks, otherwise as they complete.
+    :return: A generator of the results.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = enumerate(tasks)
+    exhausted = False
+    # Workers waiting for a task
+    idle: List[TaskWorker] = []
+    # Running tasks by the connection of their worker: (index, name, worker, start time)
+    running: Dict[Connection, Tuple[int, str, TaskWorker, float]] = {}
+    # Finished results waiting for the results before them, only used when ordered
+    finished: Dict[int, BatchResult] = {}
+    next_index = 0
+
+    try:
+        while not exhausted or running:
+            while not exhausted and len(running) < workers and len(finished) < MAX_WAITING * workers:
+                task = next(tasks, None)
+                if task is None:
+                    exhausted = True
+                    break
+                index, (name, function, args) = task
+                worker = idle.pop() if idle else TaskWorker()
+                running[worker.connection] = (index, name, worker, time.monotonic())
+                try:
+                    worker.connection.send((function, args))
+                except OSError:
+                    # The worker died while idle, recv reports it below
+                    pass
+            if not running:
+                continue
+
+            wait_for = None
+            if timeout is not None:
+                oldest = min(start for _, _, _, start in running.values())
+                wait_for = max(0.0, oldest + timeout - time.monotonic())
+            ready = wait(list(running), wait_for)
+
+            done = []
+            for connection in ready:
+                index, name, worker, start = running.pop(connection)
+                try:
+                    solution, error = connection.recv()
+                    idle.append(worker)
+                except EOFError:
+                    worker.process.join()
+                    solution, error = None, f"worker exited with code {worker.process.exitcode}"
+                    worker.kill()
+                done.append(BatchResult(index, name, solution, error, time.monotonic() - start))
+            if timeout is not None:
+                now = time.monotonic()
+                for connection, (index, name, worker, start) in list(running.items()):
+                    if now - start >= timeout:
+                        worker.kill()
+                        del running[connection]
+                        done.append(BatchResult(index, name, None, f"timed out after {timeout}s", now - start))
+
+            for result in done:
+                if not ordered:
+                    yield result
+                    continue
+                finished[result.index] = result
+                while next_index in finished:
+                    yield finished.pop(next_index)
+                    next_index += 1
+    finally:
+        # Kill the workers of the tasks left over if the caller stops consuming the results early
+        for _, _, worker, _ in running.values():
+            worker.kill()
+        for worker in idle:
+            worker.stop()
+
+
+def solve_many(paths: Iterable[str],
+               workers: int = None,
+               timeout: float = None,
+               ordered: bool = True,
+               write: bool = True,
+               directory: str = None,
+               algorithm=AStarSearch,
+               heuristic=ManhattanHeuristic,
+               ) -> Iterator[BatchResult]:
+    """
+    Solves many puzzle files in parallel and writes every solution through PuzzleFileIO.write_solution_to_file. See
+    run_pool for how the puzzles are run.
+    :param paths: The paths of the puzzle files.
+    :param workers: The maximum number of puzzles solved at once, the number of CPUs by default.
+    :param timeout: The time limit of one puzzle in seconds, no limit by default.
+    :param ordered: If True, the results are yielded in the order of the paths, otherwise as they complete.
+    :param write: If True, the solutions are written to files named by solution_filename.
+    :param directory: The directory of the solution files, the directory of every puzzle file by default.
+    :param algorithm: The search algorithm class, see solve.
+    :param heuristic: The heuristic builder, see solve.
+    :return: A generator of the results.
+    """
+    tasks = ((path, solve_file, (path, solution_filename(path, directory) if write else None, algorithm, heuristic))
+             for path in paths)
+    return run_pool(tasks, workers, timeout, ordered)
+
+
+def solve_stream_parallel(input_filenames: Iterable[str],
+                          output_filename: str,
+                          workers: int = None,
+                          timeout: float = None,
+                          flush_every: int = 100,
+                          algorithm=AStarSearch,
+                          heuristic=ManhattanHeuristic,
+                          ) -> Iterator[BatchResult]:
+    """
+    The parallel counterpart of main.solve_stream: reads the puzzles of the input files lazily, solves them in parallel
+    and writes the solutions to one output file in the streaming format, in the order of the puzzles. See
+    PuzzleFileIO.read_puzzles for the input formats. A puzzle that cannot be read is written with its error, like a
+    puzzle that fails.
+    :param input_filenames: The names of the files with the puzzles.
+    :param output_filename: The name of the file to write the solutions to.
+    :param workers: The maximum number of puzzles solved at once, the number of CPUs by default.
+    :param timeout: The time limit of one puzzle in seconds, no limit by default.
+    :param flush_every: The number of solutions written between two flushes of the output file.
+    :param algorithm: The search algorithm class, see solve.
+    :param heuristic: The heuristic builder, see solve.
+    :return: A generator of the results, which are written to the output file as they are consumed.
+    """
+    tasks = ((puzzle_id, solve_puzzle, (initial, goal, algorithm, heuristic)) if error is None
+             else (puzzle_id, raise_error, (error,))
+             for filename in input_filenames
+             for puzzle_id, initial, goal, error in PuzzleFileIO.read_puzzles(filename))
+    with SolutionWriter(output_filename, flush_every) as writer:
+        for result in run_pool(tasks, workers, timeout, True):
+            writer.write(result.path, result.solution, result.error)
+            yield result
+
+
+if __name__ == "__main__":
+    # Command line interface that solves puzzle files in parallel and writes their solutions next to them.
+    parser = argparse.ArgumentParser(description="Solve many puzzle files in parallel.")
+    parser.add_argument("files", nargs="+", help="puzzle files to solve")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=None, help="time limit of one puzzle in seconds")
+    parser.add_argument("--unordered", action="store_true", help="report results as they complete")
+    parser.add_argument("--directory", default=None, help="directory of the solution files")
+    parser.add_argument("--output", default=None,
+                        help="write all solutions to this file, one JSON object per line, instead of one file each")
+    parser.add_argument("--algorithm", choices=ALGORITHMS, default="astar", help="search algorithm")
+    parser.add_argument("--heuristic", choices=HEURISTICS, default="manhattan", help="heuristic")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="time budget of one puzzle in seconds for the anytime algorithm, which then returns its "
+                             "best solution so far")
+    parser.add_argument("--node-limit", type=int, default=None,
+                        help="budget of generated nodes of one puzzle for the anytime algorithm")
+    parser.add_argument("--search-workers", type=int, default=None,
+                        help="number of processes of one puzzle for the parallel algorithm (default: CPU count), "
+                             "which also solves one puzzle at a time unless --workers is given")
+    args = parser.parse_args()
+
+    algorithm = ALGORITHMS[args.algorithm]
+    if algorithm is ExternalAStarSearch and not HEURISTICS[args.heuristic].consistent:
+        parser.error(f"the external algorithm needs a consistent heuristic, {args.heuristic} is not")
+    if algorithm is AnytimeAStarSearch:
+        algorithm = functools.partial(AnytimeAStarSearch, time_limit=args.time_limit, node_limit=args.node_limit)
+    if algorithm is ParallelAStarSearch:
+        algorithm = functools.partial(ParallelAStarSearch, workers=args.search_workers)
+        if args.workers is None:
+            args.workers = 1
+
+    if args.output is not None:
+        results = solve_stream_parallel(args.files, args.output, args.workers, args.timeout,
+                                        algorithm=algorithm, heuristic=HEURISTICS[args.heuristic])
+    else:
+        if args.directory is not None:
+            os.makedirs(args.directory, exist_ok=True)
+        results = solve_many(args.files, args.workers, args.timeout, not args.unordered, True, args.directory,
+                             algorithm, HEURISTICS[args.heuristic])
+    failures = 0
+    for res in results:
+        failures += not res.ok
+        print(res, flush=True)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,302 @@
+# Argparse is for the command line interface of the benchmark.
+import argparse
+# Json is for the machine readable results, so runs of different versions can be compared.
+import json
+# Multiprocessing is for running every search in a fresh process, so its peak memory is measured on its own.
+import multiprocessing
+# Platform is for recording where the benchmark was run.
+import platform
+# Random is for the seeds of the scrambled puzzles.
+import random
+# Resource is for measuring the peak memory (resident set size) of a search.
+import resource
+# Statistics is for the medians of the summary.
+import statistics
+# Time is for measuring the wall time of the searches.
+import time
+# Typing is for type hints and type safety. As well, it improves readability.
+from typing import Dict, List, Optional, Tuple
+
+from main import (AStarSearch, BidirectionalAStarSearch, BucketFrontier, HeapFrontier, IDAStarSearch, LinearConflict,
+                  ManhattanHeuristic, PuzzleFileIO, PuzzleState, Solution, scramble)
+
+# Solver and heuristic configurations that can be benchmarked: name -> (algorithm, heuristic, keyword arguments)
+CONFIGURATIONS = {
+    "astar-manhattan-heap": (AStarSearch, ManhattanHeuristic, {"frontier": HeapFrontier}),
+    "astar-manhattan-bucket": (AStarSearch, ManhattanHeuristic, {"frontier": BucketFrontier}),
+    "astar-linear-conflict-bucket": (AStarSearch, LinearConflict, {"frontier": BucketFrontier}),
+    "ida-manhattan": (IDAStarSearch, ManhattanHeuristic, {}),
+    "ida-linear-conflict": (IDAStarSearch, LinearConflict, {}),
+    "bidirectional-manhattan": (BidirectionalAStarSearch, ManhattanHeuristic, {}),
+}
+# The vectorized engine is only available when NumPy is installed
+try:
+    from vectorized import VectorizedAStarSearch
+    CONFIGURATIONS["astar-numpy"] = (VectorizedAStarSearch, ManhattanHeuristic, {})
+except ImportError:
+    pass
+# Configurations run by default, the ones that finish on every depth bucket in reasonable time. The heap and bucket
+# frontiers of AStarSearch are compared on every puzzle.
+DEFAULT_CONFIGURATIONS = ["astar-manhattan-heap", "astar-manhattan-bucket", "ida-manhattan"]
+# Puzzle files benchmarked by default next to the generated puzzles
+DEFAULT_FILES = ["Input1.txt", "Input2.txt", "Input3.txt"]
+# Default number of scrambles tried before giving up on the buckets that are still not full
+DEFAULT_ATTEMPTS: int = 1000
+
+
+class Instance:
+    """
+    Represents a benchmark puzzle together with its optimal depth.
+    """
+
+    def __init__(self, name: str, initial: PuzzleState, goal: PuzzleState, depth: int) -> None:
+        self.name = name
+        self.initial = initial
+        self.goal = goal
+        self.depth = depth
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "initial": list(self.initial.tiles), "goal": list(self.goal.tiles),
+                "depth": self.depth}
+
+
+def depth_bucket(depth: int, width: int) -> str:
+    """
+    :param depth: The optimal depth of a puzzle.
+    :param width: The number of depths in one bucket.
+    :return: The name of the bucket of the depth, for example "20-24".
+    """
+    low = depth // width * width
+    return f"{low}-{low + width - 1}"
+
+
+def load_instances(files: List[str]) -> List[Instance]:
+    """
+    Reads puzzles from files and finds their optimal depths with IDAStarSearch.
+    :param files: The names of the puzzle files.
+    :return: The puzzles, named after their files.
+    """
+    instances = []
+    for file in files:
+        initial, goal = PuzzleFileIO.read_puzzle_from_file(file)
+        instances.append(Instance(file, initial, goal, IDAStarSearch(initial, goal).search().path_cost))
+    return instances
+
+
+def generate_instances(initial: PuzzleState,
+                       buckets: List[str],
+                       per_bucket: int,
+                       width: int,
+                       seed: int,
+                       attempts: int = DEFAULT_ATTEMPTS,
+                       ) -> List[Instance]:
+    """
+    Generates puzzles until every depth bucket holds the requested number of them. The optimal depth of every scramble
+    is found with IDAStarSearch, which needs little memory, and the scramble is kept only if its bucket is not full.
+    A bucket that random walks hardly ever reach, or cannot reach at all, would keep the generator running forever, so
+    it stops after a number of scrambles and the buckets can hold fewer puzzles, see underfilled.
+    The same seed always gives the same instances.
+    :param initial: The initial state of every puzzle, the goal states are scrambled from it.
+    :param buckets: The names of the depth buckets, see depth_bucket.
+    :param per_bucket: The number of puzzles in every bucket.
+    :param width: The number of depths in one bucket.
+    :param seed: The seed of the first scramble.
+    :param attempts: The maximum number of scrambles.
+    :return: The generated puzzles, ordered by depth.
+    """
+    instances: Dict[str, List[Instance]] = {bucket: [] for bucket in buckets}
+    deepest = max(int(bucket.split("-")[1]) for bucket in buckets)
+    rng = random.Random(seed)
+    for _ in range(attempts):
+        ranges = [(int(bucket.split("-")[0]), int(bucket.split("-")[1]))
+                  for bucket in buckets if len(instances[bucket]) < per_bucket]
+        if not ranges:
+            break
+        # Random walks reach an optimal depth of roughly 70 to 80 percent of their length
+        moves = rng.randint(1, deepest * 3 // 2 + 1)
+        scramble_seed = rng.getrandbits(32)
+        goal = scramble(initial, moves, scramble_seed)
+        # The depth lies between the Manhattan distance and the length of the walk, scrambles that cannot fall into a
+        # bucket that is not full are not searched
+        lower = ManhattanHeuristic(goal).calculate(initial)
+        if not any(low <= moves and lower <= high for low, high in ranges):
+            continue
+        result = IDAStarSearch(initial, goal).search()
+        bucket = depth_bucket(result.path_cost, width)
+        if bucket in instances and len(instances[bucket]) < per_bucket:
+            name = f"scramble-{moves}-{scramble_seed}"
+            instances[bucket].append(Instance(name, initial, goal, result.path_cost))
+    return sorted((instance for bucket in instances.values() for instance in bucket), key=lambda i: i.depth)
+
+
+def underfilled(instances: List[Instance], buckets: List[str], per_bucket: int, width: int) -> Dict[str, int]:
+    """
+    :param instances: The generated puzzles.
+    :param buckets: The names of the depth buckets, see depth_bucket.
+    :param per_bucket: The requested number of puzzles in every bucket.
+    :param width: The number of depths in one bucket.
+    :return: The number of puzzles of every bucket that holds fewer than requested.
+    """
+    counts = {bucket: 0 for bucket in buckets}
+    for instance in instances:
+        counts[depth_bucket(instance.depth, width)] += 1
+    return {bucket: count for bucket, count in counts.items() if count < per_bucket}
+
+
+def measure(connection, configuration: str, initial: PuzzleState, goal: PuzzleState) -> None:
+    """
+    Solves one puzzle with one configuration in a fresh worker process and sends the measurements back. The peak
+    memory is the growth of the resident memory of the process during the search, without the memory of the harness.
+    :param connection: The sending end of the pipe to the parent process.
+    :param configuration: The name of the configuration, see CONFIGURATIONS.
+    :param initial: The initial PuzzleState.
+    :param goal: The goal PuzzleState.
+    """
+    algorithm, heuristic, kwargs = CONFIGURATIONS[configuration]
+    # The forked process inherits the resident memory of the harness and its peak. Linux resets the peak to the
+    # current resident memory on request, elsewhere the inherited peak is the baseline.
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    search = algorithm(initial, goal, heuristic(goal), **kwargs)
+    solution = Solution(search.search(), search.N, search.statistics())
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    connection.send({"d": solution.d, "time": elapsed, "statistics": solution.statistics, "peak_rss_kb": peak})
+    connection.close()
+
+
+def run(configuration: str, instance: Instance, timeout: Optional[float]) -> dict:
+    """
+    Runs one measurement in its own process.
+    :param configuration: The name of the configuration, see CONFIGURATIONS.
+    :param instance: The puzzle to solve.
+    :param timeout: The time limit in seconds, no limit if None.
+    :return: The measurements of the run, or the error if it failed or timed out.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=measure, args=(sender, configuration, instance.initial, instance.goal))
+    process.start()
+    sender.close()
+    record = {"configuration": configuration, "instance": instance.name, "depth": instance.depth}
+    if receiver.poll(timeout):
+        try:
+            measurement = receiver.recv()
+        except EOFError:
+            measurement = {"error": "worker crashed"}
+    else:
+        process.kill()
+        measurement = {"error": f"timed out after {timeout}s"}
+    process.join()
+    receiver.close()
+    record.update(measurement)
+    if "error" not in record:
+        record["generated"] = record["statistics"]["generated"]
+        record["nodes_per_second"] = record["generated"] / record["time"] if record["time"] else None
+        if record["d"] != instance.depth:
+            record["error"] = f"found depth {record['d']} instead of the optimal {instance.depth}"
+    return record
+
+
+def summarize(results: List[dict], width: int) -> Dict[str, Dict[str, dict]]:
+    """
+    Aggregates the runs of every configuration per depth bucket.
+    :param results: The records returned by run.
+    :param width: The number of depths in one bucket.
+    :return: configuration -> bucket -> medians of the time, nodes generated, nodes per second and peak memory.
+    """
+    groups: Dict[Tuple[str, str], List[dict]] = {}
+    for record in results:
+        groups.setdefault((record["configuration"], depth_bucket(record["depth"], width)), []).append(record)
+    summary: Dict[str, Dict[str, dict]] = {}
+    for (configuration, bucket), records in sorted(groups.items()):
+        ok = [record for record in records if "error" not in record]
+        entry = {"runs": len(records), "failures": len(records) - len(ok)}
+        for key in ("time", "generated", "nodes_per_second", "peak_rss_kb"):
+            entry[key] = statistics.median(record[key] for record in ok) if ok else None
+        summary.setdefault(configuration, {})[bucket] = entry
+    return summary
+
+
+def compare(summary: Dict[str, Dict[str, dict]], previous: Dict[str, Dict[str, dict]]) -> List[str]:
+    """
+    Compares the median times with the summary of a previous run.
+    :param summary: The summary of this run.
+    :param previous: The summary of the previous run.
+    :return: A line per configuration and bucket present in both runs, with the ratio of the median times.
+    """
+    lines = []
+    for configuration, buckets in summary.items():
+        for bucket, entry in buckets.items():
+            before = previous.get(configuration, {}).get(bucket)
+            if before and before["time"] and entry["time"]:
+                ratio = entry["time"] / before["time"]
+                flag = "  REGRESSION" if ratio > 1.1 else ""
+                lines.append(f"{configuration:<32}{bucket:>8}{before['time']:>10.3f}s{entry['time']:>10.3f}s"
+                             f"{ratio:>8.2f}x{flag}")
+    return lines
+
+
+if __name__ == "__main__":
+    # Benchmarks the configurations on the puzzle files and on generated puzzles stratified by optimal depth and writes
+    # the results to JSON.
+    parser = argparse.ArgumentParser(description="Benchmark the solver on generated puzzles bucketed by depth.")
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES, help="puzzle files to benchmark as well")
+    parser.add_argument("--start", default="Input1.txt", help="puzzle file whose initial state is scrambled")
+    parser.add_argument("--depths", default="10-14,20-24,30-34",
+                        help="comma separated depth buckets, all of the same width")
+    parser.add_argument("--per-bucket", type=int, default=3, help="number of puzzles per depth bucket")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the instance generator")
+    parser.add_argument("--attempts", type=int, default=DEFAULT_ATTEMPTS,
+                        help="number of scrambles tried before giving up on the buckets that are not full")
+    parser.add_argument("--configurations", default=",".join(DEFAULT_CONFIGURATIONS),
+                        help="comma separated configurations out of: " + ", ".join(CONFIGURATIONS))
+    parser.add_argument("--timeout", type=float, default=300, help="time limit of one run in seconds")
+    parser.add_argument("--output", default="benchmark.json", help="file to write the results to")
+    parser.add_argument("--compare", default=None, help="results of a previous run to compare the median times with")
+    args = parser.parse_args()
+
+    buckets = args.depths.split(",")
+    bucket_width = int(buckets[0].split("-")[1]) - int(buckets[0].split("-")[0]) + 1
+    configurations = args.configurations.split(",")
+    start_state = PuzzleFileIO.read_puzzle_from_file(args.start)[0]
+    generated = generate_instances(start_state, buckets, args.per_bucket, bucket_width, args.seed, args.attempts)
+    missing = underfilled(generated, buckets, args.per_bucket, bucket_width)
+    for name, count in missing.items():
+        print(f"Bucket {name} holds {count} of {args.per_bucket} puzzles after {args.attempts} scrambles")
+    instances = load_instances(args.files) + generated
+
+    results = []
+    print(f"{'configuration':<32}{'instance':<28}{'d':>4}{'N':>10}{'time':>10}{'nodes/s':>10}{'RSS MB':>8}")
+    for instance in instances:
+        for configuration in configurations:
+            res = run(configuration, instance, args.timeout)
+            results.append(res)
+            if "error" in res:
+                print(f"{configuration:<32}{instance.name:<28}{instance.depth:>4}  {res['error']}")
+            else:
+                print(f"{configuration:<32}{instance.name:<28}{res['d']:>4}{res['generated']:>10}"
+                      f"{res['time']:>9.2f}s{res['nodes_per_second']:>10.0f}{res['peak_rss_kb'] / 1024:>8.1f}")
+
+    summary = summarize(results, bucket_width)
+    with open(args.output, "w") as f:
+        json.dump({
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "seed": args.seed,
+            "underfilled": missing,
+            "instances": [instance.to_dict() for instance in instances],
+            "results": results,
+            "summary": summary,
+        }, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            print("\n".join(compare(summary, json.load(f)["summary"])))
@@ -0,0 +1,231 @@
+# Functools is for naming the search algorithms built with functools.partial, such as AnytimeAStarSearch with limits.
+import functools
+# Inspect is for telling the functions that build searches or heuristics from the instances that do.
+import inspect
+# Json is for storing the counters of the search in the database.
+import json
+# Sqlite3 is for the on-disk store of the cache, so cached solutions survive restarts.
+import sqlite3
+# OrderedDict is for the in-memory least recently used (LRU) layer of the cache.
+from collections import OrderedDict
+# Typing is for type hints and type safety. As well, it improves readability.
+from typing import Dict, List, Optional, Tuple, Union
+
+from main import AStarSearch, Heuristic, ManhattanHeuristic, PuzzleFileIO, PuzzleState, Solution, solve_puzzle
+from symmetry import INVERSES, canonical, map_actions
+
+# Default file of the on-disk store
+DEFAULT_DATABASE: str = "solutions.sqlite3"
+# Default number of solutions kept in memory
+DEFAULT_CAPACITY: int = 10000
+# Default number of heuristics built for the goals of hits kept in memory
+DEFAULT_HEURISTICS: int = 64
+
+
+class SolutionCache:
+    """
+    Cache of solutions in front of solve. Puzzles are stored by their canonical form (see symmetry.canonical), so the
+    same problem under a different labeling of the tiles or under any of the 48 symmetries of the cube is a hit as
+    well, and the actions are stored as they apply to the canonical form. The most recently used action sequences are
+    kept in memory (LRU) and all of them are stored in a sqlite database, so they survive restarts. A hit rebuilds the
+    full Solution by mapping the cached actions back and replaying them on the original puzzle, without searching.
+    Exact repeats of a puzzle are kept in memory by their raw states as well, with the actions as they apply to it, so
+    they are found without computing the canonical form. Only solutions proven optimal are cached, a solution of an
+    anytime search stopped by its limits is returned without being stored. The heuristics that rebuild the costs of
+    the hits are kept in memory by the goals they are built for (LRU), so repeated hits on the same goal do not build
+    them again.
+    """
+
+    def __init__(self,
+                 database: str = DEFAULT_DATABASE,
+                 capacity: int = DEFAULT_CAPACITY,
+                 heuristics: int = DEFAULT_HEURISTICS,
+                 ) -> None:
+        """
+        :param database: The file of the on-disk store, ":memory:" for a cache that does not survive restarts.
+        :param capacity: The maximum number of solutions kept in memory.
+        :param heuristics: The maximum number of built heuristics kept in memory.
+        """
+        self.capacity = capacity
+        self.memory: "OrderedDict[Union[str, Tuple], Tuple[List[str], int, Dict[str, int]]]" = OrderedDict()
+        self.heuristics_capacity = heuristics
+        self.heuristics: "OrderedDict[Tuple[str, int, int], Heuristic]" = OrderedDict()
+        self.connection = sqlite3.connect(database)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, actions TEXT, n INTEGER, statistics TEXT)"
+        )
+        self.connection.commit()
+        # Numbers of hits in memory, hits on disk and misses
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def name(builder) -> str:
+        """
+        :param builder: A search algorithm class or heuristic builder, a functools.partial of one, or an instance that
+        builds searches, such as PerimeterSearch.
+        :return: The name of the builder, with the arguments of a partial, since they can change the result. An
+        instance is named by its repr, which must show its configuration for the same reason.
+        :raises ValueError: If the builder is a lambda, whose name does not tell it apart from other lambdas, or an
+        instance without a repr of its own.
+        """
+        if isinstance(builder, functools.partial):
+            arguments = [repr(argument) for argument in builder.args]
+            arguments += [f"{keyword}={value!r}" for keyword, value in sorted(builder.keywords.items())]
+            return f"{SolutionCache.name(builder.func)}({','.join(arguments)})"
+        if isinstance(builder, type) or inspect.isroutine(builder):
+            if builder.__name__ == "<lambda>":
+                raise ValueError("a lambda cannot be told apart from other lambdas in the cache keys, use a function "
+                                 "or a functools.partial instead")
+            return builder.__qualname__
+        if type(builder).__repr__ is object.__repr__:
+            raise ValueError(f"{type(builder).__name__} has no repr of its own to name its configuration in the cache "
+                             f"keys")
+        return repr(builder)
+
+    @staticmethod
+    def names(algorithm, heuristic) -> str:
+        """
+        :param algorithm: The search algorithm class, it is part of the key since N depends on it.
+        :param heuristic: The heuristic builder, it is part of the key since N depends on it.
+        :return: The names of the algorithm and heuristic as they appear in the keys, see name.
+        """
+        return f"{SolutionCache.name(algorithm)}:{SolutionCache.name(heuristic)}"
+
+    @staticmethod
+    def exact_key(initial: PuzzleState, goal: PuzzleState, algorithm, heuristic) -> Tuple[str, int, int, int]:
+        """
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param algorithm: The search algorithm class, see names.
+        :param heuristic: The heuristic builder, see names.
+        :return: The in-memory key of the puzzle itself: the names of the algorithm and heuristic, the size of the grid
+        and the packed initial and goal states.
+        """
+        return SolutionCache.names(algorithm, heuristic), goal.grid.size, initial.packed, goal.packed
+
+    @staticmethod
+    def key(initial: PuzzleState, goal: PuzzleState, algorithm, heuristic) -> Tuple[str, int]:
+        """
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param algorithm: The search algorithm class, see names.
+        :param heuristic: The heuristic builder, see names.
+        :return: The key of the puzzle: the size of the grid, the canonical initial state and the goal position of the
+        blank tile, which together identify the canonical form, and the names of the algorithm and heuristic. As well,
+        the symmetry that maps the puzzle to its canonical form.
+        """
+        symmetry, canonical_initial, canonical_goal = canonical(initial, goal)
+        puzzle = f"{goal.grid.size}:{canonical_goal.blank}:{canonical_initial.packed:x}"
+        return f"{SolutionCache.names(algorithm, heuristic)}:{puzzle}", symmetry
+
+    def get(self, key: str) -> Optional[Tuple[List[str], int, Dict[str, int]]]:
+        """
+        :param key: The key of the puzzle.
+        :return: The cached actions, N and counters of the search, None if the puzzle is not cached.
+        """
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return entry
+        row = self.connection.execute("SELECT actions, n, statistics FROM solutions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        entry = (row[0].split(), row[1], json.loads(row[2]))
+        self.remember(key, entry)
+        return entry
+
+    def put(self, key: str, actions: List[str], solution: Solution) -> None:
+        """
+        Stores the solution of a puzzle in memory and on disk.
+        :param key: The key of the puzzle.
+        :param actions: The actions of the solution mapped to the canonical form.
+        :param solution: The solution.
+        """
+        entry = (actions, solution.N, solution.statistics)
+        self.connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)",
+                                (key, " ".join(actions), solution.N, json.dumps(solution.statistics)))
+        self.connection.commit()
+        self.remember(key, entry)
+
+    def remember(self, key: Union[str, Tuple], entry: Tuple[List[str], int, Dict[str, int]]) -> None:
+        """
+        Puts an entry in memory and evicts the least recently used one if the capacity is exceeded.
+        :param key: The key of the puzzle, or its exact key.
+        :param entry: The actions, N and counters of the search.
+        """
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def heuristic(self, goal: PuzzleState, heuristic) -> Heuristic:
+        """
+        :param goal: The goal PuzzleState.
+        :param heuristic: The heuristic builder, see solve.
+        :return: The heuristic built for the goal, built only if it is not kept in memory already.
+        """
+        key = (SolutionCache.name(heuristic), goal.grid.size, goal.packed)
+        built = self.heuristics.get(key)
+        if built is None:
+            built = self.heuristics[key] = heuristic(goal)
+            if len(self.heuristics) > self.heuristics_capacity:
+                self.heuristics.popitem(last=False)
+        else:
+            self.heuristics.move_to_end(key)
+        return built
+
+    def solve_puzzle(self,
+                     initial: PuzzleState,
+                     goal: PuzzleState,
+                     algorithm=AStarSearch,
+                     heuristic=ManhattanHeuristic,
+                     ) -> Solution:
+        """
+        Returns the cached solution of the puzzle, or solves it with solve_puzzle and caches the solution if it is
+        proven optimal: a suboptimality bound above 1 in its counters (see AnytimeAStarSearch.statistics) means that
+        another search could find a shorter one.
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param algorithm: The search algorithm class, see solve.
+        :param heuristic: The heuristic builder, see solve.
+        :return: The solution to the puzzle.
+        """
+        exact = self.exact_key(initial, goal, algorithm, heuristic)
+        entry = self.memory.get(exact)
+        if entry is not None:
+            self.memory.move_to_end(exact)
+            self.hits += 1
+            actions, n, statistics = entry
+            return Solution.from_actions(initial, goal, actions, n, self.heuristic(goal, heuristic), statistics)
+        key, symmetry = self.key(initial, goal, algorithm, heuristic)
+        entry = self.get(key)
+        if entry is not None:
+            actions, n, statistics = entry
+            actions = map_actions(actions, INVERSES[symmetry])
+            self.remember(exact, (actions, n, statistics))
+            return Solution.from_actions(initial, goal, actions, n, self.heuristic(goal, heuristic), statistics)
+        solution = solve_puzzle(initial, goal, algorithm, heuristic)
+        if solution.statistics.get("bound", 1.0) > 1.0:
+            return solution
+        self.put(key, map_actions(solution.actions, symmetry), solution)
+        self.remember(exact, (solution.actions, solution.N, solution.statistics))
+        return solution
+
+    def solve(self, filename: str, algorithm=AStarSearch, heuristic=ManhattanHeuristic) -> Solution:
+        """
+        The cached counterpart of main.solve.
+        :param filename: The name of the file with the puzzle.
+        :param algorithm: The search algorithm class, see solve.
+        :param heuristic: The heuristic builder, see solve.
+        :return: The solution to the puzzle.
+        """
+        initial, goal = PuzzleFileIO.read_puzzle_from_file(filename)
+        return self.solve_puzzle(initial, goal, algorithm, heuristic)
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,92 @@
+# Json is for writing the puzzles and reading the solutions of the streaming format.
+import json
+# Os is for locating the puzzle files next to the tests.
+import os
+# Typing is for type hints and type safety. As well, it improves readability.
+from typing import List, Tuple
+
+from main import AStarSearch, PuzzleFileIO, PuzzleState, Solution, scramble
+
+# Directory of the puzzle files
+DIRECTORY: str = os.path.dirname(os.path.abspath(__file__))
+
+
+def optimal_depth(filename: str) -> int:
+    """
+    :param filename: The name of a provided solution file.
+    :return: The depth of the solution, the line before N and the actions.
+    """
+    with open(os.path.join(DIRECTORY, filename)) as f:
+        lines = [line.strip() for line in f if line.strip()]
+    return int(lines[-4])
+
+
+def build_puzzles() -> List[Tuple[PuzzleState, PuzzleState, int]]:
+    """
+    :return: The puzzles of the input files with the depths of their provided solutions, and five puzzles with goals
+    scrambled by 24 random moves with the depths found by AStarSearch.
+    """
+    puzzles = []
+    for i in (1, 2, 3):
+        initial, goal = PuzzleFileIO.read_puzzle_from_file(os.path.join(DIRECTORY, f"Input{i}.txt"))
+        puzzles.append((initial, goal, optimal_depth(f"Input{i}_solution.txt")))
+    start = puzzles[0][0]
+    for seed in range(5):
+        goal = scramble(start, 24, seed)
+        puzzles.append((start, goal, AStarSearch(start, goal).search().path_cost))
+    return puzzles
+
+
+# The puzzles shared by the tests, as (initial, goal, optimal depth)
+PUZZLES = build_puzzles()
+
+
+def swap_tiles(state: PuzzleState) -> PuzzleState:
+    """
+    :param state: A PuzzleState.
+    :return: The state with its first two tiles other than the blank swapped, which flips its solvability.
+    """
+    tiles = list(state.tiles)
+    first, second = [i for i, tile in enumerate(tiles) if tile][:2]
+    tiles[first], tiles[second] = tiles[second], tiles[first]
+    return PuzzleState(tiles)
+
+
+def check(solution: Solution, initial: PuzzleState, goal: PuzzleState, depth: int) -> None:
+    """
+    Checks that the solution is optimal and that its actions lead from the initial state to the goal state.
+    """
+    assert solution.d == depth
+    # Solution.from_actions raises if the actions are illegal or do not reach the goal state
+    Solution.from_actions(initial, goal, solution.actions, 0)
+
+
+def write_puzzles(filename: str) -> None:
+    """
+    Writes a streaming file with two good puzzles around a line that is not JSON, followed by a puzzle with too few
+    tiles.
+    :param filename: The name of the file.
+    """
+    (first, first_goal, _), (second, second_goal, _) = PUZZLES[:2]
+    with open(filename, "w") as f:
+        f.write(json.dumps({"id": "p1", "initial": list(first.tiles), "goal": list(first_goal.tiles)}) + "\n")
+        f.write("{not json\n")
+        f.write(json.dumps({"initial": list(second.tiles), "goal": list(second_goal.tiles)}) + "\n")
+        f.write(json.dumps({"id": "short", "initial": [1, 0], "goal": [0, 1]}) + "\n")
+
+
+def check_solutions(filename: str, first: int = 0) -> None:
+    """
+    Checks the solutions of the puzzles of write_puzzles: both good puzzles are solved and the bad lines are written
+    with their errors, under their ids or line numbers.
+    :param filename: The name of the file with the solutions.
+    :param first: The number of records before the solutions of the puzzles of write_puzzles.
+    """
+    with open(filename) as f:
+        records = [json.loads(line) for line in f][first:]
+    assert [record["id"] for record in records] == ["p1", "2", "3", "short"]
+    for record, (initial, goal, depth) in zip((records[0], records[2]), PUZZLES[:2]):
+        assert "error" not in record
+        check(Solution.from_actions(initial, goal, record["actions"], record["N"]), initial, goal, depth)
+    assert records[1]["error"].startswith("JSONDecodeError")
+    assert records[3]["error"].startswith("ValueError")
@@ -0,0 +1,345 @@
+# Argparse is for the command line interface of the external search.
+import argparse
+# Heapq is for the order of the buckets and for merging the sorted runs of the visited set.
+import heapq
+# Mmap is for looking up states in the sorted runs of the visited set without reading them into memory.
+import mmap
+# Os is for the files of the buckets and runs.
+import os
+# Shutil is for removing the working directory of a search.
+import shutil
+# Tempfile is for the default working directory of a search.
+import tempfile
+# Time is for the wall time reported by the command line interface.
+import time
+# Typing is for type hints and type safety. As well, it improves readability.
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from main import UNDO, Directions, ManhattanHeuristic, PuzzleFileIO, PuzzleState, SearchNode, Solution, Solvability
+
+# Default number of bucket records sorted and checked against the visited set at once
+DEFAULT_CHUNK_SIZE: int = 1 << 18
+# Size of the write buffer of every bucket file
+BUFFER_SIZE: int = 1 << 16
+# Action byte of the initial state, which has no parent
+NO_ACTION: int = 255
+
+
+class SortedRun:
+    """
+    One sorted file of the visited set. Every record holds a state, its parent state and the action that reached it,
+    the states as fixed-width big-endian bytes, so the byte order of the records is the order of the states. The file
+    is memory-mapped, so looking up a state reads only the pages its binary search touches.
+    """
+
+    def __init__(self, path: str, width: int) -> None:
+        """
+        :param path: The path of the file, which must be written and sorted already.
+        :param width: The number of bytes of a state.
+        """
+        self.path = path
+        self.width = width
+        self.record = 2 * width + 1
+        self.size = os.path.getsize(path) // self.record
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+
+    def find(self, key: bytes, low: int = 0) -> Tuple[int, bool]:
+        """
+        :param key: The state to look up.
+        :param low: The first record to consider, the position of a smaller key looked up before.
+        :return: The position of the first record not smaller than the key, and whether it holds the key.
+        """
+        high = self.size
+        record, width, data = self.record, self.width, self.map
+        while low < high:
+            middle = (low + high) // 2
+            if data[middle * record:middle * record + width] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low, low < self.size and data[low * record:low * record + width] == key
+
+    def parent(self, key: bytes) -> Optional[Tuple[bytes, int]]:
+        """
+        :param key: A state.
+        :return: The parent state and the action that reached the state, None if the state is not in the run.
+        """
+        if not self.size:
+            return None
+        position, found = self.find(key)
+        if not found:
+            return None
+        start = position * self.record + self.width
+        return self.map[start:start + self.width], self.map[start + self.width]
+
+    def __iter__(self) -> Iterator[bytes]:
+        """
+        :return: The records in order, read sequentially.
+        """
+        for position in range(self.size):
+            yield self.map[position * self.record:(position + 1) * self.record]
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+
+class ExternalAStarSearch:
+    """
+    Implements an external-memory A* search for puzzles whose search does not fit in memory. Nothing grows in memory
+    with the number of nodes: the frontier is split into buckets by path cost and heuristic, which are files that the
+    successors are appended to sequentially, and the visited set is a set of sorted files.
+
+    The buckets are expanded in the order of their total cost, and among equal total costs the deepest first, like the
+    tie-break of HeapFrontier. The successors of a bucket with the same total cost go to a deeper bucket of the same
+    layer, which is read again if it was read before, so a layer is left only when all of its buckets are empty. With
+    a consistent heuristic a state is first expanded with its optimal path cost, like in AStarSearch.
+
+    A bucket is read in chunks; every chunk is sorted, its own duplicates are removed and the rest are looked up in
+    bulk in the sorted runs of the visited set: the sorted keys let every binary search start where the previous one
+    ended. The new states of the chunk are written as a new run, with their parent state and action, and expanded.
+    Runs of equal size are merged, like the digits of a binary counter, so there are never more runs than the logarithm
+    of the visited states. The path is rebuilt by looking up the parent of every state from the goal back to the
+    initial state.
+    """
+
+    def __init__(self,
+                 initial: PuzzleState,
+                 goal: PuzzleState,
+                 heuristic=None,
+                 directory: str = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 ) -> None:
+        """
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param heuristic: Optional heuristic, the Manhattan distance by default. It must be consistent.
+        :param directory: The directory the working directory of the search is created in, the system temporary
+        directory by default. The working directory is removed when the search ends.
+        :param chunk_size: The number of bucket records held in memory at once.
+        :raises ValueError: If the heuristic is not declared consistent, since the buckets are never reopened.
+        """
+        self.initial = initial
+        self.goal = goal
+        self.heuristic = heuristic if heuristic is not None else ManhattanHeuristic(goal)
+        if not self.heuristic.consistent:
+            raise ValueError(f"{type(self.heuristic).__name__} is not consistent, the external search needs a "
+                             f"consistent heuristic to find an optimal solution")
+        self.directory = directory
+        self.chunk_size = chunk_size
+        grid = goal.grid
+        # Number of bytes of a packed state and of the position of the blank tile, two above 256 cells
+        self.width = (grid.cells * grid.tile_bits + 7) // 8
+        self.blank_width = 1 if grid.cells <= 256 else 2
+        # Number of nodes generated
+        self.N = 1
+        # Number of nodes expanded, duplicates removed, buckets read, runs merged and bytes written
+        self.expanded = 0
+        self.duplicates = 0
+        self.buckets = 0
+        self.merges = 0
+        self.written = 0
+
+    def search(self) -> SearchNode:
+        """
+        Expands the buckets in order until the goal state is read from one of them.
+        :return: The goal node with history (parent nodes) of the path pointing back to the first (initial) node.
+        """
+        self.workdir = tempfile.mkdtemp(prefix="external-", dir=self.directory)
+        self.runs: List[SortedRun] = []
+        self.writers: Dict[Tuple[int, int], BinaryIO] = {}
+        # Buckets that hold records, as (total cost, negated path cost, heuristic)
+        self.pending: List[Tuple[int, int, int]] = []
+        try:
+            h = self.heuristic.calculate(self.initial)
+            self.write(0, h, self.key(self.initial.packed), self.initial.blank, bytes(self.width), NO_ACTION)
+            while self.pending:
+                f, g, h = heapq.heappop(self.pending)
+                if self.expand_bucket(-g, h):
+                    return self.path()
+            raise Exception("No solution found")
+        finally:
+            for writer in self.writers.values():
+                writer.close()
+            for run in self.runs:
+                run.close()
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def key(self, packed: int) -> bytes:
+        """
+        :param packed: The packed representation of a state.
+        :return: The state as fixed-width big-endian bytes, which sort like the packed integers.
+        """
+        return packed.to_bytes(self.width, "big")
+
+    def bucket_path(self, g: int, h: int) -> str:
+        return os.path.join(self.workdir, f"bucket-{g}-{h}.bin")
+
+    def write(self, g: int, h: int, key: bytes, blank: int, parent: bytes, action: int) -> None:
+        """
+        Appends a node to its bucket: the state, the position of its blank tile, its parent state and the action.
+        :param g: The path cost of the node.
+        :param h: The heuristic of the node.
+        :param key: The state.
+        :param blank: The position of the blank tile.
+        :param parent: The parent state.
+        :param action: The value of the action of the node.
+        """
+        writer = self.writers.get((g, h))
+        if writer is None:
+            writer = self.writers[(g, h)] = open(self.bucket_path(g, h), "ab", buffering=BUFFER_SIZE)
+            heapq.heappush(self.pending, (g + h, -g, h))
+        record = key + blank.to_bytes(self.blank_width, "big") + parent + bytes((action,))
+        writer.write(record)
+        self.written += len(record)
+
+    def read_bucket(self, g: int, h: int) -> Iterator[List[bytes]]:
+        """
+        Reads a bucket in chunks and removes its file.
+        :param g: The path cost of the bucket.
+        :param h: The heuristic of the bucket.
+        :return: A generator of the chunks, lists of records.
+        """
+        self.writers.pop((g, h)).close()
+        path = self.bucket_path(g, h)
+        record = 2 * self.width + self.blank_width + 1
+        with open(path, "rb") as file:
+            while True:
+                data = file.read(record * self.chunk_size)
+                if not data:
+                    break
+                yield [data[i:i + record] for i in range(0, len(data), record)]
+        os.remove(path)
+
+    def expand_bucket(self, g: int, h: int) -> bool:
+        """
+        Removes the duplicates of a bucket, stores its new states in the visited set and expands them.
+        :param g: The path cost of the bucket.
+        :param h: The heuristic of the bucket.
+        :return: True if the goal state is in the bucket, it is then stored in the visited set and not expanded.
+        """
+        self.buckets += 1
+        width, blank_end = self.width, self.width + self.blank_width
+        goal = self.key(self.goal.packed)
+        moves = self.goal.grid.moves
+        state_class = self.goal.grid.state
+        update = self.heuristic.update
+        for chunk in self.read_bucket(g, h):
+            chunk.sort()
+            fresh = self.remove_duplicates(chunk)
+            self.add_run(fresh)
+            for record in fresh:
+                key = record[:width]
+                if key == goal:
+                    return True
+                blank = int.from_bytes(record[width:blank_end], "big")
+                state = state_class.from_packed(int.from_bytes(key, "big"), blank)
+                # The move that undoes the action leads back to the parent, which is already visited
+                action = record[-1]
+                undo = UNDO[action] if action != NO_ACTION else None
+                for direction, target in moves[state.blank]:
+                    if direction is undo:
+                        continue
+                    child = state.swap_blank(target)
+                    self.write(g + 1, update(h, state, target), self.key(child.packed), target, key, direction.value)
+                    self.N += 1
+                self.expanded += 1
+        return False
+
+    def remove_duplicates(self, chunk: List[bytes]) -> List[bytes]:
+        """
+        :param chunk: Sorted bucket records.
+        :return: The records of the states that are neither repeated earlier in the chunk nor in the visited set.
+        """
+        width = self.width
+        fresh = []
+        previous = None
+        for record in chunk:
+            key = record[:width]
+            if key == previous:
+                self.duplicates += 1
+                continue
+            previous = key
+            fresh.append(record)
+        for run in self.runs:
+            if not run.size:
+                continue
+            kept = []
+            low = 0
+            for record in fresh:
+                low, found = run.find(record[:width], low)
+                if found:
+                    self.duplicates += 1
+                else:
+                    kept.append(record)
+            fresh = kept
+        return fresh
+
+    def add_run(self, records: List[bytes]) -> None:
+        """
+        Writes the new states of a chunk as a sorted run of the visited set, without the blank positions, and merges
+        the last runs while the newest is at least as large as the one before it.
+        :param records: Sorted bucket records of new states.
+        """
+        if not records:
+            return
+        width, blank_end = self.width, self.width + self.blank_width
+        path = os.path.join(self.workdir, f"visited-{self.buckets}-{len(self.runs)}-{self.merges}.bin")
+        with open(path, "wb") as file:
+            file.write(b"".join(record[:width] + record[blank_end:] for record in records))
+        self.runs.append(SortedRun(path, width))
+        while len(self.runs) >= 2 and self.runs[-1].size >= self.runs[-2].size:
+            newer, older = self.runs.pop(), self.runs.pop()
+            self.merges += 1
+            path = os.path.join(self.workdir, f"visited-{self.buckets}-{len(self.runs)}-{self.merges}.bin")
+            with open(path, "wb", buffering=BUFFER_SIZE) as file:
+                for record in heapq.merge(older, newer):
+                    file.write(record)
+            for run in (older, newer):
+                run.close()
+                os.remove(run.path)
+            self.runs.append(SortedRun(path, width))
+
+    def path(self) -> SearchNode:
+        """
+        Rebuilds the path from the parents stored in the visited set and links it into a chain of SearchNodes.
+        :return: The goal node with history (parent nodes) of the path pointing back to the first (initial) node.
+        """
+        actions = []
+        key = self.key(self.goal.packed)
+        while True:
+            parent, action = next(entry for entry in (run.parent(key) for run in self.runs) if entry is not None)
+            if action == NO_ACTION:
+                break
+            actions.append(Directions(action))
+            key = parent
+        return SearchNode.replay(self.initial, self.goal, reversed(actions), self.heuristic)
+
+    def statistics(self) -> Dict[str, int]:
+        """
+        :return: The counters of the search: nodes generated (N), expanded and duplicates removed, the numbers of
+        buckets read and runs merged, and the bytes of bucket records written to disk.
+        """
+        return {"generated": self.N, "expanded": self.expanded, "duplicates": self.duplicates,
+                "buckets": self.buckets, "merges": self.merges, "written": self.written}
+
+
+if __name__ == "__main__":
+    # Command line interface that solves puzzle files with the external search and reports the disk traffic.
+    parser = argparse.ArgumentParser(description="Solve puzzles with external-memory A* search.")
+    parser.add_argument("files", nargs="+", help="puzzle files to solve")
+    parser.add_argument("--directory", default=None, help="directory of the working files (default: temporary)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="number of bucket records sorted in memory at once")
+    args = parser.parse_args()
+
+    for filename in args.files:
+        puzzle_initial, puzzle_goal = PuzzleFileIO.read_puzzle_from_file(filename)
+        Solvability.check(puzzle_initial, puzzle_goal)
+        start = time.perf_counter()
+        search = ExternalAStarSearch(puzzle_initial, puzzle_goal, directory=args.directory, chunk_size=args.chunk_size)
+        solution = Solution(search.search(), search.N, search.statistics())
+        print(f"{filename}: d={solution.d} N={solution.N} in {time.perf_counter() - start:.2f}s "
+              f"{search.statistics()}")
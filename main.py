@@ -1,13 +1,27 @@
+# Abc is for the abstract methods of the Heuristic interface.
+from abc import ABC, abstractmethod
+# Array is for the compact columns of the node store, a few bytes per node instead of a Python object.
+from array import array
 # Built-in heapq module to implement priority queue (Min Heap) for the frontier.
 import heapq
 # Enum is for creating enumerations of possible directions in which a tile can move in a 3D puzzle grid.
 from enum import Enum
+# Json is for the streaming format with one puzzle or solution per line.
+import json
+# Random is for the random walks that scramble a state.
+import random
+# Time is for the rate of the search reported to observers.
+import time
 # Typing is for type hints and type safety. As well, it improves readability.
-from typing import List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 
-# Constants for indicating positions within the puzzle grid
-LAST: int = 2  # Used to indicate the last index in a dimension
-FIRST: int = 0  # Used to indicate the first index in a dimension
+# Constant for indicating the first index in a dimension, the last one is the size of the grid minus one
+FIRST: int = 0
+# Size of the default puzzle grid, the 3x3x3 puzzle of the assignment
+SIZE: int = 3
+# Constants for the packed representation of a 3x3x3 state, 5 bits are enough to store any tile from 0 to 26
+TILE_BITS: int = 5
+TILE_MASK: int = (1 << TILE_BITS) - 1
 
 
 class Directions(Enum):
@@ -21,21 +35,74 @@ class Directions(Enum):
 class PuzzleState:
     """
     Represents a state of a sliding puzzle. Each state is defined by the positions of the tiles.
+
+    Internally the state is packed into a single integer, where the tile at position i occupies the bits from
+    i * TILE_BITS to (i + 1) * TILE_BITS. A packed integer is several times smaller than a tuple of 27 integers and it
+    is hashed and compared in one step, which matters when millions of states are stored in the reached hashmap. The
+    position of the blank tile is tracked alongside, so it never has to be searched for.
+
+    PuzzleState itself is the 3x3x3 puzzle, whose hot methods use the module constants directly. Constructing it from
+    the tiles of another size (8 tiles for 2x2x2, 64 for 4x4x4, ...) returns an instance of the CubeState subclass of
+    that size instead, see Grid. The grid of a state holds the tables of its size.
     """
 
+    __slots__ = ("packed", "blank")
+
+    # The Grid of the 3x3x3 puzzle, set once the Grid class is defined
+    grid: "Grid" = None
+
+    def __new__(cls, tiles: List[int] = None) -> "PuzzleState":
+        """
+        Picks the class of the size of the puzzle from the number of tiles.
+        :param tiles: A list of integers representing the tiles in the puzzle.
+        :return: A new uninitialized state.
+        """
+        if cls is PuzzleState and tiles is not None and len(tiles) != cls.grid.cells:
+            cls = Grid.of_cells(len(tiles)).state
+        return object.__new__(cls)
+
     def __init__(self, tiles: List[int]) -> None:
         """
         Initializes a new PuzzleState with a given list of tiles.
         :param tiles: A list of integers representing the tiles in the puzzle.
         """
-        self.tiles: Tuple[int, ...] = tuple(tiles)
+        bits = self.grid.tile_bits
+        packed = 0
+        for i, tile in enumerate(tiles):
+            packed |= tile << (i * bits)
+        self.packed: int = packed
+        self.blank: int = list(tiles).index(0)
+
+    @classmethod
+    def from_packed(cls, packed: int, blank: int) -> "PuzzleState":
+        """
+        Creates a PuzzleState directly from its packed representation, skipping the encoding of the tiles.
+        :param packed: The packed integer representation of the tiles.
+        :param blank: The position of the blank tile.
+        :return: The new PuzzleState.
+        """
+        state = object.__new__(cls)
+        state.packed = packed
+        state.blank = blank
+        return state
+
+    @property
+    def tiles(self) -> Tuple[int, ...]:
+        """
+        Decodes the packed representation back to the tuple of tiles. It is meant for I/O and full evaluations, the
+        hot path of the search works with the packed integer directly.
+        :return: The tiles of the puzzle in order of their positions.
+        """
+        packed = self.packed
+        bits, mask = self.grid.tile_bits, self.grid.tile_mask
+        return tuple((packed >> (i * bits)) & mask for i in range(self.grid.cells))
 
     def __hash__(self) -> int:
         """
         Hashing is used to make the class hashable and to allow it to be used as a key in a dictionary.
         :return: The hash of the PuzzleState.
         """
-        return hash(self.tiles)
+        return hash(self.packed)
 
     def __eq__(self, other: "PuzzleState") -> bool:
         """
@@ -43,58 +110,54 @@ class PuzzleState:
         :param other: The other PuzzleState to compare to.
         :return: True if the two PuzzleStates are equal, False otherwise.
         """
-        return self.tiles == other.tiles
+        return self.packed == other.packed
+
+    def get_tile(self, position: int) -> int:
+        """
+        Gets the value of the tile at the given position without decoding the whole state.
+        :param position: The position in the puzzle grid.
+        :return: The value of the tile at the given position.
+        """
+        return (self.packed >> (position * TILE_BITS)) & TILE_MASK
+
+    def swap_blank(self, target: int) -> "PuzzleState":
+        """
+        Swaps the blank tile with the tile at the target position using bit operations only.
+        :param target: The position to move the blank tile to.
+        :return: A new PuzzleState with the blank tile at the target position.
+        """
+        tile = (self.packed >> (target * TILE_BITS)) & TILE_MASK
+        # Inlined from_packed, this is the hottest constructor of the search
+        state = object.__new__(PuzzleState)
+        state.packed = self.packed + (tile << (self.blank * TILE_BITS)) - (tile << (target * TILE_BITS))
+        state.blank = target
+        return state
 
     def move(self, direction: Directions) -> "PuzzleState":
         """
         Moves the blank tile in the given direction. It does not modify the current PuzzleState, but instead returns
         a new PuzzleState with the blank tile moved in the given direction.
         :param direction: The direction in which to move the blank tile. It must be one of the Directions enum values.
-        :return: A new PuzzleState with the blank tile moved in the given direction.
-        """
-        tiles: List[int] = list(self.tiles)
-        x, y, z = self.get_xyz(0)
-        idx = self.get_position(0)
-
-        # We can move the blank tile in the given direction if the blank tile is not at the edge of the puzzle grid.
-        # The tiles are stored in a 1D list, so we need to calculate the index of the tile in the list.
-        # We can then swap the blank tile with the tile in the calculated index.
-        # If we need to move x direction, we need to swap the blank tile with the tile to the left or right of it, so
-        # we need to subtract or add 1 to the index respectively.
-        # If we need to move y direction, we need to swap the blank tile with the tile above or below it, so we need to
-        # subtract or add 3 to the index respectively.
-        # If we need to move z direction, we need to swap the blank tile with the tile in front of or behind it, so we
-        # need to subtract or add 9 to the index respectively.
-        #
-        # Each time we need to check if the blank tile is at the edge of the puzzle grid, so we need to check if the
-        # x, y, or z coordinate of the blank tile is equal to the first or last index in the dimension. If it is, then
-        # we cannot move the blank tile in that direction and as result we silently fail and return the current state
-        # duplicate.
-        if direction == Directions.W and x != FIRST:
-            tiles[idx], tiles[idx - 1] = tiles[idx - 1], tiles[idx]
-        elif direction == Directions.E and x != LAST:
-            tiles[idx], tiles[idx + 1] = tiles[idx + 1], tiles[idx]
-        elif direction == Directions.N and y != FIRST:
-            tiles[idx], tiles[idx - 3] = tiles[idx - 3], tiles[idx]
-        elif direction == Directions.S and y != LAST:
-            tiles[idx], tiles[idx + 3] = tiles[idx + 3], tiles[idx]
-        elif direction == Directions.U and z != FIRST:
-            tiles[idx], tiles[idx - 9] = tiles[idx - 9], tiles[idx]
-        elif direction == Directions.D and z != LAST:
-            tiles[idx], tiles[idx + 9] = tiles[idx + 9], tiles[idx]
-
-        return PuzzleState(tiles)
+        :return: A new PuzzleState with the blank tile moved in the given direction. If the blank tile is at the edge
+        of the puzzle grid, we silently fail and return the current state duplicate.
+        """
+        target = self.grid.move_targets[self.blank][direction.value]
+        if target is None:
+            return self.from_packed(self.packed, self.blank)
+        return self.swap_blank(target)
 
     def __repr__(self) -> str:
         """
         :return: A string representation of the PuzzleState.
         """
+        tiles = self.tiles
+        n = self.grid.size
         res = ""
-        for i in range(3):
-            for j in range(3):
+        for i in range(n):
+            for j in range(n):
                 line = ""
-                for k in range(3):
-                    line += str(self.tiles[i * 9 + j * 3 + k]) + " "
+                for k in range(n):
+                    line += str(tiles[i * n * n + j * n + k]) + " "
                 res += line.strip() + "\n"
             res += "\n"
         return res.strip()
@@ -105,17 +168,179 @@ class PuzzleState:
         :param value: The value of the tile to get the position of. Blank tile is represented by 0.
         :return: The position of the tile with the given value.
         """
+        if value == 0:
+            return self.blank
         return self.tiles.index(value)
 
     def get_xyz(self, value: int) -> Tuple[int, int, int]:
         """
         Gets the x, y, z coordinates of a tile with specific value in the puzzle grid.
         :param value: The value of the tile to get the coordinates of. Blank tile is represented by 0.
-        :return: The x, y, z coordinates of the tile with the given value. It can be an int from 0 to 2 depending on
-        the position of the tile in the puzzle grid.
+        :return: The x, y, z coordinates of the tile with the given value. It can be an int from 0 to the size of the
+        grid minus one depending on the position of the tile in the puzzle grid.
         """
-        idx = self.get_position(value)
-        return idx % 3, idx // 3 % 3, idx // 9
+        return self.grid.coordinates[self.get_position(value)]
+
+
+class CubeState(PuzzleState):
+    """
+    PuzzleState of a grid of any other size than 3x3x3. The packing and moves read the number of bits per tile from
+    the grid instead of the module constants. Every size has its own subclass, created by Grid, with the grid as a
+    class attribute, so the states do not grow by a reference to their grid.
+    """
+
+    __slots__ = ()
+
+    def get_tile(self, position: int) -> int:
+        return (self.packed >> (position * self.grid.tile_bits)) & self.grid.tile_mask
+
+    def swap_blank(self, target: int) -> "PuzzleState":
+        bits = self.grid.tile_bits
+        tile = (self.packed >> (target * bits)) & self.grid.tile_mask
+        packed = self.packed + (tile << (self.blank * bits)) - (tile << (target * bits))
+        return self.from_packed(packed, target)
+
+    def __reduce__(self):
+        # The subclasses are created at runtime, so a state is pickled as the tiles it is rebuilt from
+        return PuzzleState, (list(self.tiles),)
+
+
+def build_move_table(size: int = SIZE) -> Tuple[Tuple[Tuple[Directions, int], ...], ...]:
+    """
+    Builds the table of legal moves for every position of the blank tile. It is built once per size of the grid, so
+    the search never has to check the borders of the puzzle grid or generate illegal moves.
+
+    The tiles are stored in a 1D layout, so to move the blank tile we need to calculate the index of the tile to swap
+    it with. If we need to move x direction, we need to swap the blank tile with the tile to the left or right of it, so
+    we need to subtract or add 1 to the index respectively. If we need to move y direction, we need to swap the blank
+    tile with the tile above or below it, so we need to subtract or add the size (3) to the index respectively. If we
+    need to move z direction, we need to swap the blank tile with the tile in front of or behind it, so we need to
+    subtract or add the size squared (9) to the index respectively. The move is legal only if the blank tile is not at
+    the edge of the puzzle grid in that dimension.
+    :param size: The number of cells along every dimension of the grid.
+    :return: A tuple where the item at index i holds the (direction, target position) pairs of the blank tile at
+    position i, in the order of the Directions enum.
+    """
+    last = size - 1
+    layer = size * size
+    table = []
+    for idx in range(size ** 3):
+        x, y, z = idx % size, idx // size % size, idx // layer
+        moves = []
+        if y != FIRST:
+            moves.append((Directions.N, idx - size))
+        if y != last:
+            moves.append((Directions.S, idx + size))
+        if x != last:
+            moves.append((Directions.E, idx + 1))
+        if x != FIRST:
+            moves.append((Directions.W, idx - 1))
+        if z != FIRST:
+            moves.append((Directions.U, idx - layer))
+        if z != last:
+            moves.append((Directions.D, idx + layer))
+        table.append(tuple(moves))
+    return tuple(table)
+
+
+class Grid:
+    """
+    Holds the tables of one size of the puzzle grid: the coordinates of every cell, the legal moves of the blank tile
+    and the number of bits per tile of the packed states. The tables are built once per size and shared by all the
+    states, heuristics and searches of that size, which read them from the grid of the goal state.
+    """
+
+    # Grids built so far by size
+    grids: Dict[int, "Grid"] = {}
+
+    def __init__(self, size: int) -> None:
+        """
+        Initializes the tables of a size, use Grid.of to get the shared Grid of a size.
+        :param size: The number of cells along every dimension, at least 2.
+        """
+        if size < 2:
+            raise ValueError(f"The size of the grid must be at least 2, not {size}")
+        self.size = size
+        self.cells = size ** 3
+        # Enough bits for the largest tile, cells - 1
+        self.tile_bits = (self.cells - 1).bit_length()
+        self.tile_mask = (1 << self.tile_bits) - 1
+        self.coordinates: Tuple[Tuple[int, int, int], ...] = tuple(
+            (i % size, i // size % size, i // (size * size)) for i in range(self.cells)
+        )
+        # Legal (direction, target position) pairs for every position of the blank tile
+        self.moves = build_move_table(size)
+        # Target position for every position of the blank tile and every direction value, None if the move is illegal
+        self.move_targets = tuple(tuple(dict(moves).get(d) for d in Directions) for moves in self.moves)
+        # The class of the states of this size, the 3x3x3 puzzle keeps the specialized PuzzleState
+        if size == SIZE:
+            self.state = PuzzleState
+        else:
+            self.state = type(f"CubeState{size}", (CubeState,), {"__slots__": (), "grid": self})
+
+    @staticmethod
+    def of(size: int) -> "Grid":
+        """
+        :param size: The number of cells along every dimension.
+        :return: The shared Grid of the size, built on first use.
+        """
+        grid = Grid.grids.get(size)
+        if grid is None:
+            grid = Grid.grids[size] = Grid(size)
+        return grid
+
+    @staticmethod
+    def of_cells(cells: int) -> "Grid":
+        """
+        :param cells: The number of tiles of a puzzle, the blank tile included.
+        :return: The shared Grid with that number of cells.
+        :raises ValueError: If the number of tiles is not a cube.
+        """
+        size = round(cells ** (1 / 3))
+        if size ** 3 != cells:
+            raise ValueError(f"{cells} tiles do not fill a cube")
+        return Grid.of(size)
+
+
+# The grid of the 3x3x3 puzzle, its tables are also exposed as module constants for the hot paths
+GRID: Grid = Grid.of(SIZE)
+PuzzleState.grid = GRID
+# Legal (direction, target position) pairs for every position of the blank tile
+MOVES: Tuple[Tuple[Tuple[Directions, int], ...], ...] = GRID.moves
+# Target position for every position of the blank tile and every direction value, None if the move is illegal
+MOVE_TARGETS: Tuple[Tuple[int, ...], ...] = GRID.move_targets
+# The direction that undoes the move in the given direction
+OPPOSITE = {
+    Directions.N: Directions.S, Directions.S: Directions.N,
+    Directions.E: Directions.W, Directions.W: Directions.E,
+    Directions.U: Directions.D, Directions.D: Directions.U,
+}
+# The direction that undoes the move by the value of the direction, the last item (index -1) is for no move
+UNDO: Tuple[Optional[Directions], ...] = tuple(OPPOSITE[d] for d in Directions) + (None,)
+
+
+def scramble(initial: PuzzleState, moves: int, seed: int) -> PuzzleState:
+    """
+    Generates a goal state by a random walk of legal moves from the initial state. The walk never undoes its previous
+    move, but it can still come back to a state by a longer cycle, so the optimal depth can be lower than the number
+    of moves.
+    :param initial: The state the walk starts from.
+    :param moves: The number of moves of the walk.
+    :param seed: The seed of the random generator, the same seed always gives the same state.
+    :return: The scrambled state.
+    """
+    rng = random.Random(seed)
+    state, action = initial, None
+    made = 0
+    while made < moves:
+        direction = rng.choice(list(Directions))
+        if direction is OPPOSITE.get(action):
+            continue
+        moved = state.move(direction)
+        # An illegal move returns an equal state, try another direction
+        if moved != state:
+            state, action, made = moved, direction, made + 1
+    return state
 
 
 class ManhattanDistance:
@@ -132,13 +357,196 @@ class ManhattanDistance:
         :param goal: The goal PuzzleState.
         :return: The Manhattan Distance between the two PuzzleStates.
         """
-        distance = 0
-        for i in range(1, 27):
-            t1 = state.get_xyz(i)
-            t2 = goal.get_xyz(i)
-            for j in range(3):
-                distance += abs(t1[j] - t2[j])
-        return distance
+        return ManhattanDistance.calculate_with_table(state, ManhattanDistance.table(goal))
+
+    @staticmethod
+    def table(goal: "PuzzleState") -> List[List[int]]:
+        """
+        Precomputes the distance of every tile from its goal position for every cell of the puzzle grid. The table is
+        built once per goal, so afterward the distance of a tile is a single lookup instead of two index scans.
+        :param goal: The goal PuzzleState.
+        :return: A table where table[tile][position] is the Manhattan distance of the tile placed at the given
+        position from its position in the goal state. The row of the blank tile is all zeros.
+        """
+        coordinates = goal.grid.coordinates
+        cells = len(coordinates)
+        table = [[0] * cells for _ in range(cells)]
+        for tile in range(1, cells):
+            gx, gy, gz = goal.get_xyz(tile)
+            table[tile] = [abs(x - gx) + abs(y - gy) + abs(z - gz) for x, y, z in coordinates]
+        return table
+
+    @staticmethod
+    def calculate_with_table(state: "PuzzleState", table: List[List[int]]) -> int:
+        """
+        Calculates the Manhattan Distance of the state using a table precomputed by ManhattanDistance.table.
+        :param state: The current PuzzleState.
+        :param table: The distance table of the goal state.
+        :return: The Manhattan Distance between the state and the goal the table was built for.
+        """
+        return sum(table[tile][i] for i, tile in enumerate(state.tiles))
+
+    @staticmethod
+    def delta(table: List[List[int]], tile: int, blank: int, target: int) -> int:
+        """
+        Calculates the change of the Manhattan Distance after a single move. Moving the blank tile from blank to target
+        moves the given tile the opposite way (from target to blank), so only the distance of that tile changes.
+        :param table: The distance table of the goal state.
+        :param tile: The value of the tile that is swapped with the blank tile.
+        :param blank: The position of the blank tile before the move.
+        :param target: The position the blank tile is moved to.
+        :return: The difference to add to the heuristic of the parent state.
+        """
+        row = table[tile]
+        return row[blank] - row[target]
+
+
+class Heuristic(ABC):
+    """
+    Interface of the heuristics accepted by the search algorithms. A heuristic is built for one goal state and must be
+    admissible (never overestimate the number of moves to the goal). It supports two ways of evaluation: calculate
+    evaluates a state from scratch, and update evaluates a successor from the heuristic of its parent. Subclasses must
+    implement calculate, they cannot be instantiated otherwise, and should override update when the change of a single
+    move is cheaper to compute.
+
+    A heuristic is consistent if a move never lowers it by more than one. Subclasses declare it with the consistent
+    attribute; searches that do not reopen expanded states (AnytimeAStarSearch) only rely on it when it is declared.
+    """
+
+    # Whether the heuristic is declared consistent, not assumed by default
+    consistent: bool = False
+
+    def __init__(self, goal: "PuzzleState") -> None:
+        """
+        :param goal: The goal PuzzleState the heuristic is built for.
+        """
+        self.goal = goal
+
+    @abstractmethod
+    def calculate(self, state: "PuzzleState") -> int:
+        """
+        Evaluates the state from scratch.
+        :param state: The state to evaluate.
+        :return: The estimated number of moves to reach the goal state.
+        """
+
+    def update(self, h: int, state: "PuzzleState", target: int) -> int:
+        """
+        Evaluates the successor of the state reached by moving the blank tile to the target position.
+        :param h: The heuristic of the state.
+        :param state: The parent state.
+        :param target: The position the blank tile is moved to.
+        :return: The heuristic of the successor.
+        """
+        return self.calculate(state.swap_blank(target))
+
+
+class ManhattanHeuristic(Heuristic):
+    """
+    Manhattan distance heuristic with a distance table built once for the goal. A move changes the distance of only
+    the tile swapped with the blank tile, so update is a constant time table lookup. A move changes the distance by
+    exactly one, so it is consistent.
+    """
+
+    consistent = True
+
+    def __init__(self, goal: "PuzzleState") -> None:
+        super().__init__(goal)
+        self.distances = ManhattanDistance.table(goal)
+
+    def calculate(self, state: "PuzzleState") -> int:
+        return ManhattanDistance.calculate_with_table(state, self.distances)
+
+    def update(self, h: int, state: "PuzzleState", target: int) -> int:
+        return h + ManhattanDistance.delta(self.distances, state.get_tile(target), state.blank, target)
+
+
+class LinearConflict(ManhattanHeuristic):
+    """
+    Linear conflict heuristic for the 3D puzzle grid. Two tiles are in conflict when they are in the same line (row,
+    column or pillar), their goal positions are in that line as well, but their order is reversed. One of them has to
+    leave the line and come back, which costs two moves on top of the Manhattan distance, so the penalty of a line is
+    two moves for each tile that has to leave it for the rest to be in order.
+
+    Unlike the 2D puzzle, the penalties of rows and columns cannot be added up: a tile can leave its row and its column
+    at once by a single move along the third axis. The lines of one axis are disjoint, so their penalties add up, and
+    the heuristic is the Manhattan distance plus the largest total over the three axes. It is more expensive per node
+    than the Manhattan distance, but it expands fewer nodes.
+
+    It is not consistent: a single move can lower the Manhattan distance by one and resolve a conflict of two moves, or
+    switch the axis of the largest penalty.
+    """
+
+    consistent = False
+
+    def __init__(self, goal: "PuzzleState") -> None:
+        super().__init__(goal)
+        n = goal.grid.size
+        # The distance between consecutive positions of the lines of every axis: rows, columns and pillars
+        self.steps: Tuple[int, ...] = (1, n, n * n)
+        # The lines of every axis as tuples of their n positions in increasing order
+        self.axes: List[List[Tuple[int, ...]]] = [
+            [tuple(i + j * step for j in range(n)) for i, (x, y, z) in enumerate(goal.grid.coordinates)
+             if (x, y, z)[axis] == 0]
+            for axis, step in enumerate(self.steps)
+        ]
+        # Goal position of every tile
+        self.goals: List[int] = [0] * goal.grid.cells
+        for cell, tile in enumerate(goal.tiles):
+            self.goals[tile] = cell
+
+    def conflicts(self, cells: Tuple[int, ...], step: int, tiles: Tuple[int, ...]) -> int:
+        """
+        Calculates the penalty of a line, two moves for every tile that has to leave the line.
+        :param cells: The positions of the line in increasing order.
+        :param step: The distance between consecutive positions of the line (1, 3 or 9 in the 3x3x3 grid).
+        :param tiles: The tiles of the state.
+        :return: The penalty of the line.
+        """
+        sequence = []
+        for cell in cells:
+            tile = tiles[cell]
+            # The goal of the tile is in this line if it differs from the first position by a multiple of the step
+            # within the same line
+            offset = self.goals[tile] - cells[0]
+            if tile and 0 <= offset <= (len(cells) - 1) * step and offset % step == 0:
+                sequence.append(offset)
+        if len(sequence) < 2:
+            return 0
+        # The tiles that stay in the line form the longest increasing subsequence, the lines of the 3x3x3 grid hold at
+        # most 3 tiles, which are compared directly
+        if len(sequence) == 2:
+            return 0 if sequence[0] < sequence[1] else 2
+        if len(sequence) == 3:
+            a, b, c = sequence
+            if a < b < c:
+                return 0
+            if a < b or b < c or a < c:
+                return 2
+            return 4
+        longest = [1] * len(sequence)
+        for i in range(len(sequence)):
+            for j in range(i):
+                if sequence[j] < sequence[i] and longest[j] >= longest[i]:
+                    longest[i] = longest[j] + 1
+        return 2 * (len(sequence) - max(longest))
+
+    def calculate(self, state: "PuzzleState") -> int:
+        return super().calculate(state) + self.penalty(state)
+
+    def penalty(self, state: "PuzzleState") -> int:
+        """
+        :param state: The current PuzzleState.
+        :return: The largest total penalty of the lines of one axis.
+        """
+        tiles = state.tiles
+        return max(sum(self.conflicts(cells, step, tiles) for cells in lines)
+                   for lines, step in zip(self.axes, self.steps))
+
+    def update(self, h: int, state: "PuzzleState", target: int) -> int:
+        # The penalty is a maximum over the axes, which cannot be updated from h alone, and recalculating the penalty
+        # of the parent costs more than the Manhattan distance of the successor, so it is evaluated from scratch
+        return self.calculate(state.swap_blank(target))
 
 
 # A node in the search space
@@ -147,20 +555,26 @@ class SearchNode:
     Represents a node in the search space of the A* algorithm.
     Each node contains the current state, a reference to the parent node,
     the action that was taken to reach this state, the path cost, and the total cost.
+    AStarSearch keeps its nodes in a NodeStore and creates SearchNodes only for the path of the solution.
     """
 
+    __slots__ = ("state", "parent", "action", "path_cost", "heuristics", "total_cost")
+
     def __init__(self,
                  state: PuzzleState,
                  goal: PuzzleState,
                  parent=None,
                  action: Directions = None,
                  path_cost: int = 0,
+                 heuristics: int = None,
                  ) -> None:
         self.state = state
         self.parent = parent
         self.action = action
         self.path_cost = path_cost
-        self.heuristics = ManhattanDistance.calculate(state, goal)
+        # The heuristic can be passed in by the search algorithm when it is known incrementally from the parent node,
+        # otherwise it is calculated from scratch.
+        self.heuristics = heuristics if heuristics is not None else ManhattanDistance.calculate(state, goal)
         self.total_cost = self.path_cost + self.heuristics
 
     def __lt__(self, other) -> bool:
@@ -179,62 +593,867 @@ class SearchNode:
         """
         return self.state == other.state
 
+    @staticmethod
+    def replay(initial: PuzzleState, goal: PuzzleState, actions: Iterable[Directions], heuristic) -> "SearchNode":
+        """
+        Replays a sequence of actions from the initial state and links the states into a chain of SearchNodes, so a
+        path known as its actions can be consumed by the Solution class the same way as the result of AStarSearch. The
+        heuristic of every node is updated from its parent.
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param actions: The actions of the path.
+        :param heuristic: The Heuristic of the goal.
+        :return: The goal node with history (parent nodes) of the path pointing back to the first (initial) node.
+        :raises ValueError: If the actions are illegal or do not lead to the goal state.
+        """
+        node = SearchNode(initial, goal, heuristics=heuristic.calculate(initial))
+        move_targets = initial.grid.move_targets
+        for action in actions:
+            target = move_targets[node.state.blank][action.value]
+            if target is None:
+                raise ValueError(f"Illegal action {action.name} after {node.path_cost} actions")
+            h = heuristic.update(node.heuristics, node.state, target)
+            node = SearchNode(node.state.swap_blank(target), goal, node, action, node.path_cost + 1, h)
+        if node.state != goal:
+            raise ValueError("The actions do not lead to the goal state")
+        return node
+
+
+class NodeStore:
+    """
+    Compact storage of the nodes of a search as parallel columns indexed by the node id (struct of arrays). A node is
+    the packed integer of its state, shared with the key of the reached hashmap, and a few bytes in array columns: the
+    position of the blank tile, the id of the parent node, the action as one byte, the path cost, the heuristic and
+    whether it was expanded. That is about 20 bytes per node on top of the packed integer, where a SearchNode with its
+    PuzzleState took about 300, and the path of the solution is rebuilt from the parent ids at the end.
+    """
+
+    # Value of the parent and action columns of the initial node
+    NONE: int = -1
+
+    def __init__(self, grid: "Grid") -> None:
+        """
+        :param grid: The Grid of the size of the puzzle.
+        """
+        self.grid = grid
+        self.states: List[int] = []
+        self.blanks = array("B" if grid.cells <= 256 else "H")
+        self.parents = array("i")
+        self.actions = array("b")
+        self.costs = array("H")
+        self.heuristics = array("H")
+        self.expanded = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def add(self, packed: int, blank: int, parent: int, action: int, path_cost: int, heuristics: int) -> int:
+        """
+        Adds a node to the store.
+        :param packed: The packed representation of the state.
+        :param blank: The position of the blank tile.
+        :param parent: The id of the parent node, NodeStore.NONE for the initial node.
+        :param action: The value of the Directions that led to the state, NodeStore.NONE for the initial node.
+        :param path_cost: The path cost of the node.
+        :param heuristics: The heuristic of the state.
+        :return: The id of the new node.
+        """
+        self.states.append(packed)
+        self.blanks.append(blank)
+        self.parents.append(parent)
+        self.actions.append(action)
+        self.costs.append(path_cost)
+        self.heuristics.append(heuristics)
+        self.expanded.append(0)
+        return len(self.states) - 1
+
+    def state(self, node_id: int) -> PuzzleState:
+        """
+        :param node_id: The id of the node.
+        :return: The state of the node.
+        """
+        return self.grid.state.from_packed(self.states[node_id], self.blanks[node_id])
+
+    def path(self, node_id: int, goal: PuzzleState) -> SearchNode:
+        """
+        Rebuilds the path that ends in the node by following the parent ids, and links it into a chain of SearchNodes,
+        so the result can be consumed by the Solution class.
+        :param node_id: The id of the last node of the path.
+        :param goal: The goal PuzzleState.
+        :return: The last node with history (parent nodes) of the path pointing back to the first (initial) node.
+        """
+        ids = []
+        while node_id != NodeStore.NONE:
+            ids.append(node_id)
+            node_id = self.parents[node_id]
+        node = None
+        for i in reversed(ids):
+            action = Directions(self.actions[i]) if self.actions[i] != NodeStore.NONE else None
+            node = SearchNode(self.state(i), goal, node, action, self.costs[i], self.heuristics[i])
+        return node
+
+
+class HeapFrontier:
+    """
+    Frontier of the A* search implemented as a priority queue (Min Heap) provided by python's heapq module. A node is
+    pushed as a single integer key that holds its total cost, its heuristic and its id, in that order of significance,
+    so the heap compares plain integers. Among the nodes with the lowest total cost the one with the lowest heuristic
+    is popped first, and among those the oldest one.
+    """
+
+    # Bits of the key below the heuristic and below the total cost. Keys of total costs below 4096 fit in 60 bits, the
+    # two digits of a small Python integer.
+    ID_BITS: int = 32
+    H_BITS: int = ID_BITS + 16
+    ID_MASK: int = (1 << ID_BITS) - 1
+
+    def __init__(self) -> None:
+        self.heap: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def push(self, node_id: int, total_cost: int, heuristics: int) -> None:
+        """
+        Adds a node to the frontier.
+        :param node_id: The id of the node in the NodeStore.
+        :param total_cost: The total cost of the node.
+        :param heuristics: The heuristic of the node.
+        """
+        heapq.heappush(self.heap, (total_cost << HeapFrontier.H_BITS) | (heuristics << HeapFrontier.ID_BITS) | node_id)
+
+    def pop(self) -> int:
+        """
+        Removes the node with the lowest total cost from the frontier.
+        :return: The id of the removed node.
+        """
+        return heapq.heappop(self.heap) & HeapFrontier.ID_MASK
+
+
+class BucketFrontier:
+    """
+    Frontier of the A* search implemented as buckets indexed by the total cost and, within a total cost, by the
+    heuristic. Total costs and heuristics are small integers, so both push and pop take constant time (amortized) and
+    no keys are compared. Among the nodes with the lowest total cost the one with the lowest heuristic is popped
+    first, and among those the most recently pushed one (LIFO). That breaks the ties of the large plateaus of equal
+    total cost towards the nodes that are the deepest and closest to the goal, so fewer nodes are expanded.
+    """
+
+    def __init__(self) -> None:
+        # buckets[f][h] is the stack of the ids of the nodes with the total cost f and the heuristic h
+        self.buckets: List[List[List[int]]] = []
+        # For every total cost the lowest heuristic that might have a non-empty stack
+        self.lowest: List[int] = []
+        # The lowest total cost that might have a non-empty bucket
+        self.f = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def push(self, node_id: int, total_cost: int, heuristics: int) -> None:
+        """
+        Adds a node to the frontier.
+        :param node_id: The id of the node in the NodeStore.
+        :param total_cost: The total cost of the node.
+        :param heuristics: The heuristic of the node.
+        """
+        f, h = total_cost, heuristics
+        while len(self.buckets) <= f:
+            self.buckets.append([])
+            self.lowest.append(0)
+        bucket = self.buckets[f]
+        while len(bucket) <= h:
+            bucket.append([])
+        bucket[h].append(node_id)
+        if h < self.lowest[f]:
+            self.lowest[f] = h
+        # The total cost of a successor can be lower than the one of its parent if the heuristic is not consistent
+        if f < self.f:
+            self.f = f
+        self.count += 1
+
+    def pop(self) -> int:
+        """
+        Removes the node with the lowest total cost, and the lowest heuristic among them, from the frontier.
+        :return: The id of the removed node.
+        """
+        while True:
+            bucket = self.buckets[self.f]
+            h = self.lowest[self.f]
+            while h < len(bucket) and not bucket[h]:
+                h += 1
+            self.lowest[self.f] = h
+            if h < len(bucket):
+                self.count -= 1
+                return bucket[h].pop()
+            self.f += 1
+
+
+class SearchAborted(Exception):
+    """
+    Raised by the search when its observer asks to stop it.
+    """
+
+
+class SearchMetrics:
+    """
+    Snapshot of the progress of a running search, passed to the SearchObserver.
+    """
+
+    def __init__(self,
+                 expanded: int,
+                 generated: int,
+                 frontier: int,
+                 reached: int,
+                 best_f: int,
+                 elapsed: float,
+                 ) -> None:
+        """
+        :param expanded: The number of nodes expanded so far.
+        :param generated: The number of nodes generated so far (N).
+        :param frontier: The number of entries in the frontier, stale ones included.
+        :param reached: The number of reached states.
+        :param best_f: The total cost of the last expanded node, the lower bound of the solution depth.
+        :param elapsed: The wall time since the start of the search in seconds.
+        """
+        self.expanded = expanded
+        self.generated = generated
+        self.frontier = frontier
+        self.reached = reached
+        self.best_f = best_f
+        self.elapsed = elapsed
+        self.nodes_per_second = generated / elapsed if elapsed > 0 else 0.0
+        # Approximate memory of the search, about 70 bytes per node (packed integer and NodeStore columns), 70 bytes
+        # per entry of the reached hashmap (its node id included) and 40 bytes per integer key of the frontier
+        self.memory = (generated + reached) * 70 + frontier * 40
+
+    def __repr__(self) -> str:
+        return (f"expanded={self.expanded} generated={self.generated} frontier={self.frontier} "
+                f"reached={self.reached} f={self.best_f} {self.nodes_per_second:.0f} nodes/s "
+                f"~{self.memory / 2 ** 20:.0f} MB after {self.elapsed:.1f}s")
+
+
+class SearchObserver:
+    """
+    Base class of the observers of a search. The search calls progress every `interval` expansions and finished once
+    it terminates, either way. Override them to feed the metrics to a monitoring system; progress can return True to
+    abort a runaway search, which then raises SearchAborted. Without an observer the search pays for one integer
+    comparison per expansion.
+    """
+
+    def __init__(self, interval: int = 10000) -> None:
+        """
+        :param interval: The number of expansions between two calls of progress.
+        """
+        self.interval = interval
+
+    def progress(self, metrics: SearchMetrics) -> bool:
+        """
+        Called every `interval` expansions.
+        :param metrics: The progress of the search.
+        :return: True to abort the search, False to let it continue.
+        """
+        return False
+
+    def finished(self, metrics: SearchMetrics) -> None:
+        """
+        Called once when the search terminates, whether it found a solution, failed or was aborted.
+        :param metrics: The final progress of the search.
+        """
+
 
 class AStarSearch:
     """
     Implements the A* search algorithm for finding the shortest path to the goal state in a 3D puzzle.
     """
 
-    def __init__(self, initial: PuzzleState, goal: PuzzleState) -> None:
+    def __init__(self,
+                 initial: PuzzleState,
+                 goal: PuzzleState,
+                 heuristic=None,
+                 frontier=HeapFrontier,
+                 observer: SearchObserver = None,
+                 perimeter=None,
+                 ) -> None:
+        """
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param heuristic: The Heuristic built for the same goal, ManhattanHeuristic by default.
+        :param frontier: The class of the frontier, HeapFrontier by default or BucketFrontier.
+        :param observer: Optional SearchObserver notified of the progress of the search.
+        :param perimeter: Optional Perimeter of the goal (see perimeter.py). The heuristic is then exact on the
+        perimeter, and the search stops at the first state of the perimeter it expands and appends the stored moves
+        from there to the goal.
+        """
         # Initial and goal states
         self.initial = initial
         self.goal = goal
-        # Number of nodes expanded
+        self.heuristic = heuristic if heuristic is not None else ManhattanHeuristic(goal)
+        self.perimeter = perimeter
+        if perimeter is not None:
+            self.heuristic = perimeter.heuristic(self.heuristic)
+        self.frontier = frontier
+        self.observer = observer
+        # Legal moves of the size of the puzzle
+        self.moves = goal.grid.moves
+        # Number of nodes generated
         self.N = 1
+        # Number of nodes expanded, closed states re-opened, duplicates pruned and stale frontier entries skipped
+        self.expanded = 0
+        self.reopened = 0
+        self.pruned = 0
+        self.stale = 0
 
     def search(self) -> SearchNode:
         """
         Modified Best First Search algorithm to find the shortest path to the goal state in a 3D puzzle. Using a
-        priority queue (Min Heap) to store the nodes in the frontier, the algorithm expands the node with the lowest
-        total cost. The total cost is the sum of the path cost and the heuristic cost. The heuristic cost is the
-        Manhattan distance between the current state and the goal state. The path cost is the number of actions taken
-        to reach the current state from the initial state. The algorithm terminates when the goal state is reached or
-        when the frontier is empty. If the frontier is empty, then there is no solution to the puzzle, which results in
-        an exception being thrown.
+        priority queue (Min Heap by default, see HeapFrontier) to store the nodes in the frontier, the algorithm
+        expands the node with the lowest total cost. The total cost is the sum of the path cost and the heuristic cost.
+        The heuristic cost is the Manhattan distance between the current state and the goal state by default. The path
+        cost is the number of actions taken to reach the current state from the initial state. The algorithm
+        terminates when the goal state is reached or when the frontier is empty. If the frontier is empty, then there
+        is no solution to the puzzle, which results in an exception being thrown.
+
+        The nodes are kept in a NodeStore and the frontier and the reached hashmap refer to them by their ids. The
+        reached hashmap holds the best node (lowest path cost) found for every state. When a shorter path to a state is
+        found, the new node replaces the old one, which stays in the frontier as a stale entry and is skipped when it
+        is popped (lazy deletion). A state whose best node was expanded is closed; it is expanded again (re-opened) only
+        if a shorter path to it is found, which never happens with a consistent heuristic.
         :return: The goal node with history (parent nodes) of the path pointing back to the first (initial) node.
         """
-        goal = SearchNode(self.goal, self.goal)
-        node = SearchNode(self.initial, self.goal)
-        frontier = [node]
-        reached = {self.initial: node}
+        store = self.store = NodeStore(self.goal.grid)
+        h = self.heuristic.calculate(self.initial)
+        node = store.add(self.initial.packed, self.initial.blank, NodeStore.NONE, NodeStore.NONE, 0, h)
+        frontier = self.frontier()
+        frontier.push(node, h, h)
+        # Reached states are keyed by their packed integers and hold the id of their best node
+        reached = {self.initial.packed: node}
+        # The states the search stops at: the goal, or every state of the perimeter
+        targets = self.perimeter.distances if self.perimeter is not None else {self.goal.packed: 0}
+        observer = self.observer
+        # The number of expanded nodes at which the observer is called next, never reached without an observer
+        report_at = observer.interval if observer is not None else -1
+        start = time.perf_counter()
+        best_f = h
         while len(frontier):
-            node = heapq.heappop(frontier)
-            if node == goal:
-                return node
-            for child in self.expand(node, reached):
-                s = child.state
-                reached[s] = child
-                heapq.heappush(frontier, child)
+            node = frontier.pop()
+            packed = store.states[node]
+            if reached[packed] != node:
+                self.stale += 1
+                continue
+            best_f = store.costs[node] + store.heuristics[node]
+            if packed in targets:
+                if observer is not None:
+                    observer.finished(self.metrics(best_f, frontier, reached, start))
+                return self.complete(store.path(node, self.goal))
+            store.expanded[node] = 1
+            self.expanded += 1
+            if self.expanded == report_at:
+                report_at += observer.interval
+                if observer.progress(self.metrics(best_f, frontier, reached, start)):
+                    observer.finished(self.metrics(best_f, frontier, reached, start))
+                    raise SearchAborted(f"Search aborted by the observer after {self.expanded} expansions")
+            self.expand(node, store, reached, frontier)
+        if observer is not None:
+            observer.finished(self.metrics(best_f, frontier, reached, start))
         raise Exception("No solution found")
 
-    def expand(self, node: SearchNode, reached):
-        """
-        Expands the given node by generating all possible states that can be reached from the current state.
-        Here we yield the nodes and only then the node is considered generated.
-        I moved the check if the state is in reached, so we do not need to check it in the search function and yield
-        the node that is already in reached. Otherwise, we would have to have an additional check (if else condition)
-        in the search function.
-        :param node:  The node to expand.
-        :param reached:  The hashmap of reached states.
-        :return:  A generator of all possible states that can be reached from the current state.
-        """
-        s = node.state
-        for direction in Directions:
-            s_prime = s.move(direction)
-            if s_prime != s and s_prime not in reached:
-                cost = node.path_cost + 1
+    def complete(self, node: SearchNode) -> SearchNode:
+        """
+        :param node: The last node of the path found by the search, the goal or a state of the perimeter.
+        :return: The goal node, reached by appending the moves stored in the perimeter to the path.
+        """
+        if self.perimeter is None:
+            return node
+        for direction in self.perimeter.suffix(node.state):
+            state = node.state.move(direction)
+            node = SearchNode(state, self.goal, node, direction, node.path_cost + 1, self.heuristic.calculate(state))
+        return node
+
+    def metrics(self, best_f: int, frontier, reached: dict, start: float) -> SearchMetrics:
+        """
+        :param best_f: The total cost of the last popped node.
+        :param frontier: The frontier of the search.
+        :param reached: The hashmap of reached states.
+        :param start: The time the search started at, from time.perf_counter.
+        :return: A snapshot of the progress of the search for the observer.
+        """
+        return SearchMetrics(self.expanded, self.N, len(frontier), len(reached), best_f, time.perf_counter() - start)
+
+    def expand(self, node: int, store: NodeStore, reached: Dict[int, int], frontier) -> None:
+        """
+        Expands the given node by generating all possible states that can be reached from the current state. Every
+        child is added to the store, the reached hashmap and the frontier right away, so the loop needs no generator
+        or intermediate objects. A state that is already reached is generated again only if the new path to it is
+        shorter, otherwise it is counted as a pruned duplicate.
+        :param node: The id of the node to expand.
+        :param store: The NodeStore of the search.
+        :param reached: The hashmap of reached states.
+        :param frontier: The frontier of the search.
+        """
+        s = store.state(node)
+        h = store.heuristics[node]
+        update = self.heuristic.update
+        cost = store.costs[node] + 1
+        # The move that undoes the action of the parent leads back to the parent, which is always already reached
+        undo = UNDO[store.actions[node]]
+        costs = store.costs
+        for direction, target in self.moves[s.blank]:
+            if direction is undo:
+                continue
+            s_prime = s.swap_blank(target)
+            existing = reached.get(s_prime.packed)
+            if existing is not None:
+                if costs[existing] <= cost:
+                    self.pruned += 1
+                    continue
+                if store.expanded[existing]:
+                    self.reopened += 1
+            h_prime = update(h, s, target)
+            self.N += 1
+            child = store.add(s_prime.packed, target, node, direction.value, cost, h_prime)
+            reached[s_prime.packed] = child
+            frontier.push(child, cost + h_prime, h_prime)
+
+    def statistics(self) -> Dict[str, int]:
+        """
+        :return: The counters of the search: nodes generated (N), expanded, re-opened, duplicates pruned at generation
+        and stale frontier entries skipped.
+        """
+        return {"generated": self.N, "expanded": self.expanded, "reopened": self.reopened, "pruned": self.pruned,
+                "stale": self.stale}
+
+
+class IDAStarSearch:
+    """
+    Implements the Iterative Deepening A* (IDA*) search algorithm. It finds the same optimal solutions as AStarSearch,
+    but it keeps only the current path in memory instead of every generated node, so the memory usage is linear in the
+    depth of the solution at the cost of regenerating the shallow part of the tree on every iteration.
+    """
+
+    def __init__(self, initial: PuzzleState, goal: PuzzleState, heuristic=None) -> None:
+        """
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param heuristic: The Heuristic built for the same goal, ManhattanHeuristic by default.
+        """
+        # Initial and goal states
+        self.initial = initial
+        self.goal = goal
+        self.heuristic = heuristic if heuristic is not None else ManhattanHeuristic(goal)
+        # Tables of the size of the puzzle, the states are handled in their packed form
+        self.moves = goal.grid.moves
+        self.tile_bits = goal.grid.tile_bits
+        self.tile_mask = goal.grid.tile_mask
+        # Number of nodes generated and expanded over all iterations
+        self.N = 1
+        self.expanded = 0
+        # Actions along the current path, the only memory that grows during the search
+        self.actions: List[Directions] = []
+
+    def search(self) -> SearchNode:
+        """
+        Runs a series of depth-first searches, each bounded by the total cost f = g + h. A branch is cut as soon as its
+        total cost exceeds the bound, and the smallest total cost that exceeded it becomes the bound of the next
+        iteration. Since the heuristic is admissible, the first time the goal state is reached the path is optimal.
+        Children are tried in order of their heuristic (most promising first) and the move that undoes the parent
+        action is never generated.
+        :return: The goal node with history (parent nodes) of the path pointing back to the first (initial) node.
+        """
+        h = self.heuristic.calculate(self.initial)
+        bound = h
+        while True:
+            self.actions = []
+            t = self.depth_first(self.initial.packed, self.initial.blank, 0, h, None, bound)
+            if t < 0:
+                return SearchNode.replay(self.initial, self.goal, self.actions, self.heuristic)
+            if t == float("inf"):
+                raise Exception("No solution found")
+            bound = t
+
+    def depth_first(self, packed: int, blank: int, g: int, h: int, action: Directions, bound: int) -> float:
+        """
+        Bounded depth-first search from the given state. The state is passed around in its packed form, so no
+        PuzzleState or SearchNode objects are created until the solution is found.
+        :param packed: The packed representation of the current state.
+        :param blank: The position of the blank tile in the current state.
+        :param g: The path cost of the current state.
+        :param h: The heuristic of the current state.
+        :param action: The action that led to the current state, None for the initial state.
+        :param bound: The total cost bound of the current iteration.
+        :return: -1 if the goal state was found, otherwise the smallest total cost that exceeded the bound.
+        """
+        f = g + h
+        if f > bound:
+            return f
+        if packed == self.goal.packed:
+            return -1
+        undo = OPPOSITE.get(action)
+        update = self.heuristic.update
+        bits, mask = self.tile_bits, self.tile_mask
+        state = self.goal.from_packed(packed, blank)
+        children = []
+        for direction, target in self.moves[blank]:
+            if direction is undo:
+                continue
+            tile = (packed >> (target * bits)) & mask
+            children.append((update(h, state, target) - h, direction, target, tile))
+        self.N += len(children)
+        self.expanded += 1
+        # Move ordering: the stable sort keeps the Directions order for children with the same heuristic
+        children.sort(key=lambda child: child[0])
+        minimum = float("inf")
+        for delta, direction, target, tile in children:
+            child = packed + (tile << (blank * bits)) - (tile << (target * bits))
+            self.actions.append(direction)
+            t = self.depth_first(child, target, g + 1, h + delta, direction, bound)
+            if t < 0:
+                return t
+            self.actions.pop()
+            minimum = min(minimum, t)
+        return minimum
+
+    def statistics(self) -> Dict[str, int]:
+        """
+        :return: The counters of the search over all iterations: nodes generated (N) and expanded.
+        """
+        return {"generated": self.N, "expanded": self.expanded}
+
+
+class BidirectionalAStarSearch:
+    """
+    Implements a bidirectional front-to-end A* search. One search runs forward from the initial state towards the goal
+    state and another one runs backward from the goal state towards the initial state, which is possible because every
+    move can be undone. Each search uses its own heuristic towards the opposite end. When the two searches meet, the
+    forward half-path and the reversed backward half-path are joined into one path.
+    """
+
+    def __init__(self,
+                 initial: PuzzleState,
+                 goal: PuzzleState,
+                 heuristic: Heuristic = None,
+                 backward_heuristic: Heuristic = None,
+                 ) -> None:
+        """
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param heuristic: The Heuristic of the forward search built for the goal, ManhattanHeuristic by default.
+        :param backward_heuristic: The Heuristic of the backward search built for the initial state,
+        ManhattanHeuristic by default.
+        """
+        # Initial and goal states
+        self.initial = initial
+        self.goal = goal
+        self.heuristic = heuristic if heuristic is not None else ManhattanHeuristic(goal)
+        self.backward_heuristic = backward_heuristic if backward_heuristic is not None else ManhattanHeuristic(initial)
+        # Tables of the size of the puzzle
+        self.grid = goal.grid
+        # Number of nodes generated by both searches, the two start nodes included
+        self.N = 2
+        # Number of nodes expanded, closed states re-opened, duplicates pruned and stale frontier entries skipped
+        self.expanded = 0
+        self.reopened = 0
+        self.pruned = 0
+        self.stale = 0
+
+    def search(self) -> SearchNode:
+        """
+        Alternates between the two searches, always expanding the one with the smaller frontier. Both searches keep the
+        best known path cost (g) of every reached state and reopen a state when a shorter path to it is found; stale
+        entries of the frontiers are skipped when they are popped. Every time a search generates a state that was
+        reached by the other one, the two paths are joined and the cost of the best joined path is kept.
+
+        The search stops when the best joined path is not longer than the smallest total cost in either frontier.
+        Since both heuristics are admissible, the smallest total cost in a frontier is a lower bound of any path that
+        has not been found yet, so at that point the best joined path is optimal.
+        :return: The goal node with history (parent nodes) of the path pointing back to the first (initial) node.
+        """
+        # For every direction the frontier of (total cost, tie breaker, path cost, packed state) entries and the
+        # records of reached states: packed state -> (path cost, heuristic, parent packed state, action, state)
+        h = self.heuristic.calculate(self.initial)
+        forward = {self.initial.packed: (0, h, None, None, self.initial)}
+        forward_frontier = [(h, 0, 0, self.initial.packed)]
+        h = self.backward_heuristic.calculate(self.goal)
+        backward = {self.goal.packed: (0, h, None, None, self.goal)}
+        backward_frontier = [(h, 0, 0, self.goal.packed)]
+
+        forward_closed, backward_closed = set(), set()
+        best = float("inf")
+        meeting = None
+        if self.initial == self.goal:
+            best, meeting = 0, self.initial.packed
+        counter = 0
+        while forward_frontier and backward_frontier:
+            if best <= max(forward_frontier[0][0], backward_frontier[0][0]):
+                break
+            if len(forward_frontier) <= len(backward_frontier):
+                frontier, reached, closed, other = forward_frontier, forward, forward_closed, backward
+                heuristic = self.heuristic
+            else:
+                frontier, reached, closed, other = backward_frontier, backward, backward_closed, forward
+                heuristic = self.backward_heuristic
+            _, _, entry_cost, packed = heapq.heappop(frontier)
+            g, h, _, action, state = reached[packed]
+            # Skip the stale entry if a shorter path to the state was found after it had been pushed
+            if g < entry_cost:
+                self.stale += 1
+                continue
+            closed.add(packed)
+            self.expanded += 1
+            undo = OPPOSITE.get(action)
+            for direction, target in self.grid.moves[state.blank]:
+                if direction is undo:
+                    continue
+                child = state.swap_blank(target)
+                record = reached.get(child.packed)
+                if record is not None:
+                    if record[0] <= g + 1:
+                        self.pruned += 1
+                        continue
+                    if child.packed in closed:
+                        closed.discard(child.packed)
+                        self.reopened += 1
+                h_child = heuristic.update(h, state, target)
+                reached[child.packed] = (g + 1, h_child, packed, direction, child)
+                counter += 1
                 self.N += 1
-                yield SearchNode(s_prime, self.goal, node, direction, cost)
+                heapq.heappush(frontier, (g + 1 + h_child, counter, g + 1, child.packed))
+                match = other.get(child.packed)
+                if match is not None and g + 1 + match[0] < best:
+                    best, meeting = g + 1 + match[0], child.packed
+
+        if meeting is None:
+            raise Exception("No solution found")
+        return self.build_path(forward, backward, meeting)
+
+    def statistics(self) -> Dict[str, int]:
+        """
+        :return: The counters of both searches together, see AStarSearch.statistics.
+        """
+        return {"generated": self.N, "expanded": self.expanded, "reopened": self.reopened, "pruned": self.pruned,
+                "stale": self.stale}
+
+    def build_path(self, forward: dict, backward: dict, meeting: int) -> SearchNode:
+        """
+        Joins the forward half-path from the initial state to the meeting state with the backward half-path from the
+        meeting state to the goal state, and links them into a chain of SearchNodes, so the result can be consumed by
+        the Solution class the same way as the result of AStarSearch.
+        :param forward: The records of the states reached by the forward search.
+        :param backward: The records of the states reached by the backward search.
+        :param meeting: The packed state where the best joined path crosses from one search to the other.
+        :return: The goal node with history (parent nodes) of the path pointing back to the first (initial) node.
+        """
+        actions = []
+        packed = meeting
+        while forward[packed][2] is not None:
+            actions.insert(0, forward[packed][3])
+            packed = forward[packed][2]
+        packed = meeting
+        # The backward search moved from the goal towards the meeting state, so its actions are undone in reverse
+        while backward[packed][2] is not None:
+            actions.append(OPPOSITE[backward[packed][3]])
+            packed = backward[packed][2]
+        return SearchNode.replay(self.initial, self.goal, actions, self.heuristic)
+
+
+class AnytimeAStarSearch:
+    """
+    Implements Anytime Repairing A* (ARA*). It runs a series of weighted A* searches that order the frontier by
+    g + weight * h. A weight above 1 finds a solution of at most weight times the optimal cost much faster, and every
+    following search lowers the weight and reuses the work of the previous ones, so the solution improves over time
+    until the weight is 1 and the solution is optimal, or until the time or node budget runs out. Every solution comes
+    with a proven suboptimality bound: its cost divided by a lower bound of the optimal cost.
+
+    The weight bounds the solutions of the searches that do not reopen states only if the heuristic is consistent (see
+    Heuristic.consistent). With any other admissible heuristic, the bound comes from the lower bound alone, and the
+    last search, at weight 1, reopens the states whose path cost is lowered, so its solution is still optimal.
+    """
+
+    def __init__(self,
+                 initial: PuzzleState,
+                 goal: PuzzleState,
+                 heuristic: Heuristic = None,
+                 weight: float = 3.0,
+                 step: float = 0.5,
+                 time_limit: float = None,
+                 node_limit: int = None,
+                 observer: SearchObserver = None,
+                 ) -> None:
+        """
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param heuristic: The Heuristic built for the same goal, ManhattanHeuristic by default.
+        :param weight: The weight of the heuristic in the first search, at least 1.
+        :param step: The amount the weight is lowered by after every search.
+        :param time_limit: The wall time budget in seconds, no limit by default.
+        :param node_limit: The budget of generated nodes, no limit by default. The nodes are kept in a NodeStore, so
+        it bounds the memory of the search as well.
+        :param observer: Optional SearchObserver notified of the progress of the search. Returning True from its
+        progress ends the search like an exhausted budget: the best solution so far is returned.
+        """
+        # Initial and goal states
+        self.initial = initial
+        self.goal = goal
+        self.heuristic = heuristic if heuristic is not None else ManhattanHeuristic(goal)
+        self.weight = weight
+        self.step = step
+        self.time_limit = time_limit
+        self.node_limit = node_limit
+        self.observer = observer
+        # Legal moves of the size of the puzzle
+        self.moves = goal.grid.moves
+        # Number of nodes generated, expanded, duplicates pruned, stale frontier entries skipped and searches run
+        self.N = 1
+        self.expanded = 0
+        self.pruned = 0
+        self.stale = 0
+        self.iterations = 0
+        # Cost of the best solution found so far and its suboptimality bound, infinite before the first solution
+        self.cost = float("inf")
+        self.bound = float("inf")
+
+    def search(self) -> SearchNode:
+        """
+        Runs the searches until the solution is optimal or the budget runs out.
+        :return: The goal node of the best solution found, with history (parent nodes) of the path pointing back to
+        the first (initial) node. Its suboptimality bound is in self.bound.
+        :raises SearchAborted: If the budget runs out before any solution is found.
+        """
+        result = None
+        for result in self.solutions():
+            pass
+        if result is None:
+            raise SearchAborted(f"Budget exhausted after {self.N} nodes before a solution was found")
+        return result
+
+    def solutions(self) -> Iterator[SearchNode]:
+        """
+        Runs the searches and yields every improved solution as soon as the search that found it ends, so a caller can
+        use the first answer right away and keep consuming better ones while there is time.
+
+        As in ARA*, every search expands a state at most once. A state whose path cost is lowered after it has been
+        expanded in the current search is put aside (inconsistent) and goes back to the frontier for the next search,
+        except in the search at weight 1 with a heuristic that is not declared consistent, which reopens it at once.
+        A search ends when the cost of the best solution is not above the smallest weighted total cost in the
+        frontier. The smallest g + h over the frontier and the inconsistent states is a lower bound of the optimal
+        cost, which gives the suboptimality bound.
+        :return: A generator of the goal nodes of the improved solutions, with self.cost and self.bound set before each
+        one is yielded.
+        :raises Exception: If the goal state cannot be reached.
+        """
+        store = self.store = NodeStore(self.goal.grid)
+        h = self.heuristic.calculate(self.initial)
+        root = store.add(self.initial.packed, self.initial.blank, NodeStore.NONE, NodeStore.NONE, 0, h)
+        reached = {self.initial.packed: root}
+        # Frontier of (weighted total cost, heuristic, node id) and the ids of the inconsistent nodes
+        frontier = [(self.weight * h, h, root)]
+        inconsistent: List[int] = []
+        goal = self.goal.packed
+        best = root if self.initial == self.goal else None
+        deadline = time.perf_counter() + self.time_limit if self.time_limit is not None else None
+        weight = self.weight
+        update = self.heuristic.update
+        costs, heuristics = store.costs, store.heuristics
+        exhausted = False
+        # The goal node of the last yielded solution
+        published = None
+        observer = self.observer
+        # The number of expanded nodes at which the observer is called next, never reached without an observer
+        report_at = observer.interval if observer is not None else -1
+        start = time.perf_counter()
+
+        consistent = self.heuristic.consistent
+
+        while True:
+            self.iterations += 1
+            closed = set()
+            # Without a consistent heuristic, the last search is plain A*, which reopens states
+            reopen = weight <= 1 and not consistent
+            while frontier and (best is None or costs[best] > frontier[0][0]):
+                _, h, node = heapq.heappop(frontier)
+                packed = store.states[node]
+                if reached[packed] != node:
+                    self.stale += 1
+                    continue
+                if packed == goal:
+                    continue
+                closed.add(packed)
+                self.expanded += 1
+                if self.expanded == report_at:
+                    report_at += observer.interval
+                    metrics = SearchMetrics(self.expanded, self.N, len(frontier), len(reached), costs[node] + h,
+                                            time.perf_counter() - start)
+                    exhausted = observer.progress(metrics)
+                if exhausted or self.node_limit is not None and self.N >= self.node_limit or \
+                        deadline is not None and self.expanded & 255 == 0 and time.perf_counter() >= deadline:
+                    exhausted = True
+                    # The node was not expanded, it stays in the frontier for the lower bound
+                    heapq.heappush(frontier, (0, h, node))
+                    break
+                s = store.state(node)
+                cost = costs[node] + 1
+                undo = UNDO[store.actions[node]]
+                for direction, target in self.moves[s.blank]:
+                    if direction is undo:
+                        continue
+                    s_prime = s.swap_blank(target)
+                    existing = reached.get(s_prime.packed)
+                    if existing is not None and costs[existing] <= cost:
+                        self.pruned += 1
+                        continue
+                    h_prime = update(h, s, target)
+                    self.N += 1
+                    child = store.add(s_prime.packed, target, node, direction.value, cost, h_prime)
+                    reached[s_prime.packed] = child
+                    if s_prime.packed == goal:
+                        best = child
+                    if s_prime.packed in closed and not reopen:
+                        inconsistent.append(child)
+                    else:
+                        heapq.heappush(frontier, (cost + weight * h_prime, h_prime, child))
+
+            # The nodes of the frontier and the inconsistent ones that are still the best of their states
+            pending = {node for _, _, node in frontier if reached[store.states[node]] == node}
+            pending.update(node for node in inconsistent if reached[store.states[node]] == node)
+            if best is not None:
+                # The bound of an unchanged solution can still tighten as the lower bound rises. The weight bounds
+                # the solution only if the search ended normally, not when the budget cut it short, and if the
+                # heuristic is consistent or the search reopened states.
+                self.cost = costs[best]
+                lower = min((costs[node] + heuristics[node] for node in pending), default=self.cost)
+                bound = min(self.bound, self.cost / lower if lower else 1.0)
+                if not exhausted and (consistent or reopen):
+                    bound = min(bound, weight)
+                self.bound = max(1.0, bound)
+                if best != published:
+                    published = best
+                    yield store.path(best, self.goal)
+            last = exhausted or weight <= 1 or not pending
+            if last and observer is not None:
+                observer.finished(SearchMetrics(self.expanded, self.N, len(frontier), len(reached),
+                                                min((costs[n] + heuristics[n] for n in pending), default=0),
+                                                time.perf_counter() - start))
+            if best is None and not pending and not exhausted:
+                raise Exception("No solution found")
+            if last:
+                # A complete search at weight 1 is optimal, since it reopened states if the heuristic is not
+                # consistent, and so is one that left nothing to expand
+                if not exhausted and best is not None:
+                    self.bound = 1.0
+                return
+            weight = max(1.0, weight - self.step)
+            frontier = [(costs[node] + weight * heuristics[node], heuristics[node], node) for node in pending]
+            heapq.heapify(frontier)
+            inconsistent = []
+
+    def statistics(self) -> Dict[str, float]:
+        """
+        :return: The counters of the search: nodes generated (N), expanded, duplicates pruned, stale frontier entries
+        skipped and searches run, and the suboptimality bound of the returned solution.
+        """
+        return {"generated": self.N, "expanded": self.expanded, "pruned": self.pruned, "stale": self.stale,
+                "iterations": self.iterations, "bound": self.bound}
 
 
 class Solution:
@@ -243,19 +1462,22 @@ class Solution:
     the number of nodes expanded, the sequence of actions taken, and the costs associated with each action.
     """
 
-    def __init__(self, result: SearchNode, nodes_generated: int) -> None:
+    def __init__(self, result: SearchNode, nodes_generated: int, statistics: Dict[str, int] = None) -> None:
         """
         Initializes a new Solution with the given result node and the number of nodes expanded.
         :param result: The result node.
         :param nodes_generated: As result node does not contain the number of nodes expanded, we need to pass it as a
         parameter. This was my decision, since in my understanding responsibility for keeping track is in the search
         algorithm, not in the node by itself.
+        :param statistics: Optional counters of the search algorithm, see AStarSearch.statistics. They are not part of
+        the string representation, which is specified by the assignment.
         """
         self.result = result
 
         # Depth of the solution (shallowest node since A* search is used)
         self.d = self.get_depth(result)
         self.N = nodes_generated
+        self.statistics = statistics if statistics is not None else {"generated": nodes_generated}
         # Sequence of actions taken
         self.actions = self.get_actions()
         # Costs associated with each action
@@ -309,6 +1531,44 @@ class Solution:
             cur = cur.parent
         return costs
 
+    @staticmethod
+    def from_actions(initial: PuzzleState,
+                     goal: PuzzleState,
+                     actions: List[str],
+                     nodes_generated: int,
+                     heuristic: Heuristic = None,
+                     statistics: Dict[str, int] = None,
+                     ) -> "Solution":
+        """
+        Rebuilds a Solution from a known sequence of actions, for example a cached one, by replaying them from the
+        initial state into a chain of SearchNodes.
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param actions: The sequence of actions, as in Solution.actions.
+        :param nodes_generated: The number of nodes generated by the search that found the actions.
+        :param heuristic: The Heuristic of the goal the costs are calculated with, ManhattanHeuristic by default.
+        :param statistics: Optional counters of the search that found the actions.
+        :return: The Solution.
+        :raises ValueError: If the actions are illegal or do not lead to the goal state.
+        """
+        heuristic = heuristic if heuristic is not None else ManhattanHeuristic(goal)
+        node = SearchNode.replay(initial, goal, (Directions[name] for name in actions), heuristic)
+        return Solution(node, nodes_generated, statistics)
+
+    def to_dict(self) -> dict:
+        """
+        :return: A JSON serializable representation of the Solution, used by the streaming format.
+        """
+        return {
+            "initial": list(self.initial.tiles),
+            "goal": list(self.goal.tiles),
+            "d": self.d,
+            "N": self.N,
+            "actions": self.actions,
+            "costs": self.costs,
+            "statistics": self.statistics,
+        }
+
     def __repr__(self) -> str:
         """
         :return: A string representation of the Solution. As specified in the assignment. Also used to save in file.
@@ -345,13 +1605,36 @@ class PuzzleFileIO:
 
     @staticmethod
     def read_puzzle_from_file(filename: str) -> Tuple[PuzzleState, PuzzleState]:
+        """
+        Reads a puzzle in the text format of the assignment: the tiles of the initial state followed by the tiles of
+        the goal state. A puzzle of another size than 3x3x3 declares its size as the first number of the file, for
+        example 4 followed by 2 * 64 tiles. A file without the size holds a 3x3x3 puzzle.
+        :param filename: The name of the file with the puzzle.
+        :return: The initial and goal states.
+        :raises ValueError: If the number of tiles does not match the size, declared or not.
+        """
         with open(filename, "r") as f:
             # It will automatically split by whitespaces and newlines, which is exactly what we want
             blocks = f.read().split()
         # Convert the list of strings to a list of integers for type safety
         blocks = list(map(int, blocks))
+        # Two states always hold an even number of tiles, so an odd count means the size is declared first. It is only
+        # taken as the size if exactly the tiles of two states of that size follow, so a 3x3x3 puzzle with a tile too
+        # many is not read as a puzzle of the size of its first tile.
+        size = SIZE
+        if len(blocks) % 2:
+            size = blocks[0]
+            if size < 2:
+                raise ValueError(f"{filename} declares the size {size} instead of a size of at least 2")
+            if len(blocks) - 1 != 2 * size ** 3:
+                raise ValueError(f"{filename} holds {len(blocks) - 1} tiles after the size {size} instead of "
+                                 f"{2 * size ** 3}")
+            blocks.pop(0)
+        cells = Grid.of(size).cells
+        if len(blocks) != 2 * cells:
+            raise ValueError(f"{filename} holds {len(blocks)} tiles instead of {2 * cells} for the size {size}")
         # Return the initial and goal states
-        return PuzzleState(blocks[:27]), PuzzleState(blocks[27:])
+        return PuzzleState(blocks[:cells]), PuzzleState(blocks[cells:])
 
     @staticmethod
     def write_solution_to_file(filename: str, solution: Solution) -> None:
@@ -359,19 +1642,247 @@ class PuzzleFileIO:
             # Use the __repr__ method of the Solution class to get the string representation of the solution.
             f.write(str(solution))
 
+    @staticmethod
+    def read_puzzles(filename: str) -> Iterator[Tuple[str, Optional[PuzzleState], Optional[PuzzleState],
+                                                      Optional[Exception]]]:
+        """
+        Reads puzzles lazily, so a file of any size is read in constant memory. Files with the .jsonl extension hold
+        one JSON object per line, {"id": ..., "initial": [27 tiles], "goal": [27 tiles]}, where the id is optional and
+        defaults to the line number. The size of the grid follows from the number of tiles (8, 27, 64, ...). Any other
+        file is read as a single puzzle in the text format of the assignment, see read_puzzle_from_file, with the
+        filename as its id. A line or a file that cannot be read does not stop the others, it is yielded with the error
+        instead of the states.
+        :param filename: The name of the file with the puzzles.
+        :return: A generator of (id, initial state, goal state, None) of every puzzle, or (id, None, None, error) of
+        every puzzle that could not be read.
+        """
+        if not filename.endswith(".jsonl"):
+            try:
+                yield (filename, *PuzzleFileIO.read_puzzle_from_file(filename), None)
+            except Exception as e:
+                yield filename, None, None, e
+            return
+        try:
+            f = open(filename, "r")
+        except OSError as e:
+            yield filename, None, None, e
+            return
+        with f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                puzzle_id = str(number)
+                try:
+                    puzzle = json.loads(line)
+                    if isinstance(puzzle, dict):
+                        puzzle_id = str(puzzle.get("id", number))
+                    states = PuzzleState(puzzle["initial"]), PuzzleState(puzzle["goal"])
+                except Exception as e:
+                    yield puzzle_id, None, None, e
+                    continue
+                yield (puzzle_id, *states, None)
 
-def solve(filename: str) -> Solution:
+
+class SolutionWriter:
+    """
+    Writes solutions incrementally to a file in the streaming format, one JSON object per line. The file is flushed
+    every `flush_every` solutions, so the results written so far survive a crash and can be consumed while the rest is
+    being solved.
+    """
+
+    def __init__(self, filename: str, flush_every: int = 100) -> None:
+        """
+        :param filename: The name of the output file, it is overwritten.
+        :param flush_every: The number of solutions written between two flushes.
+        """
+        self.file: TextIO = open(filename, "w")
+        self.flush_every = flush_every
+        self.written = 0
+
+    @staticmethod
+    def record(puzzle_id, solution: Optional[Solution] = None, error: Optional[str] = None) -> dict:
+        """
+        :param puzzle_id: The id of the puzzle.
+        :param solution: The solution, None if the puzzle failed.
+        :param error: The description of the failure, None if the puzzle was solved.
+        :return: The JSON serializable record of the streaming format: the id, the fields of Solution.to_dict and the
+        error, if any.
+        """
+        record = {"id": puzzle_id}
+        if solution is not None:
+            record.update(solution.to_dict())
+        if error is not None:
+            record["error"] = error
+        return record
+
+    def write(self, puzzle_id: str, solution: Optional[Solution] = None, error: Optional[str] = None) -> None:
+        """
+        Writes the solution of a puzzle, or the error that prevented it.
+        :param puzzle_id: The id of the puzzle.
+        :param solution: The solution, None if the puzzle failed.
+        :param error: The description of the failure, None if the puzzle was solved.
+        """
+        self.file.write(json.dumps(SolutionWriter.record(puzzle_id, solution, error)) + "\n")
+        self.written += 1
+        if self.written % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "SolutionWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+class UnsolvablePuzzleError(Exception):
+    """
+    Raised when the goal state cannot be reached from the initial state, before any search is started.
+    """
+
+
+class Solvability:
+    """
+    Provides a method to check whether the goal state can be reached from the initial state without searching.
+
+    Every move swaps the blank tile with a neighbour, so it flips the parity of the permutation of the 27 positions
+    (blank tile included) and moves the blank tile by one step. Hence the permutation that turns the initial state into
+    the goal state has the same parity as the Manhattan distance the blank tile has to travel, for every reachable
+    goal. The 3x3x3 grid, like the grid of any size from 2x2x2 up, is a 2-connected bipartite graph that is not a
+    cycle, and for such graphs every arrangement that satisfies this condition is reachable, so the condition is also
+    sufficient.
+    """
+
+    @staticmethod
+    def validate(initial: PuzzleState, goal: PuzzleState) -> None:
+        """
+        Rejects a puzzle that is not well formed, whatever its parity.
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :raises ValueError: If the states have grids of different sizes, or if a state does not hold every tile of its
+        grid exactly once.
+        """
+        if initial.grid is not goal.grid:
+            raise ValueError(f"The initial state has size {initial.grid.size} and the goal state {goal.grid.size}")
+        cells = goal.grid.cells
+        for name, state in (("initial", initial), ("goal", goal)):
+            if sorted(state.tiles) != list(range(cells)):
+                raise ValueError(f"The {name} state does not hold every tile from 0 to {cells - 1} exactly once")
+
+    @staticmethod
+    def is_solvable(initial: PuzzleState, goal: PuzzleState) -> bool:
+        """
+        Checks whether the goal state can be reached from the initial state in time linear in the number of tiles.
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :return: True if the puzzle can be solved, False otherwise.
+        :raises ValueError: If the puzzle is not well formed, see validate.
+        """
+        Solvability.validate(initial, goal)
+        cells = goal.grid.cells
+        tiles, goal_tiles = initial.tiles, goal.tiles
+        goal_positions = [0] * cells
+        for i, tile in enumerate(goal_tiles):
+            goal_positions[tile] = i
+        # The permutation maps every position to the goal position of its tile, its parity is the parity of the number
+        # of positions minus the number of cycles
+        permutation = [goal_positions[tile] for tile in tiles]
+        visited = [False] * cells
+        cycles = 0
+        for i in range(cells):
+            if not visited[i]:
+                cycles += 1
+                while not visited[i]:
+                    visited[i] = True
+                    i = permutation[i]
+        a, b = goal.grid.coordinates[initial.blank], goal.grid.coordinates[goal.blank]
+        blank_distance = abs(a[0] - b[0]) + abs(a[1] - b[1]) + abs(a[2] - b[2])
+        return (cells - cycles) % 2 == blank_distance % 2
+
+    @staticmethod
+    def check(initial: PuzzleState, goal: PuzzleState) -> None:
+        """
+        Rejects a puzzle that cannot be solved.
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :raises ValueError: If the puzzle is not well formed, see validate.
+        :raises UnsolvablePuzzleError: If the goal state cannot be reached from the initial state.
+        """
+        if not Solvability.is_solvable(initial, goal):
+            raise UnsolvablePuzzleError("The goal state cannot be reached from the initial state")
+
+
+def solve(filename: str, algorithm=AStarSearch, heuristic=ManhattanHeuristic) -> Solution:
     """
     Main usability function since it combines all the steps of solving the puzzle and makes the process simpler.
     After we can print or save our solution to the file since it will return the Solution class dedicated to serve
     this purpose.
     :param filename:  The name of the file with the puzzle.
+    :param algorithm:  The search algorithm class to use, AStarSearch by default. IDAStarSearch can be used instead
+    when the puzzle is too hard to keep all generated nodes in memory.
+    :param heuristic:  A callable that builds the Heuristic for the goal of the puzzle, ManhattanHeuristic by default.
+    It can be a Heuristic class, like LinearConflict, or a loader, like PatternDatabase.load.
     :return:  The solution to the puzzle.
+    :raises ValueError: If the puzzle is not well formed, such as a tile that appears twice.
+    :raises UnsolvablePuzzleError: If the puzzle cannot be solved, which is detected before the search starts.
     """
     initial, goal = PuzzleFileIO.read_puzzle_from_file(filename)
-    a_star = AStarSearch(initial, goal)
-    result = a_star.search()
-    return Solution(result, a_star.N)
+    return solve_puzzle(initial, goal, algorithm, heuristic)
+
+
+def solve_puzzle(initial: PuzzleState,
+                 goal: PuzzleState,
+                 algorithm=AStarSearch,
+                 heuristic=ManhattanHeuristic,
+                 ) -> Solution:
+    """
+    Solves a puzzle given by its states instead of a file, see solve.
+    :param initial:  The initial PuzzleState.
+    :param goal:  The goal PuzzleState.
+    :param algorithm:  The search algorithm class, see solve.
+    :param heuristic:  The heuristic builder, see solve.
+    :return:  The solution to the puzzle.
+    :raises ValueError: If the puzzle is not well formed, see Solvability.validate.
+    :raises UnsolvablePuzzleError: If the puzzle cannot be solved, which is detected before the search starts.
+    """
+    Solvability.check(initial, goal)
+    search = algorithm(initial, goal, heuristic(goal))
+    result = search.search()
+    return Solution(result, search.N, search.statistics())
+
+
+def solve_stream(input_filename: str,
+                 output_filename: str,
+                 algorithm=AStarSearch,
+                 heuristic=ManhattanHeuristic,
+                 flush_every: int = 100,
+                 ) -> Tuple[int, int]:
+    """
+    Solves every puzzle of the input file one by one and writes the solutions to the output file as they are found,
+    so the memory used does not depend on the number of puzzles. See PuzzleFileIO.read_puzzles for the input formats
+    and SolutionWriter for the output format. A puzzle that cannot be read or solved is written with its error and the
+    rest go on.
+    :param input_filename:  The name of the file with the puzzles.
+    :param output_filename:  The name of the file to write the solutions to.
+    :param algorithm:  The search algorithm class, see solve.
+    :param heuristic:  The heuristic builder, see solve.
+    :param flush_every:  The number of solutions written between two flushes of the output file.
+    :return:  The numbers of solved and failed puzzles.
+    """
+    solved = failed = 0
+    with SolutionWriter(output_filename, flush_every) as writer:
+        for puzzle_id, initial, goal, error in PuzzleFileIO.read_puzzles(input_filename):
+            try:
+                if error is not None:
+                    raise error
+                writer.write(puzzle_id, solve_puzzle(initial, goal, algorithm, heuristic))
+                solved += 1
+            except Exception as e:
+                writer.write(puzzle_id, error=f"{type(e).__name__}: {e}")
+                failed += 1
+    return solved, failed
 
 
 if __name__ == "__main__":
@@ -0,0 +1,394 @@
+# Argparse is for the command line interface that measures the speedup.
+import argparse
+# Heapq is for the local frontier of every worker.
+import heapq
+# Multiprocessing is for the worker processes and the queues between them.
+import multiprocessing
+# Os is for the default number of workers and for noticing that the coordinator died.
+import os
+# Queue is for the timeout of the coordinator while it waits for the workers.
+import queue
+# Random is for the seeds of the generated instances of the command line interface.
+import random
+# Time is for the pause between two termination waves and for measuring the speedup.
+import time
+# Typing is for type hints and type safety. As well, it improves readability.
+from typing import Dict, List, Optional, Tuple
+
+from main import (UNDO, AStarSearch, Directions, ManhattanHeuristic, NodeStore, PuzzleFileIO, PuzzleState, SearchNode,
+                  scramble)
+
+# Maximum number of nodes in one batch sent to another worker
+BATCH_SIZE: int = 128
+# Number of expansions of a worker between two reads of its inbox
+EXPANSIONS_PER_ROUND: int = 256
+# Pause of the coordinator between two termination waves while some worker is busy, in seconds
+WAVE_PAUSE: float = 0.002
+# Time the coordinator waits for a message before it checks that the workers are alive, and an idle worker before it
+# checks that the coordinator is, in seconds
+LIVENESS_TIMEOUT: float = 1.0
+# Path cost of the incumbent before any solution is found
+INFINITY: int = 1 << 30
+
+
+def owner(packed: int, workers: int) -> int:
+    """
+    :param packed: The packed representation of a state.
+    :param workers: The number of workers.
+    :return: The worker that owns the state: its reached entry and its frontier entries live in that worker only.
+    """
+    return hash(packed) % workers
+
+
+def run_worker(index: int,
+               workers: int,
+               goal: PuzzleState,
+               heuristic,
+               inboxes: list,
+               results: multiprocessing.Queue,
+               ) -> None:
+    """
+    The loop of one worker of ParallelAStarSearch. The worker owns the states of its hash partition: for every one of
+    them it keeps the best path cost with the parent state and the action, and its frontier holds only them. It
+    expands its frontier in rounds and sends every successor to the worker that owns it, in batches. Between two
+    rounds it reads its inbox:
+
+    - ("nodes", batch): successors sent by another worker, as (packed, blank, path cost, heuristic, parent, action).
+    - ("bound", cost): the path cost of the best solution found so far by any worker.
+    - ("probe", wave): a termination wave, answered with ("status", index, wave, idle, sent, received).
+    - ("trace", packed): answered with ("parent", packed, parent, action) to rebuild the path of the solution.
+    - ("stop",): answered with ("done", index, counters), then the worker exits.
+
+    A worker is idle when no node of its frontier can lead to a better solution than the best one found so far, that
+    is no node has a total cost below it. An idle worker waits for its inbox.
+    :param index: The index of the worker.
+    :param workers: The number of workers.
+    :param goal: The goal PuzzleState.
+    :param heuristic: The heuristic, it must be consistent for the solution to be optimal.
+    :param inboxes: The inboxes of all workers.
+    :param results: The queue of messages to the coordinator.
+    """
+    inbox = inboxes[index]
+    coordinator = os.getppid()
+    moves = goal.grid.moves
+    state_class = goal.grid.state
+    update = heuristic.update
+    goal_packed = goal.packed
+    # Best path cost, parent state and action of every owned state
+    reached: Dict[int, Tuple[int, Optional[int], int]] = {}
+    frontier: List[Tuple[int, int, int, int, int, int]] = []
+    outgoing: List[list] = [[] for _ in range(workers)]
+    bound = INFINITY
+    sequence = 0
+    # Numbers of batches sent to and received from other workers, for the termination waves
+    sent = received = 0
+    generated = expanded = pruned = reopened = 0
+
+    def accept(batch) -> None:
+        nonlocal bound, sequence, generated, pruned, reopened
+        for packed, blank, cost, h, parent, action in batch:
+            known = reached.get(packed)
+            if known is not None:
+                if known[0] <= cost:
+                    pruned += 1
+                    continue
+                reopened += 1
+            generated += 1
+            reached[packed] = (cost, parent, action)
+            if packed == goal_packed:
+                # The goal is detected at generation, it is never expanded
+                if cost < bound:
+                    bound = cost
+                    results.put(("goal", index, cost))
+                    for destination, other in enumerate(inboxes):
+                        if destination != index:
+                            other.put(("bound", cost))
+                continue
+            sequence += 1
+            heapq.heappush(frontier, (cost + h, h, sequence, packed, blank, cost))
+
+    def flush(destination: int) -> None:
+        nonlocal sent
+        inboxes[destination].put(("nodes", outgoing[destination]))
+        outgoing[destination] = []
+        sent += 1
+
+    while True:
+        # A coordinator that was killed, like a batch task out of time, never sends stop; its workers are then adopted
+        # by another process
+        if os.getppid() != coordinator:
+            return
+        idle = not frontier or frontier[0][0] >= bound
+        try:
+            message = inbox.get(timeout=LIVENESS_TIMEOUT) if idle else inbox.get_nowait()
+        except queue.Empty:
+            message = None
+        while message is not None:
+            kind = message[0]
+            if kind == "nodes":
+                received += 1
+                accept(message[1])
+            elif kind == "bound":
+                bound = min(bound, message[1])
+            elif kind == "probe":
+                idle = not frontier or frontier[0][0] >= bound
+                results.put(("status", index, message[1], idle, sent, received))
+            elif kind == "trace":
+                cost, parent, action = reached[message[1]]
+                results.put(("parent", message[1], parent, action))
+            elif kind == "stop":
+                results.put(("done", index, {"generated": generated, "expanded": expanded, "pruned": pruned,
+                                             "reopened": reopened, "sent": sent}))
+                return
+            try:
+                message = inbox.get_nowait()
+            except queue.Empty:
+                message = None
+
+        for _ in range(EXPANSIONS_PER_ROUND):
+            if not frontier or frontier[0][0] >= bound:
+                break
+            f, h, _, packed, blank, cost = heapq.heappop(frontier)
+            known_cost, _, action = reached[packed]
+            if known_cost != cost:
+                continue
+            expanded += 1
+            state = state_class.from_packed(packed, blank)
+            # The move that undoes the action of the parent leads back to the parent, which is always already reached
+            undo = UNDO[action]
+            for direction, target in moves[blank]:
+                if direction is undo:
+                    continue
+                child = state.swap_blank(target)
+                h_prime = update(h, state, target)
+                node = (child.packed, target, cost + 1, h_prime, packed, direction.value)
+                destination = owner(child.packed, workers)
+                if destination == index:
+                    accept((node,))
+                else:
+                    outgoing[destination].append(node)
+                    if len(outgoing[destination]) >= BATCH_SIZE:
+                        flush(destination)
+        for destination in range(workers):
+            if outgoing[destination]:
+                flush(destination)
+
+
+class ParallelAStarSearch:
+    """
+    Implements a hash distributed A* search (HDA*) over worker processes. Every state is owned by one worker, chosen by
+    the hash of its packed representation; the owner alone keeps its reached entry and its frontier entries, so the
+    workers share nothing and exchange successors in batches through queues. Every worker expands its own frontier in
+    the order of total cost, so the nodes are not expanded in the global A* order and a state can be re-opened when a
+    shorter path to it arrives later.
+
+    The goal is detected when it is generated and the best path cost found so far (the incumbent) is broadcast to all
+    workers. A worker is idle when none of its nodes has a total cost below the incumbent. The coordinator detects
+    termination with waves of probes: the search is over when two consecutive waves find every worker idle and the
+    same number of batches sent as received, which proves that no batch is in flight. At that point no node anywhere
+    can lead to a shorter path, so with a consistent heuristic the incumbent is optimal. The path is rebuilt by asking
+    the owner of every state on it for its parent.
+    """
+
+    def __init__(self, initial: PuzzleState, goal: PuzzleState, heuristic=None, workers: int = None) -> None:
+        """
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param heuristic: Optional heuristic, the Manhattan distance by default. It is passed to the workers, which
+        are forked, so its tables are shared instead of built again.
+        :param workers: The number of worker processes, the number of CPUs by default.
+        """
+        self.initial = initial
+        self.goal = goal
+        self.heuristic = heuristic if heuristic is not None else ManhattanHeuristic(goal)
+        self.workers = workers or os.cpu_count() or 1
+        # Number of nodes generated, the initial node included
+        self.N = 1
+        # Counters summed over the workers, and the numbers of termination waves and of batches exchanged
+        self.counters: Dict[str, int] = {}
+        self.waves = 0
+
+    def search(self) -> SearchNode:
+        """
+        Runs the workers until termination is detected and rebuilds the path of the best solution.
+        :return: The goal node with history (parent nodes) of the path pointing back to the first (initial) node.
+        """
+        inboxes = [multiprocessing.Queue() for _ in range(self.workers)]
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=run_worker,
+                                             args=(i, self.workers, self.goal, self.heuristic, inboxes, results),
+                                             daemon=True)
+                     for i in range(self.workers)]
+        for process in processes:
+            process.start()
+        try:
+            h = self.heuristic.calculate(self.initial)
+            root = (self.initial.packed, self.initial.blank, 0, h, None, NodeStore.NONE)
+            inboxes[owner(self.initial.packed, self.workers)].put(("nodes", [root]))
+            cost = self.wait(inboxes, results, processes)
+            if cost == INFINITY:
+                raise Exception("No solution found")
+            actions = self.trace(inboxes, results, processes)
+            for inbox in inboxes:
+                inbox.put(("stop",))
+            self.collect(results, processes)
+        finally:
+            for process in processes:
+                process.join(LIVENESS_TIMEOUT)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+        return SearchNode.replay(self.initial, self.goal, actions, self.heuristic)
+
+    def receive(self, results: multiprocessing.Queue, processes: list) -> tuple:
+        """
+        :param results: The queue of messages to the coordinator.
+        :param processes: The worker processes.
+        :return: The next message to the coordinator.
+        :raises RuntimeError: If a worker process died, the search could never terminate.
+        """
+        while True:
+            try:
+                return results.get(timeout=LIVENESS_TIMEOUT)
+            except queue.Empty:
+                if not all(process.is_alive() for process in processes):
+                    raise RuntimeError("A worker of the parallel search died")
+
+    def wait(self, inboxes: list, results: multiprocessing.Queue, processes: list) -> int:
+        """
+        Relays the incumbent to the workers and runs termination waves until two consecutive ones find every worker
+        idle with as many batches received as sent, counting the batch of the initial node as sent.
+        :param inboxes: The inboxes of the workers.
+        :param results: The queue of messages to the coordinator.
+        :param processes: The worker processes.
+        :return: The path cost of the optimal solution, INFINITY if there is none.
+        """
+        incumbent = INFINITY
+        previous = None
+        replies: Dict[int, Tuple[bool, int, int]] = {}
+        for inbox in inboxes:
+            inbox.put(("probe", self.waves))
+        while True:
+            message = self.receive(results, processes)
+            if message[0] == "goal":
+                if message[2] < incumbent:
+                    incumbent = message[2]
+                    for inbox in inboxes:
+                        inbox.put(("bound", incumbent))
+            elif message[0] == "status" and message[2] == self.waves:
+                replies[message[1]] = message[3:]
+                if len(replies) < self.workers:
+                    continue
+                idle = all(reply[0] for reply in replies.values())
+                sent = 1 + sum(reply[1] for reply in replies.values())
+                received = sum(reply[2] for reply in replies.values())
+                current = (sent, received) if idle and sent == received else None
+                if current is not None and current == previous:
+                    return incumbent
+                previous = current
+                replies = {}
+                self.waves += 1
+                if not idle:
+                    time.sleep(WAVE_PAUSE)
+                for inbox in inboxes:
+                    inbox.put(("probe", self.waves))
+
+    def trace(self, inboxes: list, results: multiprocessing.Queue, processes: list) -> List[Directions]:
+        """
+        Rebuilds the actions of the solution by following the parents from the goal, asking the owner of every state.
+        :param inboxes: The inboxes of the workers.
+        :param results: The queue of messages to the coordinator.
+        :param processes: The worker processes.
+        :return: The actions from the initial state to the goal.
+        """
+        actions = []
+        packed = self.goal.packed
+        while packed != self.initial.packed:
+            inboxes[owner(packed, self.workers)].put(("trace", packed))
+            message = self.receive(results, processes)
+            while message[0] != "parent":
+                message = self.receive(results, processes)
+            packed = message[2]
+            actions.append(Directions(message[3]))
+        actions.reverse()
+        return actions
+
+    def collect(self, results: multiprocessing.Queue, processes: list) -> None:
+        """
+        Sums the counters of the stopped workers.
+        :param results: The queue of messages to the coordinator.
+        :param processes: The worker processes.
+        """
+        done = 0
+        self.counters = {}
+        while done < self.workers:
+            message = self.receive(results, processes)
+            if message[0] != "done":
+                continue
+            done += 1
+            for name, value in message[2].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+        self.N = self.counters["generated"]
+
+    def statistics(self) -> Dict[str, int]:
+        """
+        :return: The counters of the search summed over the workers: nodes generated (N), expanded, re-opened and
+        duplicates pruned, and the numbers of batches exchanged, termination waves and workers.
+        """
+        return {"generated": self.N, "expanded": self.counters.get("expanded", 0),
+                "reopened": self.counters.get("reopened", 0), "pruned": self.counters.get("pruned", 0),
+                "batches": self.counters.get("sent", 0), "waves": self.waves, "workers": self.workers}
+
+
+def speedup(initial: PuzzleState, goal: PuzzleState, workers: int) -> dict:
+    """
+    Solves a puzzle with AStarSearch and with ParallelAStarSearch and compares them.
+    :param initial: The initial PuzzleState.
+    :param goal: The goal PuzzleState.
+    :param workers: The number of workers of the parallel search.
+    :return: The depths, the N and the wall times of both searches and the speedup of the parallel one.
+    """
+    start = time.perf_counter()
+    sequential = AStarSearch(initial, goal)
+    depth = sequential.search().path_cost
+    sequential_time = time.perf_counter() - start
+    nodes = sequential.N
+    # Frees the nodes of the sequential search before the workers are forked
+    del sequential
+    start = time.perf_counter()
+    parallel = ParallelAStarSearch(initial, goal, workers=workers)
+    parallel_depth = parallel.search().path_cost
+    parallel_time = time.perf_counter() - start
+    return {"d": depth, "parallel_d": parallel_depth, "N": nodes, "parallel_N": parallel.N,
+            "time": sequential_time, "parallel_time": parallel_time, "speedup": sequential_time / parallel_time}
+
+
+if __name__ == "__main__":
+    # Command line interface that reports the speedup of the parallel search over AStarSearch.
+    parser = argparse.ArgumentParser(description="Compare the parallel A* search with the sequential one.")
+    parser.add_argument("files", nargs="*", help="puzzle files to solve")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--instances", type=int, default=0,
+                        help="number of instances to generate by random walks from the initial state of Input1.txt")
+    parser.add_argument("--moves", type=int, default=40, help="length of the random walks of the generated instances")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generated instances")
+    args = parser.parse_args()
+
+    puzzles = [(filename, *PuzzleFileIO.read_puzzle_from_file(filename)) for filename in args.files]
+    start_state = PuzzleFileIO.read_puzzle_from_file("Input1.txt")[0]
+    rng = random.Random(args.seed)
+    for _ in range(args.instances):
+        instance_seed = rng.getrandbits(32)
+        puzzles.append((f"scramble-{args.moves}-{instance_seed}", start_state,
+                        scramble(start_state, args.moves, instance_seed)))
+    workers = args.workers or os.cpu_count() or 1
+    total = total_parallel = 0.0
+    for name, puzzle_initial, puzzle_goal in puzzles:
+        r = speedup(puzzle_initial, puzzle_goal, workers)
+        total += r["time"]
+        total_parallel += r["parallel_time"]
+        optimal = "" if r["d"] == r["parallel_d"] else f" DEPTH MISMATCH {r['parallel_d']}"
+        print(f"{name}: d={r['d']} N={r['N']} in {r['time']:.2f}s, {workers} workers: N={r['parallel_N']} in "
+              f"{r['parallel_time']:.2f}s, speedup {r['speedup']:.2f}{optimal}")
+    if total_parallel:
+        print(f"total speedup with {workers} workers on {os.cpu_count()} CPUs: {total / total_parallel:.2f}")
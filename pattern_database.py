@@ -0,0 +1,242 @@
+# Argparse is for the command line interface of the table builder.
+import argparse
+# Mmap is for sharing the tables on disk between processes without loading them into the Python heap.
+import mmap
+# Os is for creating the directory of the tables and checking if they exist.
+import os
+# Deque is for the 0-1 breadth first search that builds the tables.
+from collections import deque
+# Typing is for type hints and type safety. As well, it improves readability.
+from typing import List, Sequence, Tuple
+
+from main import SIZE, Grid, Heuristic, PuzzleFileIO, PuzzleState
+
+# Default directory of the table files
+DEFAULT_DIRECTORY: str = "pdb"
+# Default number of tiles in one group. Every extra tile multiplies the size of a table by the number of cells (27)
+# and its build time by about 25, so 3 builds in seconds and 4 in minutes per group of the 3x3x3 puzzle.
+DEFAULT_GROUP_SIZE: int = 3
+# Marker of an abstract state that has not been reached yet while building a table
+UNREACHED: int = 255
+
+
+class PatternDatabase(Heuristic):
+    """
+    Disjoint additive pattern database heuristic for a 3D puzzle.
+
+    The 26 goal cells of the tiles are partitioned into groups. For every group a table holds the exact number of moves
+    of the group's tiles needed to bring them to their goal cells, for every placement of these tiles, ignoring all
+    the other tiles. Since each move moves only one tile, which belongs to exactly one group, the values of the groups
+    can be added up and the sum is still admissible. It is never smaller than the Manhattan distance.
+
+    A table depends only on the goal cells of its group, not on which tiles are in them, so the same files are reused
+    for every goal with the blank tile in the same cell. The tables are stored as flat files with one byte per
+    placement and memory-mapped when loaded, so the startup is fast and processes share the same pages.
+
+    A move changes the value of only the group of the moved tile, by at most one, so the heuristic is consistent.
+    """
+
+    consistent = True
+
+    def __init__(self, goal: PuzzleState, groups: List[Tuple[int, ...]], tables: List[mmap.mmap]) -> None:
+        """
+        Initializes a new PatternDatabase, use PatternDatabase.load to load it from the table files.
+        :param goal: The goal PuzzleState.
+        :param groups: The goal cells of every group.
+        :param tables: The memory-mapped table of every group.
+        """
+        super().__init__(goal)
+        self.groups = groups
+        self.tables = tables
+        grid = goal.grid
+        cells = grid.cells
+        # For every group the tiles of the group with the multiplier of their position in the index of the table
+        tiles = goal.tiles
+        self.patterns: List[Tuple[Tuple[int, int], ...]] = [
+            tuple((tiles[cell], cells ** slot) for slot, cell in enumerate(group)) for group in groups
+        ]
+        # A one in the lowest and in the highest bit of every tile of a packed state, to find a tile with bit operations
+        self.tile_bits, self.tile_mask = grid.tile_bits, grid.tile_mask
+        bits = grid.tile_bits
+        self.low = sum(1 << (i * bits) for i in range(cells))
+        self.high = self.low << (bits - 1)
+        # For every tile its table, its multiplier and the other tiles of its group, every one repeated in all the
+        # positions of a packed state, with its multiplier
+        self.group_of: List[Tuple[mmap.mmap, int, Tuple[Tuple[int, int], ...]]] = [None] * cells
+        for table, pattern in zip(tables, self.patterns):
+            for tile, m in pattern:
+                others = tuple((other * self.low, other_m) for other, other_m in pattern if other != tile)
+                self.group_of[tile] = (table, m, others)
+
+    @staticmethod
+    def partition(goal: PuzzleState, group_size: int = DEFAULT_GROUP_SIZE) -> List[Tuple[int, ...]]:
+        """
+        Partitions the goal cells of the tiles into groups of consecutive cells.
+        :param goal: The goal PuzzleState.
+        :param group_size: The number of tiles in one group, the last group can be smaller.
+        :return: The goal cells of every group.
+        """
+        cells = [i for i in range(goal.grid.cells) if i != goal.blank]
+        return [tuple(cells[i:i + group_size]) for i in range(0, len(cells), group_size)]
+
+    @staticmethod
+    def filename(directory: str, cells: Sequence[int], size: int = SIZE) -> str:
+        """
+        :param directory: The directory of the table files.
+        :param cells: The goal cells of the group.
+        :param size: The size of the puzzle grid, it is part of the name of the other sizes than 3x3x3.
+        :return: The path of the table file of the group.
+        """
+        prefix = "pdb-" if size == SIZE else f"pdb{size}-"
+        return os.path.join(directory, prefix + "-".join(map(str, cells)) + ".bin")
+
+    @staticmethod
+    def build_table(cells: Sequence[int], grid: Grid = Grid.of(SIZE)) -> bytearray:
+        """
+        Builds the table of a group with a 0-1 breadth first search backward from the goal placement. The abstract
+        state is the placement of the group's tiles together with the position of the blank tile. Moving the blank
+        tile into an empty cell costs nothing, since the other tiles are ignored, and moving it into a cell of one of
+        the group's tiles costs one move. The stored value of a placement is the minimum over all blank positions.
+        :param cells: The goal cells of the group.
+        :param grid: The Grid of the size of the puzzle.
+        :return: The table, where the value of a placement with tile i of the group at position p_i is stored at the
+        index sum(p_i * 27 ** i), with the number of cells of the grid instead of 27 for other sizes. Indices of
+        impossible placements (two tiles in one cell) hold UNREACHED.
+        """
+        n = grid.cells
+        moves = grid.moves
+        k = len(cells)
+        size = n ** k
+        distances = bytearray([UNREACHED]) * (size * n)
+        table = bytearray([UNREACHED]) * size
+        multipliers = [n ** slot for slot in range(k)]
+
+        start = sum(cell * m for cell, m in zip(cells, multipliers))
+        queue = deque()
+        for blank in range(n):
+            if blank not in cells:
+                distances[start * n + blank] = 0
+                queue.append((start, blank, 0))
+
+        while queue:
+            index, blank, d = queue.popleft()
+            if d > distances[index * n + blank]:
+                continue
+            if d < table[index]:
+                table[index] = d
+            for _, target in moves[blank]:
+                # Find if a tile of the group occupies the target cell
+                moved = index
+                cost = 0
+                for m in multipliers:
+                    if index // m % n == target:
+                        moved = index + (blank - target) * m
+                        cost = 1
+                        break
+                key = moved * n + target
+                if d + cost < distances[key]:
+                    distances[key] = d + cost
+                    if cost:
+                        queue.append((moved, target, d + 1))
+                    else:
+                        queue.appendleft((moved, target, d))
+        return table
+
+    @staticmethod
+    def build(goal: PuzzleState,
+              directory: str = DEFAULT_DIRECTORY,
+              group_size: int = DEFAULT_GROUP_SIZE) -> List[str]:
+        """
+        Builds the missing tables for the given goal and writes them to the directory.
+        :param goal: The goal PuzzleState.
+        :param directory: The directory of the table files.
+        :param group_size: The number of tiles in one group.
+        :return: The paths of the table files of the goal.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for cells in PatternDatabase.partition(goal, group_size):
+            path = PatternDatabase.filename(directory, cells, goal.grid.size)
+            if not os.path.exists(path):
+                table = PatternDatabase.build_table(cells, goal.grid)
+                # Write to a temporary file first, so a concurrent loader never maps a partially written table
+                with open(path + ".tmp", "wb") as f:
+                    f.write(table)
+                os.replace(path + ".tmp", path)
+            paths.append(path)
+        return paths
+
+    @staticmethod
+    def load(goal: PuzzleState,
+             directory: str = DEFAULT_DIRECTORY,
+             group_size: int = DEFAULT_GROUP_SIZE) -> "PatternDatabase":
+        """
+        Loads the tables of the given goal by memory-mapping the table files.
+        :param goal: The goal PuzzleState.
+        :param directory: The directory of the table files.
+        :param group_size: The number of tiles in one group, it must match the one the tables were built with.
+        :return: The PatternDatabase of the goal.
+        """
+        groups = PatternDatabase.partition(goal, group_size)
+        tables = []
+        for cells in groups:
+            path = PatternDatabase.filename(directory, cells, goal.grid.size)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Pattern database table {path} is missing, build it with "
+                                        f"`python pattern_database.py <puzzle file> --directory {directory}`")
+            with open(path, "rb") as f:
+                tables.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return PatternDatabase(goal, groups, tables)
+
+    def calculate(self, state: PuzzleState) -> int:
+        """
+        Calculates the pattern database heuristic of the state as the sum of the table values of all groups.
+        :param state: The current PuzzleState.
+        :return: The estimated number of moves to reach the goal state.
+        """
+        positions = [0] * self.goal.grid.cells
+        for i, tile in enumerate(state.tiles):
+            positions[tile] = i
+        h = 0
+        for table, pattern in zip(self.tables, self.patterns):
+            h += table[sum(positions[tile] * m for tile, m in pattern)]
+        return h
+
+    def update(self, h: int, state: PuzzleState, target: int) -> int:
+        """
+        Evaluates the successor incrementally. Only the table of the group of the moved tile changes its value, so
+        only the index of that group is calculated, for the placement before and after the move. The positions of the
+        other tiles of the group are found without decoding the state: XOR-ing the packed state with a tile repeated
+        in every position zeroes the position of that tile alone, and subtracting a one from every position borrows
+        first from the lowest zero, which flags it in its highest bit.
+        :param h: The heuristic of the state.
+        :param state: The parent state.
+        :param target: The position the blank tile is moved to.
+        :return: The heuristic of the successor.
+        """
+        packed = state.packed
+        bits = self.tile_bits
+        tile = (packed >> (target * bits)) & self.tile_mask
+        table, multiplier, others = self.group_of[tile]
+        low, high = self.low, self.high
+        index = target * multiplier
+        for repeated, m in others:
+            x = packed ^ repeated
+            zero = (x - low) & ~x & high
+            index += ((zero & -zero).bit_length() - 1) // bits * m
+        # The moved tile goes from the target position to the position of the blank tile
+        moved = index + (state.blank - target) * multiplier
+        return h + table[moved] - table[index]
+
+
+if __name__ == "__main__":
+    # Builder command that writes the tables for the goal states of the given puzzle files.
+    parser = argparse.ArgumentParser(description="Build pattern database tables for the goals of puzzle files.")
+    parser.add_argument("files", nargs="+", help="puzzle files whose goal states the tables are built for")
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY, help="directory of the table files")
+    parser.add_argument("--group-size", type=int, default=DEFAULT_GROUP_SIZE, help="number of tiles in one group")
+    args = parser.parse_args()
+    for file in args.files:
+        _, goal = PuzzleFileIO.read_puzzle_from_file(file)
+        for path in PatternDatabase.build(goal, args.directory, args.group_size):
+            print(path)
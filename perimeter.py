@@ -0,0 +1,263 @@
+# Argparse is for the command line interface of the perimeter builder.
+import argparse
+# Os is for creating the directory of the perimeter files and checking if they exist.
+import os
+# Typing is for type hints and type safety. As well, it improves readability.
+from typing import Dict, List, Optional, Tuple
+
+from main import OPPOSITE, AStarSearch, Directions, Heuristic, PuzzleFileIO, PuzzleState
+
+# Default directory of the perimeter files
+DEFAULT_DIRECTORY: str = "perimeter"
+# Default depth of a perimeter. The number of states grows about three times per level, so a depth of 8 holds tens of
+# thousands of states and builds in a second, a depth of 12 millions.
+DEFAULT_DEPTH: int = 8
+# Move stored for the goal state itself, which has no move left
+NO_MOVE: int = 7
+# Largest depth of a perimeter, a record stores the distance and the move in one byte: distance << 3 | move
+MAX_DEPTH: int = 31
+
+
+class Perimeter:
+    """
+    The perimeter of a goal state: every state within `depth` moves of the goal, with its exact distance to the goal and
+    the move of the blank tile that brings it one step closer. It is built once per goal by a breadth first search
+    from the goal and stored in a file of sorted fixed-width records. Loading a perimeter only checks its file, the
+    records are read on first use, so searches that never reach the perimeter do not pay for it.
+
+    AStarSearch accepts a perimeter: its heuristic is then wrapped by PerimeterHeuristic and the search stops as soon
+    as it expands a state of the perimeter, and appends the stored moves from that state to the goal.
+    """
+
+    def __init__(self, goal: PuzzleState, depth: int, path: str) -> None:
+        """
+        :param goal: The goal PuzzleState.
+        :param depth: The depth of the perimeter.
+        :param path: The path of the perimeter file.
+        """
+        self.goal = goal
+        self.depth = depth
+        self.path = path
+        self.loaded: Optional[Dict[int, int]] = None
+
+    @staticmethod
+    def filename(directory: str, goal: PuzzleState, depth: int) -> str:
+        """
+        :param directory: The directory of the perimeter files.
+        :param goal: The goal PuzzleState.
+        :param depth: The depth of the perimeter.
+        :return: The path of the perimeter file of the goal.
+        """
+        return os.path.join(directory, f"perimeter{goal.grid.size}-{depth}-{goal.packed:x}.bin")
+
+    @staticmethod
+    def width(goal: PuzzleState) -> int:
+        """
+        :param goal: The goal PuzzleState.
+        :return: The number of bytes of a packed state in the perimeter file.
+        """
+        return (goal.grid.cells * goal.grid.tile_bits + 7) // 8
+
+    @staticmethod
+    def build_table(goal: PuzzleState, depth: int) -> Dict[int, int]:
+        """
+        Runs a breadth first search from the goal state to the given depth.
+        :param goal: The goal PuzzleState.
+        :param depth: The depth of the perimeter.
+        :return: The code of every state within the depth by its packed representation: the distance to the goal
+        times 8 plus the value of the move of the blank tile towards the goal.
+        """
+        moves = goal.grid.moves
+        table = {goal.packed: NO_MOVE}
+        layer = [goal]
+        for distance in range(1, depth + 1):
+            next_layer = []
+            for state in layer:
+                for direction, target in moves[state.blank]:
+                    child = state.swap_blank(target)
+                    if child.packed not in table:
+                        # Moving the blank tile back undoes the move, which brings the child one step closer
+                        table[child.packed] = distance << 3 | OPPOSITE[direction].value
+                        next_layer.append(child)
+            layer = next_layer
+        return table
+
+    @staticmethod
+    def build(goal: PuzzleState, directory: str = DEFAULT_DIRECTORY, depth: int = DEFAULT_DEPTH) -> str:
+        """
+        Builds the perimeter of the goal and writes it to its file, sorted by state.
+        :param goal: The goal PuzzleState.
+        :param directory: The directory of the perimeter files.
+        :param depth: The depth of the perimeter, at most MAX_DEPTH.
+        :return: The path of the perimeter file.
+        :raises ValueError: If the depth does not fit in a record.
+        """
+        if not 0 <= depth <= MAX_DEPTH:
+            raise ValueError(f"the depth of a perimeter is between 0 and {MAX_DEPTH}, not {depth}")
+        os.makedirs(directory, exist_ok=True)
+        path = Perimeter.filename(directory, goal, depth)
+        width = Perimeter.width(goal)
+        table = Perimeter.build_table(goal, depth)
+        # Write to a temporary file first, so a concurrent loader never reads a partially written perimeter
+        with open(path + ".tmp", "wb") as f:
+            f.write(b"".join(packed.to_bytes(width, "big") + bytes((code,)) for packed, code in sorted(table.items())))
+        os.replace(path + ".tmp", path)
+        return path
+
+    @staticmethod
+    def load(goal: PuzzleState, directory: str = DEFAULT_DIRECTORY, depth: int = DEFAULT_DEPTH) -> "Perimeter":
+        """
+        Loads the perimeter of the given goal. The file is only read on first use, see distances.
+        :param goal: The goal PuzzleState.
+        :param directory: The directory of the perimeter files.
+        :param depth: The depth of the perimeter, it must match the one the perimeter was built with.
+        :return: The Perimeter of the goal.
+        :raises FileNotFoundError: If the perimeter of the goal was not built.
+        """
+        path = Perimeter.filename(directory, goal, depth)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Perimeter {path} is missing, build it with "
+                                    f"`python perimeter.py <puzzle file> --depth {depth} --directory {directory}`")
+        return Perimeter(goal, depth, path)
+
+    @property
+    def distances(self) -> Dict[int, int]:
+        """
+        :return: The codes of the states of the perimeter by their packed representations, see build_table. They are
+        read from the file the first time.
+        """
+        if self.loaded is None:
+            width = Perimeter.width(self.goal)
+            record = width + 1
+            with open(self.path, "rb") as f:
+                data = f.read()
+            self.loaded = {int.from_bytes(data[i:i + width], "big"): data[i + width]
+                           for i in range(0, len(data), record)}
+        return self.loaded
+
+    def heuristic(self, base: Heuristic) -> "PerimeterHeuristic":
+        """
+        :param base: The heuristic of the search.
+        :return: The heuristic combined with the exact distances of the perimeter.
+        """
+        return PerimeterHeuristic(base, self)
+
+    def suffix(self, state: PuzzleState) -> List[Directions]:
+        """
+        :param state: A state of the perimeter.
+        :return: The moves of the blank tile from the state to the goal, a shortest path.
+        """
+        distances = self.distances
+        moves = []
+        while state.packed != self.goal.packed:
+            direction = Directions(distances[state.packed] & 7)
+            moves.append(direction)
+            state = state.move(direction)
+        return moves
+
+
+class PerimeterHeuristic(Heuristic):
+    """
+    Heuristic that is exact on the perimeter of the goal: the distance of a state of the perimeter is its stored one,
+    and every other state is more than `depth` moves away, so its value is raised to at least depth + 1. It stays
+    consistent when the base heuristic is, so the first state of the perimeter expanded by A* lies on a shortest path.
+    States far from the perimeter, with a base heuristic above depth + 1, are evaluated incrementally without looking
+    them up.
+    """
+
+    def __init__(self, base: Heuristic, perimeter: Perimeter) -> None:
+        """
+        :param base: The heuristic of the search.
+        :param perimeter: The perimeter of the goal.
+        """
+        super().__init__(perimeter.goal)
+        self.base = base
+        self.perimeter = perimeter
+        self.consistent = base.consistent
+        self.limit = perimeter.depth + 1
+        grid = perimeter.goal.grid
+        self.tile_bits = grid.tile_bits
+        self.tile_mask = grid.tile_mask
+
+    def calculate(self, state: PuzzleState) -> int:
+        code = self.perimeter.distances.get(state.packed)
+        if code is not None:
+            return code >> 3
+        return max(self.base.calculate(state), self.limit)
+
+    def update(self, h: int, state: PuzzleState, target: int) -> int:
+        """
+        Evaluates the successor incrementally. Above the limit the value is the base heuristic, near it the base
+        heuristic of the parent is calculated again, since the value of the parent may be exact or raised.
+        :param h: The heuristic of the state.
+        :param state: The parent state.
+        :param target: The position the blank tile is moved to.
+        :return: The heuristic of the successor.
+        """
+        limit = self.limit
+        base = self.base.update(h if h > limit else self.base.calculate(state), state, target)
+        if base > limit:
+            return base
+        bits = self.tile_bits
+        packed = state.packed
+        tile = (packed >> (target * bits)) & self.tile_mask
+        code = self.perimeter.distances.get(packed + (tile << (state.blank * bits)) - (tile << (target * bits)))
+        return code >> 3 if code is not None else limit
+
+
+# Perimeters loaded in this process by (directory, depth, grid size, packed goal), shared by the PerimeterSearch
+# builders, so a worker process that solves many puzzles reads the perimeter of a goal once
+PERIMETERS: Dict[Tuple[str, int, int, int], Perimeter] = {}
+
+
+class PerimeterSearch:
+    """
+    Search algorithm builder for solve and batch: AStarSearch with the perimeter of the goal when it was built, plain
+    AStarSearch otherwise. The perimeters are loaded once per goal and process and kept in PERIMETERS, so the copies of
+    the builder that batch sends with every task share them. A goal without a perimeter is checked again every time,
+    so a perimeter built later is used.
+    """
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, depth: int = DEFAULT_DEPTH) -> None:
+        """
+        :param directory: The directory of the perimeter files.
+        :param depth: The depth of the perimeters.
+        """
+        self.directory = directory
+        self.depth = depth
+
+    def __call__(self, initial: PuzzleState, goal: PuzzleState, heuristic=None) -> AStarSearch:
+        """
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param heuristic: Optional heuristic, see AStarSearch.
+        :return: The AStarSearch of the puzzle.
+        """
+        key = (self.directory, self.depth, goal.grid.size, goal.packed)
+        perimeter = PERIMETERS.get(key)
+        if perimeter is None:
+            try:
+                perimeter = PERIMETERS[key] = Perimeter.load(goal, self.directory, self.depth)
+            except FileNotFoundError:
+                pass
+        return AStarSearch(initial, goal, heuristic, perimeter=perimeter)
+
+    def __repr__(self) -> str:
+        """
+        :return: The class and configuration of the builder, which name it in the keys of the SolutionCache.
+        """
+        return f"PerimeterSearch(directory={self.directory!r}, depth={self.depth})"
+
+
+if __name__ == "__main__":
+    # Builder command that writes the perimeters of the goal states of the given puzzle files.
+    parser = argparse.ArgumentParser(description="Build perimeters for the goals of puzzle files.")
+    parser.add_argument("files", nargs="+", help="puzzle files whose goal states the perimeters are built for")
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY, help="directory of the perimeter files")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="number of moves around the goal")
+    args = parser.parse_args()
+    if not 0 <= args.depth <= MAX_DEPTH:
+        parser.error(f"the depth is between 0 and {MAX_DEPTH}")
+    for file in args.files:
+        _, puzzle_goal = PuzzleFileIO.read_puzzle_from_file(file)
+        print(Perimeter.build(puzzle_goal, args.directory, args.depth))
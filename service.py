@@ -0,0 +1,426 @@
+# Argparse is for the command line interface of the service.
+import argparse
+# Asyncio is for serving many connections at once while the searches run in worker processes.
+import asyncio
+# Json is for the protocol of the service, one JSON object per line.
+import json
+# Multiprocessing is for the pool of long-lived worker processes that run the searches.
+import multiprocessing
+from multiprocessing.connection import Connection
+# Os is for the default number of workers.
+import os
+# Socket is for the blocking client of the service.
+import socket
+# Time is for the deadlines of the requests.
+import time
+# OrderedDict is for the least recently used (LRU) heuristics kept warm in every worker.
+from collections import OrderedDict
+# ThreadPoolExecutor is for waiting on the pipes of the workers without blocking the event loop.
+from concurrent.futures import ThreadPoolExecutor
+# Typing is for type hints and type safety. As well, it improves readability.
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from batch import HEURISTICS
+from main import (AnytimeAStarSearch, AStarSearch, Heuristic, PuzzleFileIO, PuzzleState, SearchMetrics,
+                  SearchObserver, Solution, SolutionWriter, Solvability)
+from pattern_database import PatternDatabase
+
+# Search algorithms of the service, both can be stopped at a deadline
+ALGORITHMS = {"astar": AStarSearch, "anytime": AnytimeAStarSearch}
+# Heuristics of the service, the pattern database tables must have been built for the goal
+SERVICE_HEURISTICS = dict(HEURISTICS, **{"pattern-database": PatternDatabase.load})
+# Default address of the service
+DEFAULT_HOST: str = "127.0.0.1"
+DEFAULT_PORT: int = 8026
+# Default number of requests waiting for a worker before the connections stop being read
+DEFAULT_QUEUE_SIZE: int = 64
+# Number of heuristics kept warm in every worker
+WARM_HEURISTICS: int = 32
+# Number of expansions between two checks of the deadline and of the cancellation flag
+CHECK_INTERVAL: int = 1000
+
+
+class DeadlineObserver(SearchObserver):
+    """
+    Observer that aborts a search, which then raises SearchAborted, once its deadline has passed or the service has
+    cancelled it through the shared flag of the worker.
+    """
+
+    def __init__(self, deadline: Optional[float], cancelled, interval: int = CHECK_INTERVAL) -> None:
+        """
+        :param deadline: The time.monotonic() after which the search is aborted, None for no deadline.
+        :param cancelled: The shared flag of the worker, set by the service to abort the search.
+        :param interval: The number of expansions between two checks.
+        """
+        super().__init__(interval)
+        self.deadline = deadline
+        self.cancelled = cancelled
+
+    def progress(self, metrics: SearchMetrics) -> bool:
+        return bool(self.cancelled.value) or (self.deadline is not None and time.monotonic() > self.deadline)
+
+
+def warm_heuristic(heuristics: "OrderedDict[tuple, Heuristic]", name: str, goal: PuzzleState) -> Heuristic:
+    """
+    Returns the heuristic of the goal, built once and then kept with the most recently used ones, so the tables of
+    the goals of repeated requests are not built again.
+    :param heuristics: The heuristics kept by the worker, by (name, size, packed goal).
+    :param name: The name of the heuristic in SERVICE_HEURISTICS.
+    :param goal: The goal PuzzleState.
+    :return: The heuristic.
+    """
+    key = (name, goal.grid.size, goal.packed)
+    heuristic = heuristics.get(key)
+    if heuristic is None:
+        heuristic = heuristics[key] = SERVICE_HEURISTICS[name](goal)
+        if len(heuristics) > WARM_HEURISTICS:
+            heuristics.popitem(last=False)
+    heuristics.move_to_end(key)
+    return heuristic
+
+
+def solve_request(request: dict, cancelled, heuristics: "OrderedDict[tuple, Heuristic]") -> dict:
+    """
+    Solves one request in a worker. Both searches are stopped by a DeadlineObserver at the deadline or when the service
+    cancels the request: AStarSearch is aborted, AnytimeAStarSearch returns its best solution so far.
+    :param request: The request, see SolveService.parse.
+    :param cancelled: The shared cancellation flag of the worker.
+    :param heuristics: The heuristics kept by the worker.
+    :return: The response, the record of SolutionWriter.
+    """
+    try:
+        initial, goal = PuzzleState(request["initial"]), PuzzleState(request["goal"])
+        Solvability.check(initial, goal)
+        heuristic = warm_heuristic(heuristics, request["heuristic"], goal)
+        observer = DeadlineObserver(request["deadline"], cancelled)
+        search = ALGORITHMS[request["algorithm"]](initial, goal, heuristic, observer=observer)
+        result = search.search()
+        return SolutionWriter.record(request["id"], Solution(result, search.N, search.statistics()))
+    except Exception as e:
+        return SolutionWriter.record(request["id"], error=f"{type(e).__name__}: {e}")
+
+
+def serve_worker(connection: Connection, cancelled, warm: List[Tuple[str, list]]) -> None:
+    """
+    The loop of a worker process: receives requests until None and sends back their responses.
+    :param connection: The worker end of the pipe.
+    :param cancelled: The shared cancellation flag of the worker.
+    :param warm: The heuristics to build before the first request, as (name, goal tiles).
+    """
+    heuristics: "OrderedDict[tuple, Heuristic]" = OrderedDict()
+    for name, tiles in warm:
+        warm_heuristic(heuristics, name, PuzzleState(tiles))
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        connection.send(solve_request(request, cancelled, heuristics))
+
+
+class Worker:
+    """
+    A long-lived worker process with its pipe and its cancellation flag.
+    """
+
+    def __init__(self, warm: List[Tuple[str, list]]) -> None:
+        """
+        :param warm: The heuristics to build when the process starts, see serve_worker.
+        """
+        self.warm = warm
+        self.cancelled = multiprocessing.Value("b", 0, lock=False)
+        self.start()
+
+    def start(self) -> None:
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serve_worker, args=(child, self.cancelled, self.warm),
+                                               daemon=True)
+        self.process.start()
+        child.close()
+
+    def restart(self) -> None:
+        """
+        Replaces a crashed process.
+        """
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+        self.start()
+
+    def stop(self) -> None:
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.connection.close()
+
+
+class SolveService:
+    """
+    Asyncio service that solves puzzles for many clients. A client sends requests over a TCP or unix socket, one JSON
+    object per line:
+
+        {"id": "p1", "initial": [...], "goal": [...], "algorithm": "astar", "heuristic": "manhattan", "deadline": 2.5}
+
+    Only the tiles are required. The requests go through a bounded queue to a pool of long-lived worker processes,
+    which keep the heuristics of recent goals warm. When the queue is full, the connections are not read any further
+    until there is room again, so a client that sends too much is slowed down instead of the service running out of
+    memory. Every response is one line with the id of its request and the fields of Solution.to_dict, or an error; the
+    responses of one connection are sent as they are ready, not in the order of the requests.
+
+    The deadline (seconds from the arrival of the request) covers the time in the queue as well: a request whose
+    deadline passes in the queue is not started, and a running search is stopped cooperatively: AStarSearch fails with
+    SearchAborted and AnytimeAStarSearch answers with its best solution so far. The requests of a client that closes
+    its connection are dropped from the queue or stopped the same way, so a client must keep the connection open until
+    it has read its responses.
+    """
+
+    def __init__(self,
+                 workers: int = None,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 deadline: float = None,
+                 warm: Iterable[Tuple[str, PuzzleState]] = (),
+                 ) -> None:
+        """
+        :param workers: The number of worker processes, the number of CPUs by default.
+        :param queue_size: The maximum number of requests waiting for a worker.
+        :param deadline: The deadline of the requests that do not set one, in seconds, no deadline by default.
+        :param warm: The heuristics every worker builds when it starts, as (name, goal).
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.deadline = deadline
+        self.warm = [(name, goal.tiles) for name, goal in warm]
+        self.pool: List[Worker] = []
+        self.queue: Optional[asyncio.Queue] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.dispatchers: List[asyncio.Task] = []
+        # Numbers of solved requests, failed ones (errors, deadlines and cancellations) and malformed lines
+        self.solved = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def parse(self, line: bytes) -> dict:
+        """
+        :param line: One line of a client.
+        :return: The request with all of its fields, the deadline as a time.monotonic().
+        :raises ValueError: If the line is not a valid request.
+        """
+        message = json.loads(line)
+        if not isinstance(message, dict) or "initial" not in message or "goal" not in message:
+            raise ValueError("a request is an object with the tiles of the initial and goal states")
+        algorithm = message.get("algorithm", "astar")
+        heuristic = message.get("heuristic", "manhattan")
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"unknown algorithm {algorithm!r}, expected one of {', '.join(ALGORITHMS)}")
+        if heuristic not in SERVICE_HEURISTICS:
+            raise ValueError(f"unknown heuristic {heuristic!r}, expected one of {', '.join(SERVICE_HEURISTICS)}")
+        deadline = message.get("deadline", self.deadline)
+        return {"id": message.get("id"), "initial": list(message["initial"]), "goal": list(message["goal"]),
+                "algorithm": algorithm, "heuristic": heuristic,
+                "deadline": None if deadline is None else time.monotonic() + float(deadline)}
+
+    @staticmethod
+    def request_id(line: bytes) -> Any:
+        """
+        :param line: One line of a client that is not a valid request.
+        :return: The id of the request if the line is a JSON object, else None.
+        """
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return None
+        return message.get("id") if isinstance(message, dict) else None
+
+    async def start(self) -> None:
+        """
+        Starts the worker processes and the tasks that feed them.
+        """
+        self.queue = asyncio.Queue(self.queue_size)
+        self.executor = ThreadPoolExecutor(self.workers)
+        self.pool = [Worker(self.warm) for _ in range(self.workers)]
+        self.dispatchers = [asyncio.create_task(self.dispatch(worker)) for worker in self.pool]
+
+    async def stop(self) -> None:
+        """
+        Stops the worker processes, the requests still queued are dropped.
+        """
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        for worker in self.pool:
+            worker.stop()
+        self.executor.shutdown()
+
+    async def dispatch(self, worker: Worker) -> None:
+        """
+        Feeds one worker with the requests of the queue, one at a time, and sets the future of every request to its
+        response. While the worker runs a request, the cancellation of its future sets the flag of the worker.
+        :param worker: The worker.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            request, future = await self.queue.get()
+            if future.done():
+                continue
+            deadline = request["deadline"]
+            if deadline is not None and time.monotonic() >= deadline:
+                future.set_result(SolutionWriter.record(request["id"], error="deadline passed in the queue"))
+                continue
+            worker.cancelled.value = 0
+            try:
+                # A worker that died while idle fails here already
+                worker.connection.send(request)
+                receiving = loop.run_in_executor(self.executor, worker.connection.recv)
+                await asyncio.wait({receiving, future}, return_when=asyncio.FIRST_COMPLETED)
+                if not receiving.done():
+                    worker.cancelled.value = 1
+                response = await receiving
+            except (EOFError, OSError) as e:
+                worker.restart()
+                response = SolutionWriter.record(request["id"], error=f"worker crashed: {type(e).__name__}: {e}")
+            except asyncio.CancelledError:
+                # The service stops: abort the search so the worker can receive None
+                worker.cancelled.value = 1
+                raise
+            if not future.done():
+                future.set_result(response)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serves one connection: reads its requests and sends every response as soon as it is ready. A client keeps the
+        connection open until it has its responses; when it closes or loses the connection, its requests that are
+        still queued are dropped and the running ones are aborted.
+        :param reader: The reading end of the connection.
+        :param writer: The writing end of the connection.
+        """
+        loop = asyncio.get_running_loop()
+        futures: Set[asyncio.Future] = set()
+        replies: Set[asyncio.Task] = set()
+        lock = asyncio.Lock()
+
+        async def send(response: dict) -> None:
+            async with lock:
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        async def reply(future: asyncio.Future) -> None:
+            try:
+                response = await future
+            except asyncio.CancelledError:
+                # The client is gone, nobody reads the response of the request
+                self.failed += 1
+                return
+            finally:
+                futures.discard(future)
+            if "error" in response:
+                self.failed += 1
+            else:
+                self.solved += 1
+            try:
+                await send(response)
+            except ConnectionError:
+                for other in futures:
+                    other.cancel()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = self.parse(line)
+                except (ValueError, TypeError) as e:
+                    self.rejected += 1
+                    await send(SolutionWriter.record(self.request_id(line), error=f"{type(e).__name__}: {e}"))
+                    continue
+                future = loop.create_future()
+                futures.add(future)
+                # Waits while the queue is full, which stops reading the connection
+                await self.queue.put((request, future))
+                task = loop.create_task(reply(future))
+                replies.add(task)
+                task.add_done_callback(replies.discard)
+        except (ConnectionError, asyncio.CancelledError):
+            # The client lost the connection or the service stops
+            pass
+        finally:
+            # Cancelling the futures lets the dispatchers skip queued requests and abort running ones
+            for future in futures:
+                future.cancel()
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: str = None) -> None:
+        """
+        Runs the service until it is cancelled.
+        :param host: The address of the TCP socket.
+        :param port: The port of the TCP socket.
+        :param path: The path of a unix socket to listen on instead of TCP.
+        """
+        await self.start()
+        try:
+            if path is not None:
+                server = await asyncio.start_unix_server(self.handle, path)
+            else:
+                server = await asyncio.start_server(self.handle, host, port)
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+
+def request(initial: PuzzleState,
+            goal: PuzzleState,
+            host: str = DEFAULT_HOST,
+            port: int = DEFAULT_PORT,
+            path: str = None,
+            **options,
+            ) -> dict:
+    """
+    Blocking client that sends one request to a running service and waits for its response.
+    :param initial: The initial PuzzleState.
+    :param goal: The goal PuzzleState.
+    :param host: The address of the service.
+    :param port: The port of the service.
+    :param path: The path of the unix socket of the service instead of TCP.
+    :param options: The optional fields of the request: id, algorithm, heuristic and deadline.
+    :return: The response, see SolveService.
+    """
+    if path is not None:
+        connection = socket.socket(socket.AF_UNIX)
+        connection.connect(path)
+    else:
+        connection = socket.create_connection((host, port))
+    with connection, connection.makefile("rwb") as stream:
+        stream.write(json.dumps(dict(options, initial=initial.tiles, goal=goal.tiles)).encode() + b"\n")
+        stream.flush()
+        return json.loads(stream.readline())
+
+
+if __name__ == "__main__":
+    # Command line interface that runs the service until it is interrupted.
+    parser = argparse.ArgumentParser(description="Serve puzzle requests over a local socket.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--unix", default=None, help="path of a unix socket to listen on instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="number of requests waiting for a worker before clients are slowed down")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="deadline in seconds of the requests that do not set one")
+    parser.add_argument("--warm", nargs="*", default=[], help="puzzle files whose goals get warm heuristics")
+    parser.add_argument("--heuristic", choices=SERVICE_HEURISTICS, default="manhattan",
+                        help="heuristic built for the goals of --warm")
+    args = parser.parse_args()
+
+    warm_goals = [(args.heuristic, PuzzleFileIO.read_puzzle_from_file(filename)[1]) for filename in args.warm]
+    service = SolveService(args.workers, args.queue_size, args.deadline, warm_goals)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,188 @@
+# Itertools is for enumerating the permutations of the axes and the reflections of the cube.
+import itertools
+# Typing is for type hints and type safety. As well, it improves readability.
+from typing import Dict, List, Tuple
+
+from main import SIZE, AStarSearch, Directions, Grid, ManhattanHeuristic, PuzzleState, Solution, solve_puzzle
+
+# Axis and sign of the move of the blank tile in every direction: x grows to the east, y to the south, z downwards
+AXIS_OF = {Directions.W: (0, -1), Directions.E: (0, 1), Directions.N: (1, -1), Directions.S: (1, 1),
+           Directions.U: (2, -1), Directions.D: (2, 1)}
+DIRECTION_OF = {axis_sign: direction for direction, axis_sign in AXIS_OF.items()}
+
+
+def build_symmetries() -> List[Tuple[Tuple[int, ...], Tuple[bool, ...]]]:
+    """
+    Enumerates the 48 symmetries of the cube (rotations and reflections). Every symmetry permutes the three axes and
+    optionally mirrors each of them: the coordinate k of the image of a cell is the coordinate axes[k] of the cell,
+    mirrored (c -> size - 1 - c) if flips[k].
+    :return: The symmetries as (axes, flips), the identity first.
+    """
+    return [(axes, flips)
+            for axes in itertools.permutations(range(3))
+            for flips in itertools.product((False, True), repeat=3)]
+
+
+SYMMETRIES = build_symmetries()
+
+
+def map_position(symmetry: int, position: int, size: int = SIZE) -> int:
+    """
+    :param symmetry: The index of the symmetry in SYMMETRIES.
+    :param position: A position in the puzzle grid.
+    :param size: The size of the puzzle grid.
+    :return: The image of the position under the symmetry.
+    """
+    axes, flips = SYMMETRIES[symmetry]
+    coordinates = Grid.of(size).coordinates[position]
+    image = [size - 1 - coordinates[axes[k]] if flips[k] else coordinates[axes[k]] for k in range(3)]
+    return image[0] + size * image[1] + size * size * image[2]
+
+
+def map_direction(symmetry: int, direction: Directions) -> Directions:
+    """
+    :param symmetry: The index of the symmetry in SYMMETRIES.
+    :param direction: A direction of a move of the blank tile.
+    :return: The image of the direction under the symmetry, the move that corresponds to it in the mapped puzzle.
+    """
+    axes, flips = SYMMETRIES[symmetry]
+    axis, sign = AXIS_OF[direction]
+    k = axes.index(axis)
+    return DIRECTION_OF[(k, -sign if flips[k] else sign)]
+
+
+def build_positions(size: int) -> List[Tuple[int, ...]]:
+    """
+    :param size: The size of the puzzle grid.
+    :return: The image of every position under every symmetry.
+    """
+    cells = Grid.of(size).cells
+    return [tuple(map_position(s, p, size) for p in range(cells)) for s in range(len(SYMMETRIES))]
+
+
+def positions_of(size: int) -> List[Tuple[int, ...]]:
+    """
+    :param size: The size of the puzzle grid.
+    :return: The image of every position under every symmetry for the size, built on first use.
+    """
+    positions = SIZED_POSITIONS.get(size)
+    if positions is None:
+        positions = SIZED_POSITIONS[size] = build_positions(size)
+    return positions
+
+
+# Image of every position of the 3x3x3 grid and of every direction under every symmetry, and the inverse of every
+# symmetry, which does not depend on the size
+POSITIONS: List[Tuple[int, ...]] = build_positions(SIZE)
+SIZED_POSITIONS: Dict[int, List[Tuple[int, ...]]] = {SIZE: POSITIONS}
+DIRECTIONS: List[dict] = [{d: map_direction(s, d) for d in Directions} for s in range(len(SYMMETRIES))]
+INVERSES: List[int] = [next(t for t in range(len(SYMMETRIES)) if all(POSITIONS[t][POSITIONS[s][p]] == p
+                                                                     for p in range(27)))
+                       for s in range(len(SYMMETRIES))]
+
+
+def transform(state: PuzzleState, symmetry: int) -> PuzzleState:
+    """
+    Moves every tile of the state to the image of its position under the symmetry.
+    :param state: The PuzzleState.
+    :param symmetry: The index of the symmetry in SYMMETRIES.
+    :return: The mapped PuzzleState.
+    """
+    tiles = [0] * state.grid.cells
+    positions = positions_of(state.grid.size)[symmetry]
+    for position, tile in enumerate(state.tiles):
+        tiles[positions[position]] = tile
+    return PuzzleState(tiles)
+
+
+def relabel(initial: PuzzleState, goal: PuzzleState) -> Tuple[PuzzleState, PuzzleState]:
+    """
+    Relabels the tiles of a puzzle so that every tile is named after its goal position: the tiles are numbered 1 to 26
+    in the order of their goal positions, the blank tile stays 0. The goal becomes the canonical state 1, 2, ..., 26
+    with the blank tile at its own position, and puzzles that only differ by the labels of their tiles become
+    identical. The actions of the blank tile do not depend on the labels, so a solution of the relabeled puzzle solves
+    the original.
+    :param initial: The initial PuzzleState.
+    :param goal: The goal PuzzleState.
+    :return: The relabeled initial and goal states.
+    """
+    names = [0] * goal.grid.cells
+    name = 0
+    for tile in goal.tiles:
+        if tile:
+            name += 1
+            names[tile] = name
+    return PuzzleState([names[tile] for tile in initial.tiles]), PuzzleState([names[tile] for tile in goal.tiles])
+
+
+def canonical(initial: PuzzleState, goal: PuzzleState) -> Tuple[int, PuzzleState, PuzzleState]:
+    """
+    Computes the canonical form of a puzzle: the relabeled (see relabel) image under the symmetry that gives the
+    smallest (goal position of the blank tile, packed initial state). All 48 symmetric variants of a puzzle, under any
+    labeling of the tiles, have the same canonical form, so caches and tables can store one of them for all.
+    The images are compared as tuples of tiles, only the symmetries that move the blank tile of the goal to its
+    smallest position are tried, and only the states of the best one are built.
+    :param initial: The initial PuzzleState.
+    :param goal: The goal PuzzleState.
+    :return: The index of the symmetry that maps the puzzle to its canonical form, and the canonical initial and goal
+    states.
+    """
+    cells = goal.grid.cells
+    positions = positions_of(goal.grid.size)
+    blank = min(images[goal.blank] for images in positions)
+    initial_tiles = initial.tiles
+    goal_tiles = goal.tiles
+    best = None
+    for symmetry, images in enumerate(positions):
+        if images[goal.blank] != blank:
+            continue
+        mapped_initial = [0] * cells
+        mapped_goal = [0] * cells
+        for position, image in enumerate(images):
+            mapped_initial[image] = initial_tiles[position]
+            mapped_goal[image] = goal_tiles[position]
+        names = [0] * cells
+        name = 0
+        for tile in mapped_goal:
+            if tile:
+                name += 1
+                names[tile] = name
+        # The last position holds the highest bits of the packed state, so the reversed tiles compare like it
+        key = [names[tile] for tile in reversed(mapped_initial)]
+        if best is None or key < best[0]:
+            best = (key, symmetry, names, mapped_initial, mapped_goal)
+    _, symmetry, names, mapped_initial, mapped_goal = best
+    return (symmetry, PuzzleState([names[tile] for tile in mapped_initial]),
+            PuzzleState([names[tile] for tile in mapped_goal]))
+
+
+def map_actions(actions: List[str], symmetry: int) -> List[str]:
+    """
+    Maps a sequence of actions to the puzzle mapped by the symmetry.
+    :param actions: The actions, as in Solution.actions.
+    :param symmetry: The index of the symmetry in SYMMETRIES.
+    :return: The corresponding actions in the mapped puzzle.
+    """
+    directions = DIRECTIONS[symmetry]
+    return [directions[Directions[action]].name for action in actions]
+
+
+def solve_canonical(initial: PuzzleState,
+                    goal: PuzzleState,
+                    algorithm=AStarSearch,
+                    heuristic=ManhattanHeuristic,
+                    ) -> Solution:
+    """
+    Solves the canonical form of the puzzle and maps the solution back to the original puzzle. The symmetries keep
+    the neighbours of every cell, so the depth of the solution is the same as for the original puzzle.
+    :param initial: The initial PuzzleState.
+    :param goal: The goal PuzzleState.
+    :param algorithm: The search algorithm class, see solve.
+    :param heuristic: The heuristic builder, see solve.
+    :return: The solution to the original puzzle, with N of the search of the canonical form.
+    """
+    symmetry, canonical_initial, canonical_goal = canonical(initial, goal)
+    solution = solve_puzzle(canonical_initial, canonical_goal, algorithm, heuristic)
+    actions = map_actions(solution.actions, INVERSES[symmetry])
+    return Solution.from_actions(initial, goal, actions, solution.N, heuristic(goal), solution.statistics)
+
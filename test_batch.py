@@ -0,0 +1,64 @@
+# Os is for crashing a worker process without cleaning up.
+import os
+# Time is for the tasks that take a while and for checking that a timed out task is not waited for.
+import time
+
+from batch import run_pool, solve_stream_parallel
+from conftest import check_solutions, write_puzzles
+
+
+def echo(value: int, seconds: float = 0.0) -> int:
+    """
+    A task that returns its value after a pause.
+    """
+    time.sleep(seconds)
+    return value
+
+
+def fail(message: str) -> None:
+    """
+    A task that raises.
+    """
+    raise ValueError(message)
+
+
+def crash() -> None:
+    """
+    A task that kills its worker process.
+    """
+    os._exit(3)
+
+
+def test_timed_out_task_is_killed():
+    start = time.monotonic()
+    results = list(run_pool([("slow", echo, (0, 30.0)), ("fast", echo, (1,))], workers=2, timeout=0.5))
+    assert time.monotonic() - start < 10
+    assert results[0].error == "timed out after 0.5s"
+    assert results[1].ok and results[1].solution == 1
+
+
+def test_crash_and_error_do_not_stop_the_other_tasks():
+    tasks = [("crash", crash, ()), ("fail", fail, ("bad",))] + [(f"echo{i}", echo, (i,)) for i in range(4)]
+    results = list(run_pool(tasks, workers=1))
+    assert [result.path for result in results] == [name for name, _, _ in tasks]
+    assert results[0].error == "worker exited with code 3"
+    assert results[1].error == "ValueError: bad"
+    assert [result.solution for result in results[2:]] == [0, 1, 2, 3]
+
+
+def test_ordered_and_as_completed_results():
+    tasks = [(f"echo{i}", echo, (i, 0.6 - 0.2 * i)) for i in range(3)]
+    ordered = [result.solution for result in run_pool(tasks, workers=3)]
+    assert ordered == [0, 1, 2]
+    completed = [result.solution for result in run_pool(tasks, workers=3, ordered=False)]
+    assert completed == [2, 1, 0]
+
+
+def test_stream_goes_on_after_a_bad_line(tmp_path):
+    puzzles, output = tmp_path / "puzzles.jsonl", tmp_path / "solutions.jsonl"
+    write_puzzles(puzzles)
+    # A missing file is reported like a bad line and the puzzles of the next file are still solved
+    results = list(solve_stream_parallel([str(tmp_path / "missing.jsonl"), str(puzzles)], str(output), workers=2))
+    assert [result.ok for result in results] == [False, True, False, True, False]
+    assert results[0].error.startswith("FileNotFoundError")
+    check_solutions(output, 1)
@@ -0,0 +1,94 @@
+# Pytest is for running the tests and parametrizing them over the puzzles.
+import pytest
+
+from cache import SolutionCache
+from conftest import PUZZLES, check
+from main import AStarSearch, ManhattanHeuristic, PuzzleState
+from symmetry import transform
+
+# Goals the heuristic of the cache has been built for, see counted
+BUILT = []
+
+
+def counted(goal: PuzzleState) -> ManhattanHeuristic:
+    """
+    A heuristic builder that records every goal it builds the Manhattan heuristic for.
+    """
+    BUILT.append(goal)
+    return ManhattanHeuristic(goal)
+
+
+def reversed_labels(state: PuzzleState) -> PuzzleState:
+    """
+    :param state: A PuzzleState.
+    :return: The state with every tile other than the blank numbered the other way round, 26 for 1 and 1 for 26.
+    """
+    return PuzzleState([len(state.tiles) - tile if tile else 0 for tile in state.tiles])
+
+
+def summary(solution) -> tuple:
+    """
+    :return: The fields of the solution a hit must rebuild exactly.
+    """
+    return solution.d, solution.N, solution.actions, solution.costs
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES[:3])
+def test_exact_hit(initial, goal, depth):
+    cache = SolutionCache(":memory:")
+    solution = cache.solve_puzzle(initial, goal)
+    check(solution, initial, goal, depth)
+    assert summary(cache.solve_puzzle(initial, goal)) == summary(solution)
+    assert (cache.hits, cache.disk_hits, cache.misses) == (1, 0, 1)
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES[:3])
+def test_symmetric_and_relabeled_hits(initial, goal, depth):
+    cache = SolutionCache(":memory:")
+    solution = cache.solve_puzzle(initial, goal)
+    puzzles = [(transform(initial, symmetry), transform(goal, symmetry)) for symmetry in (5, 17, 47)]
+    puzzles.append((reversed_labels(initial), reversed_labels(goal)))
+    for mapped_initial, mapped_goal in puzzles:
+        cached = cache.solve_puzzle(mapped_initial, mapped_goal)
+        check(cached, mapped_initial, mapped_goal, depth)
+        assert cached.N == solution.N
+    assert (cache.hits, cache.misses) == (len(puzzles), 1)
+
+
+def test_hits_survive_a_new_instance(tmp_path):
+    database = str(tmp_path / "solutions.sqlite3")
+    initial, goal, depth = PUZZLES[1]
+    cache = SolutionCache(database)
+    solution = cache.solve_puzzle(initial, goal)
+    cache.close()
+    cache = SolutionCache(database)
+    assert summary(cache.solve_puzzle(initial, goal)) == summary(solution)
+    assert (cache.hits, cache.disk_hits, cache.misses) == (0, 1, 0)
+    cache.close()
+
+
+def test_least_recently_used_solutions_are_evicted():
+    # Every solved puzzle takes two entries in memory, its canonical key and its exact key
+    cache = SolutionCache(":memory:", capacity=2)
+    (first, first_goal, _), (second, second_goal, _) = PUZZLES[:2]
+    solution = cache.solve_puzzle(first, first_goal)
+    cache.solve_puzzle(second, second_goal)
+    assert len(cache.memory) == 2
+    # The first puzzle is evicted from memory but not from the disk
+    assert summary(cache.solve_puzzle(first, first_goal)) == summary(solution)
+    assert (cache.hits, cache.disk_hits, cache.misses) == (0, 1, 2)
+    # And it is now the most recently used, so the second puzzle is the one evicted
+    cache.solve_puzzle(first, first_goal)
+    assert cache.hits == 1
+    assert cache.exact_key(second, second_goal, AStarSearch, ManhattanHeuristic) not in cache.memory
+
+
+def test_hits_reuse_the_heuristic_of_their_goal():
+    cache = SolutionCache(":memory:")
+    initial, goal, depth = PUZZLES[1]
+    BUILT.clear()
+    cache.solve_puzzle(initial, goal, heuristic=counted)
+    for _ in range(3):
+        check(cache.solve_puzzle(initial, goal, heuristic=counted), initial, goal, depth)
+    # Once for the search and once for the hits
+    assert BUILT == [goal, goal]
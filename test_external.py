@@ -0,0 +1,34 @@
+# Functools is for binding the options of the external search to its class.
+import functools
+# Os is for checking that the external search cleans up its files.
+import os
+
+# Pytest is for running the tests and parametrizing them over the puzzles.
+import pytest
+
+from conftest import PUZZLES, check
+from external import ExternalAStarSearch
+from main import Grid, LinearConflict, scramble, solve_puzzle
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_external_search_is_optimal(initial, goal, depth, tmp_path):
+    # A small chunk size reads the buckets in several chunks and merges runs of the visited set
+    algorithm = functools.partial(ExternalAStarSearch, directory=str(tmp_path), chunk_size=50)
+    check(solve_puzzle(initial, goal, algorithm), initial, goal, depth)
+    assert not os.listdir(tmp_path)
+
+
+def test_external_search_stores_blanks_beyond_256_cells(tmp_path):
+    # The blank tile of the goal is in the last of the 343 cells of the 7x7x7 grid
+    grid = Grid.of(7)
+    goal = grid.state(list(range(1, grid.cells)) + [0])
+    initial = scramble(goal, 8, 0)
+    algorithm = functools.partial(ExternalAStarSearch, directory=str(tmp_path))
+    check(solve_puzzle(initial, goal, algorithm), initial, goal, solve_puzzle(initial, goal).d)
+
+
+def test_external_search_rejects_inconsistent_heuristic():
+    initial, goal, _ = PUZZLES[0]
+    with pytest.raises(ValueError):
+        ExternalAStarSearch(initial, goal, LinearConflict(goal))
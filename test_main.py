@@ -0,0 +1,225 @@
+# Pytest is for running the tests and parametrizing them over the puzzles.
+import pytest
+
+from conftest import PUZZLES, check, check_solutions, swap_tiles, write_puzzles
+from main import (AnytimeAStarSearch, AStarSearch, BidirectionalAStarSearch, BucketFrontier, Directions, Grid,
+                  HeapFrontier, Heuristic, IDAStarSearch, LinearConflict, ManhattanHeuristic, NodeStore, PuzzleFileIO,
+                  PuzzleState, SearchAborted, SearchNode, SearchObserver, Solution, Solvability, UnsolvablePuzzleError,
+                  scramble, solve_puzzle, solve_stream)
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_ida_search_is_optimal(initial, goal, depth):
+    check(solve_puzzle(initial, goal, IDAStarSearch), initial, goal, depth)
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_linear_conflict_is_optimal(initial, goal, depth):
+    # Admissible and never below the Manhattan distance
+    assert ManhattanHeuristic(goal).calculate(initial) <= LinearConflict(goal).calculate(initial) <= depth
+    for algorithm in (AStarSearch, IDAStarSearch):
+        check(solve_puzzle(initial, goal, algorithm, LinearConflict), initial, goal, depth)
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_bidirectional_search_is_optimal(initial, goal, depth):
+    check(solve_puzzle(initial, goal, BidirectionalAStarSearch), initial, goal, depth)
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_parity_decides_solvability(initial, goal, depth):
+    assert Solvability.is_solvable(initial, goal)
+    with pytest.raises(UnsolvablePuzzleError):
+        solve_puzzle(swap_tiles(initial), goal)
+
+
+def test_malformed_puzzle_is_not_reported_unsolvable():
+    initial, goal, _ = PUZZLES[0]
+    tiles = list(initial.tiles)
+    tiles[tiles.index(1)] = 2
+    with pytest.raises(ValueError):
+        solve_puzzle(PuzzleState(tiles), goal)
+    with pytest.raises(ValueError):
+        Solvability.is_solvable(PuzzleState(list(range(8))), goal)
+
+
+def test_bucket_frontier_pop_order():
+    frontier = BucketFrontier()
+    # (id, total cost, heuristic)
+    for node_id, f, h in ((0, 5, 2), (1, 4, 3), (2, 4, 1), (3, 4, 1), (4, 6, 0), (5, 4, 3)):
+        frontier.push(node_id, f, h)
+    # Lowest total cost first, then lowest heuristic, then the most recently pushed
+    assert [frontier.pop() for _ in range(3)] == [3, 2, 5]
+    # A push below the current total cost is popped next
+    frontier.push(6, 3, 3)
+    assert [frontier.pop() for _ in range(len(frontier))] == [6, 1, 0, 4]
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES[:3])
+def test_bucket_frontier_matches_heap_frontier(initial, goal, depth):
+    heap = AStarSearch(initial, goal, frontier=HeapFrontier)
+    bucket = AStarSearch(initial, goal, frontier=BucketFrontier)
+    assert heap.search().path_cost == bucket.search().path_cost == depth
+    # The heap breaks ties by age and the buckets by recency, so the buckets can generate fewer nodes, never more here
+    assert bucket.N <= heap.N
+
+
+class OddStates(Heuristic):
+    """
+    The exact distance to the goal on the states with an odd packed value and zero on the others. It is admissible but
+    inconsistent, so A* can find a shorter path to a state it has already expanded.
+    """
+
+    def __init__(self, goal: PuzzleState):
+        super().__init__(goal)
+        self.distances = {goal.packed: 0}
+        layer = [goal]
+        while layer:
+            following = []
+            for state in layer:
+                for _, target in state.grid.moves[state.blank]:
+                    child = state.swap_blank(target)
+                    if child.packed not in self.distances:
+                        self.distances[child.packed] = self.distances[state.packed] + 1
+                        following.append(child)
+            layer = following
+
+    def calculate(self, state: PuzzleState) -> int:
+        return self.distances[state.packed] if state.packed % 2 else 0
+
+
+def test_statistics_count_reopened_nodes():
+    grid = Grid.of(2)
+    initial, goal = grid.state([0, 3, 4, 2, 1, 5, 7, 6]), grid.state([1, 2, 3, 4, 5, 6, 7, 0])
+    search = AStarSearch(initial, goal, OddStates(goal))
+    assert search.search().path_cost == 7
+    statistics = search.statistics()
+    assert statistics["generated"] == search.N
+    assert statistics["reopened"] >= 1 and statistics["pruned"] > 0
+    assert statistics["expanded"] + statistics["stale"] <= statistics["generated"]
+    # A consistent heuristic never re-opens a node
+    search = AStarSearch(initial, goal, ManhattanHeuristic(goal))
+    assert search.search().path_cost == 7
+    assert search.statistics()["reopened"] == 0
+
+
+def test_stream_goes_on_after_a_bad_line(tmp_path):
+    puzzles, output = tmp_path / "puzzles.jsonl", tmp_path / "solutions.jsonl"
+    write_puzzles(puzzles)
+    assert solve_stream(str(puzzles), str(output)) == (2, 2)
+    check_solutions(output)
+
+
+class Recorder(SearchObserver):
+    """
+    Records the metrics it is called with and asks to abort the search after `abort_after` calls of progress.
+    """
+
+    def __init__(self, interval: int, abort_after: int = None):
+        super().__init__(interval)
+        self.abort_after = abort_after
+        self.progressed = []
+        self.finished_with = []
+
+    def progress(self, metrics) -> bool:
+        self.progressed.append(metrics)
+        return len(self.progressed) == self.abort_after
+
+    def finished(self, metrics) -> None:
+        self.finished_with.append(metrics)
+
+
+def test_observer_aborts_the_search():
+    # A puzzle that takes more than 100 expansions
+    initial, goal, depth = PUZZLES[6]
+    observer = Recorder(10, abort_after=3)
+    with pytest.raises(SearchAborted):
+        AStarSearch(initial, goal, observer=observer).search()
+    assert [metrics.expanded for metrics in observer.progressed] == [10, 20, 30]
+    assert len(observer.finished_with) == 1 and observer.finished_with[0].expanded == 30
+    # An observer that never aborts is told once about the end of the search
+    observer = Recorder(10)
+    search = AStarSearch(initial, goal, observer=observer)
+    assert search.search().path_cost == depth
+    assert len(observer.progressed) == search.expanded // 10
+    assert len(observer.finished_with) == 1 and observer.finished_with[0].expanded == search.expanded
+
+
+@pytest.mark.parametrize("size", [2, 4])
+def test_other_sizes_are_solved(size):
+    grid = Grid.of(size)
+    goal = grid.state(list(range(1, grid.cells)) + [0])
+    initial = scramble(goal, 16, size)
+    solution = solve_puzzle(initial, goal)
+    check(solution, initial, goal, solve_puzzle(initial, goal, IDAStarSearch).d)
+    if size == 2:
+        # The exact distances of every state of the 2x2x2 grid
+        assert solution.d == OddStates(goal).distances[initial.packed]
+
+
+def test_sized_file_round_trips(tmp_path):
+    grid = Grid.of(4)
+    goal = grid.state(list(range(1, grid.cells)) + [0])
+    initial = scramble(goal, 10, 0)
+    filename = tmp_path / "puzzle.txt"
+    filename.write_text(" ".join(map(str, (4, *initial.tiles, *goal.tiles))))
+    assert PuzzleFileIO.read_puzzle_from_file(str(filename)) == (initial, goal)
+    check(solve_puzzle(initial, goal), initial, goal, solve_puzzle(initial, goal, IDAStarSearch).d)
+
+
+def test_size_is_only_read_when_its_tiles_follow(tmp_path):
+    initial, goal, _ = PUZZLES[0]
+    filename = tmp_path / "puzzle.txt"
+    # A 3x3x3 puzzle after a stray number is not read as a puzzle of that size
+    filename.write_text(" ".join(map(str, (5, *initial.tiles, *goal.tiles))))
+    with pytest.raises(ValueError, match="54 tiles after the size 5 instead of 250"):
+        PuzzleFileIO.read_puzzle_from_file(str(filename))
+    filename.write_text(" ".join(map(str, (1, *initial.tiles, *goal.tiles))))
+    with pytest.raises(ValueError, match="size 1"):
+        PuzzleFileIO.read_puzzle_from_file(str(filename))
+    filename.write_text(" ".join(map(str, (*initial.tiles, *goal.tiles[2:]))))
+    with pytest.raises(ValueError, match="52 tiles instead of 54"):
+        PuzzleFileIO.read_puzzle_from_file(str(filename))
+
+
+def chain(node) -> list:
+    """
+    :return: The (state, action, path cost, heuristic) of every node of the path that ends in the node, goal first.
+    """
+    nodes = []
+    while node is not None:
+        nodes.append((node.state, node.action, node.path_cost, node.heuristics))
+        node = node.parent
+    return nodes
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_node_store_path_matches_search_nodes(initial, goal, depth):
+    search = AStarSearch(initial, goal)
+    node = search.search()
+    assert isinstance(search.store, NodeStore) and len(search.store) == search.N
+    # The same path built from SearchNodes by replaying the actions from the initial state
+    replayed = Solution.from_actions(initial, goal, Solution(node, search.N).actions, search.N, search.heuristic)
+    assert chain(node) == chain(replayed.result)
+    assert chain(node)[-1] == (initial, None, 0, search.heuristic.calculate(initial))
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_anytime_search_is_optimal(initial, goal, depth):
+    for heuristic in (ManhattanHeuristic, LinearConflict):
+        solution = solve_puzzle(initial, goal, AnytimeAStarSearch, heuristic)
+        check(solution, initial, goal, depth)
+        assert solution.statistics["bound"] == 1.0
+
+
+def test_replay_rejects_paths_that_miss_the_goal():
+    initial, goal, _ = PUZZLES[0]
+    actions = solve_puzzle(initial, goal).actions
+    heuristic = ManhattanHeuristic(goal)
+    node = SearchNode.replay(initial, goal, [Directions[name] for name in actions], heuristic)
+    assert node.state == goal and node.path_cost == len(actions)
+    with pytest.raises(ValueError, match="do not lead"):
+        SearchNode.replay(initial, goal, [Directions[name] for name in actions[:-1]], heuristic)
+    # Three moves in the same direction leave the 3x3x3 grid wherever the blank tile starts
+    with pytest.raises(ValueError, match="Illegal action"):
+        SearchNode.replay(goal, goal, [Directions.E] * 3, heuristic)
@@ -0,0 +1,15 @@
+# Functools is for binding the number of worker processes to the search.
+import functools
+
+# Pytest is for running the tests and parametrizing them over the puzzles.
+import pytest
+
+from conftest import PUZZLES, check
+from main import solve_puzzle
+from parallel import ParallelAStarSearch
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_parallel_search_is_optimal(initial, goal, depth):
+    algorithm = functools.partial(ParallelAStarSearch, workers=2)
+    check(solve_puzzle(initial, goal, algorithm), initial, goal, depth)
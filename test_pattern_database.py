@@ -0,0 +1,38 @@
+# Functools is for binding the directory of the tables to the loader.
+import functools
+
+# Pytest is for running the tests and parametrizing them over the puzzles.
+import pytest
+
+from conftest import PUZZLES, check
+from main import AStarSearch, IDAStarSearch, ManhattanHeuristic, solve_puzzle
+from pattern_database import PatternDatabase
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory) -> str:
+    """
+    :return: The directory of the pattern databases of the goals of the puzzles, with groups of two tiles.
+    """
+    directory = str(tmp_path_factory.mktemp("pdb"))
+    for _, goal, _ in PUZZLES:
+        PatternDatabase.build(goal, directory, 2)
+    return directory
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_pattern_database_is_optimal(initial, goal, depth, tables):
+    heuristic = functools.partial(PatternDatabase.load, directory=tables, group_size=2)
+    pdb = heuristic(goal)
+    # The pattern database is admissible and never below the Manhattan distance
+    assert ManhattanHeuristic(goal).calculate(initial) <= pdb.calculate(initial) <= depth
+    for algorithm in (AStarSearch, IDAStarSearch):
+        check(solve_puzzle(initial, goal, algorithm, heuristic), initial, goal, depth)
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_pattern_database_update_matches_calculate(initial, goal, depth, tables):
+    pdb = PatternDatabase.load(goal, tables, 2)
+    h = pdb.calculate(initial)
+    for _, target in initial.grid.moves[initial.blank]:
+        assert pdb.update(h, initial, target) == pdb.calculate(initial.swap_blank(target))
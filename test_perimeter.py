@@ -0,0 +1,22 @@
+# Pytest is for running the tests and parametrizing them over the puzzles.
+import pytest
+
+from conftest import PUZZLES, check
+from main import solve_puzzle
+from perimeter import Perimeter, PerimeterSearch
+
+
+@pytest.fixture(scope="module")
+def perimeters(tmp_path_factory) -> str:
+    """
+    :return: The directory of the perimeters of depth 4 of the goals of the puzzles.
+    """
+    directory = str(tmp_path_factory.mktemp("perimeter"))
+    for _, goal, _ in PUZZLES:
+        Perimeter.build(goal, directory, 4)
+    return directory
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_perimeter_search_is_optimal(initial, goal, depth, perimeters):
+    check(solve_puzzle(initial, goal, PerimeterSearch(perimeters, 4)), initial, goal, depth)
@@ -0,0 +1,110 @@
+# Asyncio is for running the service and its clients in one event loop.
+import asyncio
+# Json is for the protocol of the service.
+import json
+# Os is for waiting until the socket of the service exists.
+import os
+# Time is for checking that aborted searches do not run to the end.
+import time
+
+from conftest import PUZZLES
+from main import scramble
+from service import SolveService
+
+# A puzzle that takes AStarSearch far longer than the tests, so it only ends when it is aborted
+HARD = (PUZZLES[0][0], scramble(PUZZLES[0][0], 300, 1))
+
+
+def line(initial, goal, **options) -> bytes:
+    """
+    :return: The request line of the puzzle with the optional fields.
+    """
+    return json.dumps(dict(options, initial=list(initial.tiles), goal=list(goal.tiles))).encode() + b"\n"
+
+
+def run(service: SolveService, path: str, client) -> None:
+    """
+    Runs the service on a unix socket, and the client coroutine against it within a time limit.
+    :param service: The service.
+    :param path: The path of the unix socket.
+    :param client: The coroutine function of the client, called with the path.
+    """
+    async def scenario():
+        serving = asyncio.create_task(service.serve(path=path))
+        while not os.path.exists(path):
+            await asyncio.sleep(0.01)
+        try:
+            await asyncio.wait_for(client(path), 30)
+        finally:
+            serving.cancel()
+            await asyncio.gather(serving, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+
+def test_deadline_aborts_the_search(tmp_path):
+    service = SolveService(workers=2)
+
+    async def client(path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        started = time.monotonic()
+        writer.write(line(*HARD, id="astar", deadline=0.5) + line(*HARD, id="anytime", algorithm="anytime",
+                                                                   deadline=0.5))
+        responses = {}
+        for _ in range(2):
+            response = json.loads(await reader.readline())
+            responses[response["id"]] = response
+        assert time.monotonic() - started < 10
+        # AStarSearch fails at the deadline, AnytimeAStarSearch answers with its best solution so far
+        assert responses["astar"]["error"].startswith("SearchAborted")
+        assert "error" not in responses["anytime"] and responses["anytime"]["statistics"]["bound"] > 1.0
+        writer.close()
+
+    run(service, str(tmp_path / "service.sock"), client)
+    assert (service.solved, service.failed) == (1, 1)
+
+
+def test_disconnect_cancels_the_search(tmp_path):
+    # One worker, so the second client is only answered once the search of the first one is aborted
+    service = SolveService(workers=1)
+    initial, goal, depth = PUZZLES[0]
+
+    async def client(path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(line(*HARD, id="hard"))
+        await writer.drain()
+        await asyncio.sleep(0.5)
+        writer.close()
+        reader, writer = await asyncio.open_unix_connection(path)
+        started = time.monotonic()
+        writer.write(line(initial, goal, id="easy"))
+        response = json.loads(await reader.readline())
+        assert time.monotonic() - started < 10
+        assert response["id"] == "easy" and response["d"] == depth
+        writer.close()
+
+    run(service, str(tmp_path / "service.sock"), client)
+    assert (service.solved, service.failed) == (1, 1)
+
+
+def test_full_queue_stops_reading_the_client(tmp_path):
+    # One worker and room for one waiting request: the third request waits for room, so the line after it is not read
+    service = SolveService(workers=1, queue_size=1)
+
+    async def client(path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        for name in ("running", "queued", "waiting"):
+            writer.write(line(*HARD, id=name, deadline=1.0))
+        writer.write(b'{"id": "malformed"}\n')
+        await writer.drain()
+        await asyncio.sleep(0.5)
+        assert service.queue.full() and service.rejected == 0
+        # The running search is aborted at its deadline, the queued request is dropped at its own and the third one
+        # goes through, which lets the connection be read again
+        responses = [json.loads(await reader.readline()) for _ in range(4)]
+        assert sorted(response["id"] for response in responses) == ["malformed", "queued", "running", "waiting"]
+        assert all("error" in response for response in responses)
+        assert service.rejected == 1
+        writer.close()
+
+    run(service, str(tmp_path / "service.sock"), client)
@@ -0,0 +1,48 @@
+# Pytest is for running the tests and parametrizing them over the puzzles.
+import pytest
+
+from conftest import PUZZLES, swap_tiles
+from main import Solution, Solvability, solve_puzzle
+from symmetry import INVERSES, POSITIONS, SYMMETRIES, canonical, map_actions, solve_canonical, transform
+
+
+def test_symmetries_are_distinct():
+    assert len(SYMMETRIES) == 48
+    assert len(set(POSITIONS)) == 48
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_transforms_preserve_solvability(initial, goal, depth):
+    unsolvable = swap_tiles(initial)
+    for symmetry in range(len(SYMMETRIES)):
+        assert Solvability.is_solvable(transform(initial, symmetry), transform(goal, symmetry))
+        assert not Solvability.is_solvable(transform(unsolvable, symmetry), transform(goal, symmetry))
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_transforms_preserve_optimal_length(initial, goal, depth):
+    for symmetry in range(len(SYMMETRIES)):
+        assert solve_puzzle(transform(initial, symmetry), transform(goal, symmetry)).d == depth
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_map_actions_round_trips(initial, goal, depth):
+    actions = solve_puzzle(initial, goal).actions
+    for symmetry in range(len(SYMMETRIES)):
+        mapped = map_actions(actions, symmetry)
+        # Solution.from_actions raises if the actions are illegal or do not reach the goal state
+        Solution.from_actions(transform(initial, symmetry), transform(goal, symmetry), mapped, 0)
+        assert map_actions(mapped, INVERSES[symmetry]) == actions
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_symmetric_variants_share_canonical_form(initial, goal, depth):
+    forms = {(canonical_initial.packed, canonical_goal.packed)
+             for _, canonical_initial, canonical_goal in (canonical(transform(initial, s), transform(goal, s))
+                                                          for s in range(len(SYMMETRIES)))}
+    assert len(forms) == 1
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_solve_canonical_is_optimal(initial, goal, depth):
+    assert solve_canonical(initial, goal).d == depth
@@ -0,0 +1,14 @@
+# Pytest is for running the tests and parametrizing them over the puzzles.
+import pytest
+
+from conftest import PUZZLES, check
+from main import solve_puzzle
+
+# The vectorized search needs NumPy, an optional dependency
+pytest.importorskip("numpy")
+from vectorized import VectorizedAStarSearch
+
+
+@pytest.mark.parametrize("initial, goal, depth", PUZZLES)
+def test_vectorized_search_is_optimal(initial, goal, depth):
+    check(solve_puzzle(initial, goal, VectorizedAStarSearch), initial, goal, depth)
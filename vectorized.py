@@ -0,0 +1,299 @@
+# Argparse is for the command line interface that compares the engines.
+import argparse
+# Itertools is for the bulk lookups and updates of the reached hashmap without a Python loop.
+import itertools
+# Sys is for the exit code of the command line interface.
+import sys
+# Time is for measuring the throughput of the engines.
+import time
+# Typing is for type hints and type safety. As well, it improves readability.
+from typing import Dict, List, Tuple
+
+# NumPy is an optional dependency, only this module needs it.
+import numpy as np
+
+from main import (OPPOSITE, AStarSearch, Directions, ManhattanHeuristic, PuzzleFileIO, PuzzleState, SearchNode,
+                  Solution, Solvability)
+
+# Default number of nodes expanded together
+DEFAULT_BATCH_SIZE: int = 1024
+# Value of the action column of the initial node, and of the direction to skip when there is nothing to undo
+NO_ACTION: int = -1
+
+
+class VectorizedAStarSearch:
+    """
+    A* search that expands a batch of nodes at once with NumPy instead of one node at a time. Every iteration pops up
+    to `batch_size` nodes of the lowest total cost, the ones with the lowest heuristic first, generates all of their
+    successors as one 2D array of tiles, evaluates their Manhattan distances with vectorized lookups in a table of the
+    goal coordinates, and deduplicates them within the batch and against the reached states in bulk.
+
+    All the nodes of a batch have the lowest total cost in the frontier, so expanding them in any order keeps the
+    search optimal, and the goal is detected when it is popped, like in AStarSearch. It supports the Manhattan
+    distance only, since the other heuristics cannot be evaluated by table lookups.
+    """
+
+    def __init__(self,
+                 initial: PuzzleState,
+                 goal: PuzzleState,
+                 heuristic: ManhattanHeuristic = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 ) -> None:
+        """
+        :param initial: The initial PuzzleState.
+        :param goal: The goal PuzzleState.
+        :param heuristic: The ManhattanHeuristic of the goal, it is only checked, the distances are built as arrays.
+        :param batch_size: The maximum number of nodes expanded together.
+        :raises ValueError: If the heuristic is not the Manhattan distance.
+        """
+        if heuristic is not None and type(heuristic) is not ManhattanHeuristic:
+            raise ValueError(f"VectorizedAStarSearch supports the Manhattan distance only, "
+                             f"not {type(heuristic).__name__}")
+        # Initial and goal states
+        self.initial = initial
+        self.goal = goal
+        self.batch_size = batch_size
+        grid = goal.grid
+        self.cells = grid.cells
+        # Type of the tiles, one byte per tile up to the 6x6x6 grid, whose largest tile is 215
+        self.dtype = np.dtype(np.uint8 if grid.cells <= 256 else np.uint16)
+        # Number of bytes of the tiles of a state
+        self.width = grid.cells * self.dtype.itemsize
+        # Target position for every position of the blank tile and every direction value, -1 if the move is illegal
+        self.targets = np.array([[-1 if t is None else t for t in row] for row in grid.move_targets], dtype=np.int64)
+        # The direction value that undoes every direction value, the last item (index -1) is for the initial node
+        self.undo = np.array([OPPOSITE[d].value for d in Directions] + [NO_ACTION], dtype=np.int64)
+        # distances[tile, position] is the Manhattan distance of the tile at the position from its goal position,
+        # built from the coordinates of the cells and the goal coordinates of the tiles
+        coordinates = np.array(grid.coordinates, dtype=np.int64)
+        goal_tiles = np.array(goal.tiles, dtype=np.int64)
+        goal_coordinates = np.empty_like(coordinates)
+        goal_coordinates[goal_tiles] = coordinates
+        self.distances = np.abs(coordinates[None, :, :] - goal_coordinates[:, None, :]).sum(axis=2)
+        self.distances[0] = 0
+        # Number of nodes generated
+        self.N = 1
+        # Number of nodes expanded, closed states re-opened, duplicates pruned, stale frontier entries skipped and
+        # batches expanded
+        self.expanded = 0
+        self.reopened = 0
+        self.pruned = 0
+        self.stale = 0
+        self.batches = 0
+
+    def allocate(self, capacity: int) -> None:
+        """
+        Allocates the columns of the node store, one row per node.
+        :param capacity: The initial number of rows.
+        """
+        self.size = 0
+        self.tiles = np.empty((capacity, self.cells), dtype=self.dtype)
+        self.blanks = np.empty(capacity, dtype=np.int64)
+        self.parents = np.empty(capacity, dtype=np.int64)
+        self.actions = np.empty(capacity, dtype=np.int8)
+        self.costs = np.empty(capacity, dtype=np.int32)
+        self.heuristics = np.empty(capacity, dtype=np.int32)
+        # Whether the node is still the best one of its state, and whether it was expanded
+        self.alive = np.empty(capacity, dtype=bool)
+        self.closed = np.empty(capacity, dtype=bool)
+
+    def add(self, tiles: np.ndarray, blanks: np.ndarray, parents: np.ndarray, actions: np.ndarray,
+            costs: np.ndarray, heuristics: np.ndarray) -> np.ndarray:
+        """
+        Appends nodes to the store and grows the columns by doubling when they are full.
+        :return: The ids of the new nodes.
+        """
+        start, end = self.size, self.size + len(tiles)
+        if end > len(self.blanks):
+            capacity = max(end, 2 * len(self.blanks))
+            for name in ("tiles", "blanks", "parents", "actions", "costs", "heuristics", "alive", "closed"):
+                column = getattr(self, name)
+                grown = np.empty((capacity,) + column.shape[1:], dtype=column.dtype)
+                grown[:start] = column[:start]
+                setattr(self, name, grown)
+        self.tiles[start:end] = tiles
+        self.blanks[start:end] = blanks
+        self.parents[start:end] = parents
+        self.actions[start:end] = actions
+        self.costs[start:end] = costs
+        self.heuristics[start:end] = heuristics
+        self.alive[start:end] = True
+        self.closed[start:end] = False
+        self.size = end
+        return np.arange(start, end)
+
+    def keys(self, tiles: np.ndarray) -> List[bytes]:
+        """
+        :param tiles: The tiles of states, one row per state.
+        :return: The bytes of every row, the keys of the states in the reached hashmap.
+        """
+        return np.ascontiguousarray(tiles).view(np.dtype((np.void, self.width))).ravel().tolist()
+
+    def search(self) -> SearchNode:
+        """
+        Expands batches of nodes of the lowest total cost until the goal state is popped.
+        :return: The goal node with history (parent nodes) of the path pointing back to the first (initial) node.
+        """
+        self.allocate(max(1024, 8 * self.batch_size))
+        initial = np.array(self.initial.tiles, dtype=self.dtype)[None, :]
+        h = int(self.distances[initial[0], np.arange(self.cells)].sum())
+        root = self.add(initial, np.array([self.initial.blank]), np.array([NO_ACTION]), np.array([NO_ACTION]),
+                        np.array([0]), np.array([h]))
+        # Frontier of arrays of node ids by total cost, and the reached hashmap from the keys of the states to the ids
+        # of their best nodes
+        frontier: Dict[int, List[np.ndarray]] = {h: [root]}
+        reached: Dict[bytes, int] = {self.keys(initial)[0]: 0}
+        goal = np.array(self.goal.tiles, dtype=self.dtype)
+
+        while frontier:
+            f = min(frontier)
+            ids = np.concatenate(frontier.pop(f))
+            alive = self.alive[ids]
+            self.stale += len(ids) - int(alive.sum())
+            ids = ids[alive]
+            if len(ids) > self.batch_size:
+                # The nodes closest to the goal first, the rest go back to the frontier
+                order = np.argsort(self.heuristics[ids], kind="stable")
+                frontier[f] = [ids[order[self.batch_size:]]]
+                ids = ids[order[:self.batch_size]]
+            if not len(ids):
+                continue
+            tiles = self.tiles[ids]
+            found = np.flatnonzero((tiles == goal).all(axis=1))
+            if len(found):
+                return self.path(int(ids[found[0]]))
+            self.closed[ids] = True
+            self.expanded += len(ids)
+            self.batches += 1
+            self.expand(ids, tiles, frontier, reached)
+        raise Exception("No solution found")
+
+    def expand(self, ids: np.ndarray, tiles: np.ndarray, frontier: Dict[int, List[np.ndarray]],
+               reached: Dict[bytes, int]) -> None:
+        """
+        Generates the successors of a batch of nodes, keeps the ones that reach a state for the first time or by a
+        shorter path, and pushes them to the frontier.
+        :param ids: The ids of the nodes to expand.
+        :param tiles: The tiles of their states, one row per node.
+        :param frontier: The frontier of the search.
+        :param reached: The reached hashmap of the search.
+        """
+        blanks = self.blanks[ids]
+        undo = self.undo[self.actions[ids]]
+        children, parents, actions, targets = [], [], [], []
+        for direction in Directions:
+            target = self.targets[blanks, direction.value]
+            rows = np.flatnonzero((target >= 0) & (undo != direction.value))
+            if not len(rows):
+                continue
+            children.append(tiles[rows])
+            parents.append(rows)
+            actions.append(np.full(len(rows), direction.value, dtype=np.int8))
+            targets.append(target[rows])
+        rows = np.concatenate(parents)
+        child_tiles = np.concatenate(children)
+        target = np.concatenate(targets)
+        blank = blanks[rows]
+        # Slide the tile at the target position into the position of the blank tile
+        index = np.arange(len(rows))
+        moved = child_tiles[index, target]
+        child_tiles[index, blank] = moved
+        child_tiles[index, target] = 0
+        costs = self.costs[ids][rows] + 1
+        heuristics = self.heuristics[ids][rows] + self.distances[moved, blank] - self.distances[moved, target]
+
+        # Keep the cheapest copy of every state generated more than once in the batch
+        keys = np.ascontiguousarray(child_tiles).view(np.dtype((np.void, self.width))).ravel()
+        order = np.argsort(costs, kind="stable")
+        _, first = np.unique(keys[order], return_index=True)
+        unique = np.sort(order[first])
+        self.pruned += len(rows) - len(unique)
+        key_list = self.keys(child_tiles[unique])
+        # Bulk lookup of the reached states, -1 for the new ones
+        existing = np.array(list(map(reached.get, key_list, itertools.repeat(-1))), dtype=np.int64)
+        known = existing >= 0
+        better = ~known
+        better[known] = costs[unique][known] < self.costs[existing[known]]
+        self.pruned += len(unique) - int(better.sum())
+        replaced = existing[better & known]
+        self.alive[replaced] = False
+        self.reopened += int(self.closed[replaced].sum())
+        keep = unique[better]
+        if not len(keep):
+            return
+        new = self.add(child_tiles[keep], target[keep], ids[rows[keep]], np.concatenate(actions)[keep], costs[keep],
+                       heuristics[keep])
+        self.N += len(new)
+        reached.update(zip(itertools.compress(key_list, better.tolist()), new.tolist()))
+        totals = costs[keep] + heuristics[keep]
+        for f in np.unique(totals).tolist():
+            frontier.setdefault(f, []).append(new[totals == f])
+
+    def path(self, node: int) -> SearchNode:
+        """
+        Rebuilds the path that ends in the node by following the parent ids, and links it into a chain of SearchNodes,
+        so the result can be consumed by the Solution class.
+        :param node: The id of the last node of the path.
+        :return: The last node with history (parent nodes) of the path pointing back to the first (initial) node.
+        """
+        ids = []
+        while node != NO_ACTION:
+            ids.append(node)
+            node = int(self.parents[node])
+        result = None
+        for i in reversed(ids):
+            action = Directions(int(self.actions[i])) if self.actions[i] != NO_ACTION else None
+            state = PuzzleState(self.tiles[i].tolist())
+            result = SearchNode(state, self.goal, result, action, int(self.costs[i]), int(self.heuristics[i]))
+        return result
+
+    def statistics(self) -> Dict[str, int]:
+        """
+        :return: The counters of the search: nodes generated (N), expanded, re-opened, duplicates pruned, stale
+        frontier entries skipped and batches expanded.
+        """
+        return {"generated": self.N, "expanded": self.expanded, "reopened": self.reopened, "pruned": self.pruned,
+                "stale": self.stale, "batches": self.batches}
+
+
+def compare(initial: PuzzleState, goal: PuzzleState, batch_size: int = DEFAULT_BATCH_SIZE) -> List[Tuple]:
+    """
+    Solves a puzzle with the scalar AStarSearch and with the VectorizedAStarSearch.
+    :param initial: The initial PuzzleState.
+    :param goal: The goal PuzzleState.
+    :param batch_size: The batch size of the vectorized engine.
+    :return: (name, solution, seconds) of both engines.
+    """
+    Solvability.check(initial, goal)
+    runs = []
+    for name, search in (("scalar", AStarSearch(initial, goal)),
+                         ("numpy", VectorizedAStarSearch(initial, goal, batch_size=batch_size))):
+        start = time.perf_counter()
+        result = search.search()
+        elapsed = time.perf_counter() - start
+        runs.append((name, Solution(result, search.N, search.statistics()), elapsed))
+    return runs
+
+
+if __name__ == "__main__":
+    # Reports the throughput of the vectorized engine against the scalar one on the given puzzle files.
+    parser = argparse.ArgumentParser(description="Compare the NumPy engine with the scalar A* search.")
+    parser.add_argument("files", nargs="+", help="puzzle files to solve")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="nodes expanded together")
+    args = parser.parse_args()
+
+    print(f"{'file':<24}{'engine':<8}{'d':>4}{'N':>10}{'time':>10}{'nodes/s':>10}")
+    mismatches = 0
+    for file in args.files:
+        puzzle_initial, puzzle_goal = PuzzleFileIO.read_puzzle_from_file(file)
+        results = compare(puzzle_initial, puzzle_goal, args.batch_size)
+        for engine, solution, seconds in results:
+            rate = solution.N / seconds if seconds else 0
+            print(f"{file:<24}{engine:<8}{solution.d:>4}{solution.N:>10}{seconds:>9.2f}s{rate:>10.0f}")
+        (_, scalar, scalar_time), (_, vector, vector_time) = results
+        if scalar.d != vector.d:
+            mismatches += 1
+            print(f"{file}: DEPTH MISMATCH, the scalar engine found {scalar.d} and the numpy engine {vector.d}")
+        print(f"{'':<24}speedup {scalar_time / vector_time:.2f}x in time, "
+              f"{(vector.N / vector_time) / (scalar.N / scalar_time):.2f}x in nodes per second")
+    sys.exit(1 if mismatches else 0)